@@ -1,8 +1,18 @@
 import argparse
+import os
 import sys
+from collections import deque
 from pathlib import Path
-from .analyzer import ComplianceAnalyzer
-from .report_generator import generate_pdf_report, generate_comparison_report
+from main import ComplianceAnalyzer, generate_pdf_report
+from match_guard import MatchTimeout
+from result_cache import ResultCache
+from comparison_report import REPORT_FORMATS, generate_portfolio_report
+from ingestion import extract_document
+from rule_packs import load_rule_pack
+from rule_profile import RulesetProfile, profile_text
+
+# Results written to the history database per transaction in parallel batch mode
+HISTORY_BATCH_SIZE = 50
 
 def main():
     parser = argparse.ArgumentParser(
@@ -14,7 +24,9 @@ def main():
 
     # Check command
     check_parser = subparsers.add_parser("check", help="Check a single policy file")
-    check_parser.add_argument("policy_file", help="Path to the policy file to check")
+    check_parser.add_argument(
+        "policy_file", help="Path to the policy file to check (text, Markdown, HTML, Word or PDF)"
+    )
     check_parser.add_argument(
         "--output", "-o",
         help="Output PDF report path (default: compliance_report.pdf)",
@@ -26,15 +38,36 @@ def main():
         type=float,
         default=0.6
     )
+    check_parser.add_argument(
+        "--no-report",
+        help="Only print the results; skip rendering the PDF report",
+        action="store_true"
+    )
+    check_parser.add_argument(
+        "--stream",
+        help="Read the policy in chunks instead of loading it into memory (for very large files)",
+        action="store_true"
+    )
 
     # Compare command
-    compare_parser = subparsers.add_parser("compare", help="Compare two policy files")
-    compare_parser.add_argument("policy1", help="First policy file")
-    compare_parser.add_argument("policy2", help="Second policy file")
+    compare_parser = subparsers.add_parser("compare", help="Compare two or more policy files")
+    compare_parser.add_argument("policies", nargs="+", help="Policy files to compare")
     compare_parser.add_argument(
         "--output", "-o",
-        help="Output PDF report path (default: compliance_comparison.pdf)",
-        default="compliance_comparison.pdf"
+        help="Output report path (default: compliance_comparison.pdf or .json)",
+        default=None
+    )
+    compare_parser.add_argument(
+        "--format", "-f",
+        help="Report format (default: pdf)",
+        choices=REPORT_FORMATS,
+        default="pdf"
+    )
+    compare_parser.add_argument(
+        "--workers", "-w",
+        help="Number of analysis processes (default: 1, 0 uses every CPU core)",
+        type=int,
+        default=1
     )
 
     # Batch check command
@@ -42,7 +75,7 @@ def main():
     batch_parser.add_argument("directory", help="Directory containing policy files")
     batch_parser.add_argument(
         "--pattern", "-p",
-        help="File pattern to match (default: *.txt)",
+        help="File pattern to match, e.g. '*.pdf' or '*.docx' (default: *.txt)",
         default="*.txt"
     )
     batch_parser.add_argument(
@@ -50,6 +83,49 @@ def main():
         help="Output directory for reports (default: reports)",
         default="reports"
     )
+    batch_parser.add_argument(
+        "--workers", "-w",
+        help="Number of analysis processes (default: 1, 0 uses every CPU core)",
+        type=int,
+        default=1
+    )
+    batch_parser.add_argument(
+        "--render-workers",
+        help="Number of report rendering processes in parallel mode (default: same as --workers)",
+        type=int,
+        default=None
+    )
+
+    for command_parser in (check_parser, compare_parser, batch_parser):
+        command_parser.add_argument(
+            "--rules", "-r",
+            help="Rule pack (YAML or JSON) to check against instead of the built-in ISO 42001 rules",
+            default=None
+        )
+        command_parser.add_argument(
+            "--match-timeout",
+            help="Seconds pattern matching may take per document before it is stopped "
+                 "(needed for rule packs with allow_unsafe_patterns)",
+            type=float,
+            default=None,
+            metavar="SECONDS"
+        )
+    for command_parser in (check_parser, batch_parser):
+        command_parser.add_argument(
+            "--profile",
+            help="Measure the cost of each pattern and proximity pair and write a sorted JSON "
+                 "report (default path: pattern_profile.json)",
+            nargs="?",
+            const="pattern_profile.json",
+            default=None,
+            metavar="PATH"
+        )
+        command_parser.add_argument(
+            "--cache",
+            help="Keep results in the history database so re-runs skip unchanged policies "
+                 "(expiry and size from CACHE_TTL and CACHE_MAX_ENTRIES)",
+            action="store_true"
+        )
 
     args = parser.parse_args()
 
@@ -63,21 +139,64 @@ def main():
         parser.print_help()
         sys.exit(1)
 
+def create_analyzer(rules=None, db_path: str = "compliance_history.db",
+                    match_timeout: float = None) -> ComplianceAnalyzer:
+    """Return an analyzer using the rule pack at ``rules``, or the built-in rules."""
+    return ComplianceAnalyzer(db_path, ruleset=load_rule_pack(rules) if rules else None,
+                              match_timeout=match_timeout)
+
+def enable_cache(analyzer: ComplianceAnalyzer) -> ResultCache:
+    """Cache the analyzer's results in its history database, configured like the API service."""
+    analyzer.result_cache = ResultCache.from_env(store=analyzer.history)
+    return analyzer.result_cache
+
+def save_profile(profile: RulesetProfile, output_path: str):
+    """Print the costliest patterns and pairs and write the full report."""
+    print("\nPattern cost profile:")
+    print("-" * 50)
+    print(profile.format_report())
+    profile.write(output_path)
+    print(f"\nCost profile saved to: {output_path}")
+
 def check_single_policy(args):
     try:
-        analyzer = ComplianceAnalyzer()
+        analyzer = create_analyzer(args.rules, match_timeout=args.match_timeout)
+        if args.cache:
+            enable_cache(analyzer)
+        profile = RulesetProfile.for_ruleset(analyzer.get_ruleset()) if args.profile else None
+        timeout = None
 
         print(f"Analyzing policy file: {args.policy_file}")
         print("=" * 50)
 
-        with open(args.policy_file, 'r') as f:
-            policy_text = f.read()
+        # PDF, Word, HTML and Markdown policies are checked against their extracted text
+        document = extract_document(args.policy_file)
+        if args.stream:
+            if args.match_timeout is not None:
+                # Rule packs with backtracking-prone patterns are refused by the streamed check
+                print("Note: --match-timeout is not applied to streamed checks")
+            result = analyzer.check_compliance_stream(document.chunks(), min_score=args.min_score)
+            if profile is not None:
+                # Profiled chunk by chunk, so the whole file is never held in memory
+                for chunk in document.chunks():
+                    profile_text(analyzer.get_ruleset(), chunk, profile)
+        else:
+            policy_text = document.read_text()
 
-        result = analyzer.check_compliance(policy_text, min_score=args.min_score)
+            try:
+                result = analyzer.check_compliance(policy_text, min_score=args.min_score)
+            except MatchTimeout as e:
+                timeout, result = e, e.result
+            # Profiling re-runs every pattern without a time limit, so a timed-out policy is not profiled
+            if profile is not None and timeout is None:
+                profile_text(analyzer.get_ruleset(), policy_text, profile)
 
         # Print console report
         print("\nISO 42001 Compliance Check Results:")
         print("-" * 50)
+        if timeout is not None:
+            print(f"Error: {timeout}")
+            print("Partial results from the patterns that finished (not stored, no report):")
         print(f"Overall Score: {result.score:.2f}")
         print(f"Compliance Status: {'PASS' if result.is_compliant else 'FAIL'}")
 
@@ -90,8 +209,16 @@ def check_single_policy(args):
                     print(f"  - {match}")
 
         # Generate PDF report
-        generate_pdf_report(result, analyzer, args.output)
-        print(f"\nDetailed report saved to: {args.output}")
+        if not args.no_report and timeout is None:
+            generate_pdf_report(result, analyzer, args.output)
+            print(f"\nDetailed report saved to: {args.output}")
+
+        if profile is not None and timeout is None:
+            save_profile(profile, args.profile)
+        if timeout is not None:
+            if profile is not None:
+                print("\nPattern cost profile skipped: the policy ran over its match timeout")
+            sys.exit(1)
 
     except Exception as e:
         print(f"Error: {str(e)}")
@@ -99,9 +226,25 @@ def check_single_policy(args):
 
 def compare_policies(args):
     try:
-        print(f"Comparing policies:\n1. {args.policy1}\n2. {args.policy2}")
-        generate_comparison_report(args.policy1, args.policy2, args.output)
-        print(f"\nComparison report saved to: {args.output}")
+        if len(args.policies) < 2:
+            print("Error: at least two policy files are needed for a comparison")
+            sys.exit(1)
+        output = args.output or f"compliance_comparison.{args.format}"
+        print("Comparing policies:")
+        for index, policy in enumerate(args.policies, 1):
+            print(f"{index}. {policy}")
+
+        analyzer = create_analyzer(args.rules, match_timeout=args.match_timeout)
+        comparison = generate_portfolio_report(
+            args.policies, output, analyzer=analyzer,
+            workers=args.workers or os.cpu_count() or 1, output_format=args.format
+        )
+        analyzer.close()
+
+        print()
+        for label, score in zip(comparison.labels, comparison.scores):
+            print(f"{label}: {score:.2f}")
+        print(f"\nComparison report saved to: {output}")
 
     except Exception as e:
         print(f"Error: {str(e)}")
@@ -109,12 +252,15 @@ def compare_policies(args):
 
 def check_batch_policies(args):
     try:
-        analyzer = ComplianceAnalyzer()
+        analyzer = create_analyzer(args.rules, match_timeout=args.match_timeout)
+        cache = args.cache
+        if cache:
+            enable_cache(analyzer)
         directory = Path(args.directory)
         output_dir = Path(args.output_dir)
         output_dir.mkdir(exist_ok=True)
 
-        policies = list(directory.glob(args.pattern))
+        policies = sorted(directory.glob(args.pattern))
         if not policies:
             print(f"No files matching pattern '{args.pattern}' found in {directory}")
             sys.exit(1)
@@ -122,28 +268,142 @@ def check_batch_policies(args):
         print(f"Found {len(policies)} policy files to analyze")
         print("=" * 50)
 
-        for policy_file in policies:
-            print(f"\nAnalyzing: {policy_file.name}")
-            try:
-                with open(policy_file, 'r') as f:
-                    policy_text = f.read()
-
-                result = analyzer.check_compliance(policy_text)
-                output_file = output_dir / f"{policy_file.stem}_report.pdf"
-                generate_pdf_report(result, analyzer, str(output_file))
+        profile = RulesetProfile.for_ruleset(analyzer.get_ruleset()) if args.profile else None
+        workers = args.workers or os.cpu_count() or 1
+        if workers > 1:
+            render_workers = args.render_workers or workers
+            check_policies_parallel(analyzer, policies, output_dir, workers, render_workers,
+                                    rules=args.rules, profile=profile, match_timeout=args.match_timeout,
+                                    cache=cache)
+        else:
+            for policy_file in policies:
+                print(f"\nAnalyzing: {policy_file.name}")
+                try:
+                    policy_text = extract_document(policy_file).read_text()
+                    result = analyzer.check_compliance(policy_text)
+                    if profile is not None:
+                        profile_text(analyzer.get_ruleset(), policy_text, profile)
+                    output_file = output_dir / f"{policy_file.stem}_report.pdf"
+                    generate_pdf_report(result, analyzer, str(output_file))
 
-                print(f"Score: {result.score:.2f} ({'PASS' if result.is_compliant else 'FAIL'})")
-                print(f"Report saved to: {output_file}")
+                    print(f"Score: {result.score:.2f} ({'PASS' if result.is_compliant else 'FAIL'})")
+                    print(f"Report saved to: {output_file}")
 
-            except Exception as e:
-                print(f"Error processing {policy_file.name}: {str(e)}")
-                continue
+                except Exception as e:
+                    print(f"Error processing {policy_file.name}: {str(e)}")
+                    continue
 
+        analyzer.close()
         print(f"\nAll reports saved to: {output_dir}")
+        if profile is not None:
+            save_profile(profile, args.profile)
 
     except Exception as e:
         print(f"Error: {str(e)}")
         sys.exit(1)
 
+# Analyzer owned by each batch worker process
+_worker_analyzer = None
+# Whether batch workers also profile each policy they analyze
+_worker_profiles = False
+
+def _init_analysis_worker(rules=None, profile=False, match_timeout=None, cache_db=None):
+    global _worker_analyzer, _worker_profiles
+    # Workers only analyze; the parent process is the single writer for history.
+    # The parent already compiled the rule pack, so workers load its cached artifact.
+    # With a ``cache_db`` they share the parent's result cache in that database.
+    _worker_analyzer = create_analyzer(rules, cache_db or ":memory:", match_timeout)
+    if cache_db:
+        enable_cache(_worker_analyzer)
+    _worker_profiles = profile
+
+def _analyze_policy_file(policy_file: Path):
+    """Return (result, error, cost profile or None) for one policy."""
+    try:
+        # Extraction runs here too, so documents are extracted in parallel
+        policy_text = extract_document(policy_file).read_text()
+        result = _worker_analyzer.check_compliance(policy_text, store=False)
+        # Commit any queued result cache entries; the pool may stop this process at any time
+        _worker_analyzer.flush()
+        profile = profile_text(_worker_analyzer.get_ruleset(), policy_text) if _worker_profiles else None
+        return result, None, profile
+    except Exception as e:
+        return None, str(e), None
+
+def _init_render_worker(db_path: str):
+    global _worker_analyzer
+    _worker_analyzer = ComplianceAnalyzer(db_path)
+
+def _render_policy_report(result, output_file: str):
+    try:
+        generate_pdf_report(result, _worker_analyzer, output_file)
+        return None
+    except Exception as e:
+        return str(e)
+
+def check_policies_parallel(analyzer, policies, output_dir: Path, workers: int, render_workers: int,
+                            rules=None, profile: RulesetProfile = None, match_timeout: float = None,
+                            cache: bool = False):
+    """Analyze policies in a process pool and render their reports in a second one.
+
+    Results come back in input order and are written to history by this
+    process in batched transactions before their reports are rendered, so each
+    report's trends include its own result. Output is printed in input order.
+    With a ``profile``, workers also profile each policy and their costs are
+    merged into it. With ``cache``, workers look results up in and add them to
+    the result cache in the analyzer's history database.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    db_path = str(Path(analyzer.db_path).resolve())
+    total = len(policies)
+    chunksize = max(1, min(32, total // (workers * 4)))
+    batch = []
+    pending = deque()
+
+    def print_ready(wait: bool = False):
+        while pending and (wait or pending[0][4] is None or pending[0][4].done()):
+            index, policy_file, result, error, render, output_file = pending.popleft()
+            print(f"\n[{index}/{total}] Analyzing: {policy_file.name}")
+            if error is not None:
+                print(f"Error processing {policy_file.name}: {error}")
+                continue
+            print(f"Score: {result.score:.2f} ({'PASS' if result.is_compliant else 'FAIL'})")
+            render_error = render.result()
+            if render_error is not None:
+                print(f"Error rendering report for {policy_file.name}: {render_error}")
+            else:
+                print(f"Report saved to: {output_file}")
+
+    with ProcessPoolExecutor(workers, initializer=_init_analysis_worker,
+                             initargs=(rules, profile is not None, match_timeout,
+                                       db_path if cache else None)) as analysis_pool, \
+            ProcessPoolExecutor(render_workers, initializer=_init_render_worker,
+                                initargs=(db_path,)) as render_pool:
+
+        def submit_batch():
+            analyzer.store_results([item[2] for item in batch if item[2] is not None])
+            for index, policy_file, result, error in batch:
+                render = output_file = None
+                if result is not None:
+                    output_file = output_dir / f"{policy_file.stem}_report.pdf"
+                    render = render_pool.submit(
+                        _render_policy_report, result, str(output_file.resolve())
+                    )
+                pending.append((index, policy_file, result, error, render, output_file))
+            batch.clear()
+
+        outcomes = analysis_pool.map(_analyze_policy_file, policies, chunksize=chunksize)
+        for index, (policy_file, (result, error, cost)) in enumerate(zip(policies, outcomes), 1):
+            if cost is not None:
+                profile.merge(cost)
+            batch.append((index, policy_file, result, error))
+            if len(batch) >= HISTORY_BATCH_SIZE:
+                submit_batch()
+            print_ready()
+
+        submit_batch()
+        print_ready(wait=True)
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
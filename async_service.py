@@ -0,0 +1,197 @@
+"""Asynchronous compliance service with bounded analysis and report workers."""
+
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Tuple
+import asyncio
+import os
+
+from main import ComplianceAnalyzer, ComplianceResult
+from metrics import timed
+from report_renderer import get_report_renderer
+
+class ServiceBusy(RuntimeError):
+    """Raised when the service is at capacity; callers should retry later."""
+
+# (text, min_score, policy_id)
+BatchDocument = Tuple[str, float, Optional[str]]
+# (index in the batch, result or None, error message or None)
+BatchOutcome = Tuple[int, Optional[ComplianceResult], Optional[str]]
+
+@dataclass
+class ReportJob:
+    """A queued report render and the future resolved with its output path."""
+    result: ComplianceResult
+    output_path: str
+    done: "asyncio.Future[str]"
+
+def _render_report(result: ComplianceResult, trends: Optional[Dict], output_path: str) -> str:
+    get_report_renderer().render(result, trends, output_path)
+    return output_path
+
+class ComplianceService:
+    """Run compliance checks and report renders off the event loop.
+
+    Analyses run in a process pool of ``workers`` processes, so throughput
+    scales with cores. At most ``max_pending`` analyses may be in flight;
+    beyond that ``analyze`` raises ``ServiceBusy`` instead of queueing without
+    bound. Reports are rendered by ``report_workers`` processes fed from a
+    queue of at most ``report_queue_size`` jobs. History rows are written
+    behind by the analyzer's store.
+    """
+
+    def __init__(self, analyzer: ComplianceAnalyzer, workers: Optional[int] = None,
+                 max_pending: Optional[int] = None, report_workers: int = 1,
+                 report_queue_size: int = 64, use_processes: bool = True):
+        self.analyzer = analyzer
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending or self.workers * 8
+        self.report_workers = report_workers
+        self.report_queue_size = report_queue_size
+        self.use_processes = use_processes
+
+        self._pending = 0
+        self._pool: Optional[Executor] = None
+        self._render_pool: Optional[Executor] = None
+        self._reports: Optional["asyncio.Queue[ReportJob]"] = None
+        self._consumers: List["asyncio.Task"] = []
+
+    async def start(self):
+        """Start the worker pools and report consumers on the running loop."""
+        pool_class = ProcessPoolExecutor if self.use_processes else ThreadPoolExecutor
+        self._pool = pool_class(self.workers)
+        self._render_pool = pool_class(self.report_workers)
+        self._reports = asyncio.Queue(self.report_queue_size)
+        self._consumers = [
+            asyncio.ensure_future(self._consume_reports()) for _ in range(self.report_workers)
+        ]
+
+    async def close(self):
+        """Finish queued reports, stop the workers and flush pending history rows."""
+        if self._reports is not None:
+            await self._reports.join()
+        for consumer in self._consumers:
+            consumer.cancel()
+        await asyncio.gather(*self._consumers, return_exceptions=True)
+        self._consumers = []
+        pools = [pool for pool in (self._pool, self._render_pool) if pool is not None]
+        self._pool = self._render_pool = None
+        loop = asyncio.get_running_loop()
+        # Shutting down waits for the workers, so it runs off the event loop like the flush
+        for pool in pools:
+            await loop.run_in_executor(None, pool.shutdown)
+        await loop.run_in_executor(None, self.analyzer.flush)
+
+    async def analyze(self, text: str, min_score: float = 0.6,
+                      policy_id: Optional[str] = None) -> ComplianceResult:
+        """Check a document in the worker pool; raises ``ServiceBusy`` when at capacity."""
+        if self._pool is None:
+            raise RuntimeError("ComplianceService is not started")
+        if self._pending >= self.max_pending:
+            raise ServiceBusy(f"{self._pending} analyses already in progress")
+        self._pending += 1
+        try:
+            return await self.analyzer.check_compliance_async(
+                text, min_score=min_score, policy_id=policy_id, executor=self._pool
+            )
+        finally:
+            self._pending -= 1
+
+    def analyze_batch(self, documents: Sequence[BatchDocument],
+                      window: Optional[int] = None) -> AsyncIterator[BatchOutcome]:
+        """Check many documents in the worker pool, yielding outcomes as they complete.
+
+        At most ``window`` documents (twice the worker count by default) are in
+        flight at once, and they count towards ``max_pending``. Results are
+        persisted together in a single history transaction once the whole
+        batch is done. Raises ``ServiceBusy`` up front when at capacity.
+        """
+        if self._pool is None:
+            raise RuntimeError("ComplianceService is not started")
+        window = min(window or self.workers * 2, self.max_pending - self._pending)
+        if window <= 0:
+            raise ServiceBusy(f"{self._pending} analyses already in progress")
+        return self._run_batch(documents, window)
+
+    async def _run_batch(self, documents: Sequence[BatchDocument],
+                         window: int) -> AsyncIterator[BatchOutcome]:
+        async def check(index: int, document: BatchDocument) -> BatchOutcome:
+            text, min_score, policy_id = document
+            try:
+                result = await self.analyzer.check_compliance_async(
+                    text, min_score=min_score, policy_id=policy_id, store=False, executor=self._pool
+                )
+                return index, result, None
+            except Exception as e:
+                return index, None, str(e)
+
+        remaining = iter(enumerate(documents))
+        in_flight = set()
+        results: List[ComplianceResult] = []
+        try:
+            while True:
+                for index, document in remaining:
+                    self._pending += 1
+                    in_flight.add(asyncio.ensure_future(check(index, document)))
+                    if len(in_flight) >= window:
+                        break
+                if not in_flight:
+                    break
+                done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                self._pending -= len(done)
+                for task in done:
+                    outcome = task.result()
+                    if outcome[1] is not None:
+                        results.append(outcome[1])
+                    yield outcome
+        finally:
+            for task in in_flight:
+                task.cancel()
+            self._pending -= len(in_flight)
+            if results:
+                await asyncio.get_running_loop().run_in_executor(
+                    None, self.analyzer.store_results, results
+                )
+
+    def submit_report(self, result: ComplianceResult, output_path: str) -> "asyncio.Future[str]":
+        """Queue a report render; the returned future resolves to the output path.
+
+        Raises ``ServiceBusy`` when the report queue is full.
+        """
+        if self._reports is None:
+            raise RuntimeError("ComplianceService is not started")
+        job = ReportJob(result, output_path, asyncio.get_running_loop().create_future())
+        try:
+            self._reports.put_nowait(job)
+        except asyncio.QueueFull:
+            raise ServiceBusy("Report queue is full") from None
+        return job.done
+
+    @property
+    def pending(self) -> int:
+        """Number of analyses in flight."""
+        return self._pending
+
+    @property
+    def queued_reports(self) -> int:
+        """Number of reports waiting to be rendered."""
+        return self._reports.qsize() if self._reports is not None else 0
+
+    async def _consume_reports(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self._reports.get()
+            try:
+                # Trends come from the history database, which is read in a thread
+                trends = await loop.run_in_executor(None, self.analyzer.get_historical_trends)
+                with timed(self.analyzer.metrics, "report"):
+                    path = await loop.run_in_executor(
+                        self._render_pool, _render_report, job.result, trends, job.output_path
+                    )
+                if not job.done.cancelled():
+                    job.done.set_result(path)
+            except Exception as e:
+                if not job.done.cancelled():
+                    job.done.set_exception(e)
+            finally:
+                self._reports.task_done()
@@ -0,0 +1,117 @@
+"""Headless chart rendering for PDF reports."""
+
+from collections import OrderedDict
+from io import BytesIO
+from typing import Dict, Optional, Sequence, Tuple
+import threading
+
+# Matches matplotlib's default figure resolution, so charts keep their size in reports
+CHART_DPI = 100
+# zlib level for chart PNGs; reportlab re-compresses the pixels when embedding them
+PNG_COMPRESS_LEVEL = 1
+
+# Line chart templates kept per thread; the least recently used size beyond this is cleared
+MAX_TEMPLATES = 4
+# Per-thread line chart templates, keyed by figure size
+_templates = threading.local()
+
+def _new_figure(figsize: Tuple[float, float]):
+    """Create a figure bound to its own Agg canvas, outside pyplot's global figure registry.
+
+    Figures created this way are plain objects: they are freed with their last
+    reference and never touch shared state, so renders can run concurrently.
+    """
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    figure = Figure(figsize=figsize, dpi=CHART_DPI)
+    FigureCanvasAgg(figure)
+    return figure
+
+def _to_png(figure, release: bool = True) -> BytesIO:
+    buffer = BytesIO()
+    try:
+        figure.savefig(buffer, format="png", pil_kwargs={"compress_level": PNG_COMPRESS_LEVEL})
+    finally:
+        if release:
+            figure.clear()
+    buffer.seek(0)
+    return buffer
+
+def _line_axes(figsize: Tuple[float, float]):
+    """Return this thread's reusable line chart axes, emptied of previous data.
+
+    Creating a figure and its axes costs about as much as drawing them, so
+    each thread keeps a template for each of its ``MAX_TEMPLATES`` most
+    recently used sizes and only swaps the plotted lines. Evicted templates are
+    cleared; the rest are freed by ``release_templates`` or when their thread
+    exits.
+    """
+    cache = getattr(_templates, "line_axes", None)
+    if cache is None:
+        cache = _templates.line_axes = OrderedDict()
+    axes = cache.get(figsize)
+    if axes is None:
+        axes = cache[figsize] = _new_figure(figsize).add_subplot()
+        axes.grid(True)
+        while len(cache) > MAX_TEMPLATES:
+            cache.popitem(last=False)[1].figure.clear()
+    else:
+        cache.move_to_end(figsize)
+        for line in list(axes.lines):
+            line.remove()
+        if axes.get_legend() is not None:
+            axes.get_legend().remove()
+        axes.set_prop_cycle(None)
+    return axes
+
+def release_templates():
+    """Clear and drop the calling thread's line chart templates.
+
+    Long-lived threads that render only occasionally can call this after a
+    report to give the memory back until their next render.
+    """
+    cache = getattr(_templates, "line_axes", None)
+    if cache:
+        for axes in cache.values():
+            axes.figure.clear()
+        cache.clear()
+
+def render_line_chart(series: Dict[str, Sequence[float]], title: str, xlabel: str, ylabel: str,
+                      legend: bool = True, figsize: Tuple[float, float] = (8, 4)) -> BytesIO:
+    """Render one marked line per series against its index and return the PNG bytes."""
+    axes = _line_axes(figsize)
+    for label, values in series.items():
+        axes.plot(range(len(values)), values, marker='o', label=label)
+    axes.relim()
+    axes.autoscale_view()
+    axes.set_title(title)
+    axes.set_xlabel(xlabel)
+    axes.set_ylabel(ylabel)
+    if legend:
+        axes.legend()
+    return _to_png(axes.figure, release=False)
+
+def render_grouped_bar_chart(categories: Sequence[str], series: Dict[str, Sequence[float]],
+                             title: str, ylabel: str,
+                             figsize: Tuple[float, float] = (8, 4)) -> BytesIO:
+    """Render side-by-side bars per category, one bar per series, and return the PNG bytes."""
+    figure = _new_figure(figsize)
+    axes = figure.add_subplot()
+    width = 0.7 / max(1, len(series))
+    for offset, (label, values) in enumerate(series.items()):
+        shift = (offset - (len(series) - 1) / 2) * width
+        axes.bar([x + shift for x in range(len(categories))], values, width, label=label)
+    axes.set_ylabel(ylabel)
+    axes.set_title(title)
+    axes.set_xticks(range(len(categories)))
+    axes.set_xticklabels(categories, rotation=45)
+    axes.legend()
+    figure.tight_layout()
+    return _to_png(figure)
+
+def chart_image(buffer: BytesIO, width: Optional[float] = None, height: Optional[float] = None):
+    """Wrap rendered PNG bytes in a reportlab Image flowable."""
+    from reportlab.platypus import Image
+
+    return Image(buffer, width=width, height=height)
@@ -1,16 +1,23 @@
 """FastAPI service for AI Governance compliance checking."""
 
-from fastapi import FastAPI, HTTPException, BackgroundTasks
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import FileResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import Dict, List, Optional
 import uvicorn
 import json
 from datetime import datetime
 import asyncio
+import os
 from pathlib import Path
 import aiofiles
 from ai_governance_tool import ComplianceAnalyzer
+from async_service import ComplianceService, ServiceBusy
+from match_guard import MatchTimeout
+from metrics import PROMETHEUS_CONTENT_TYPE
+from proximity import ProximitySettings
+from result_cache import ResultCache
 
 app = FastAPI(
     title="AI Governance Compliance API",
@@ -18,8 +25,31 @@ app = FastAPI(
     version="1.0.0"
 )
 
-# Initialize analyzer
-analyzer = ComplianceAnalyzer()
+# Initialize analyzer; CPU work and report rendering run in the service's worker pools.
+# ENABLE_PROXIMITY_ANALYSIS and PROXIMITY_MAX_WORDS are read like the web backend's settings;
+# MATCH_TIMEOUT_SECONDS bounds how long one document's pattern matching may take;
+# CACHE_TTL and CACHE_MAX_ENTRIES size the result cache kept in the history database.
+MATCH_TIMEOUT = os.environ.get("MATCH_TIMEOUT_SECONDS", "").strip()
+analyzer = ComplianceAnalyzer(
+    proximity=ProximitySettings.from_env(),
+    match_timeout=float(MATCH_TIMEOUT) if MATCH_TIMEOUT else None
+)
+analyzer.result_cache = ResultCache.from_env(store=analyzer.history)
+metrics = analyzer.enable_metrics()
+service = ComplianceService(analyzer)
+
+# Seconds clients are asked to wait when the service is at capacity
+RETRY_AFTER = 1
+# Largest number of documents accepted by /check/batch
+MAX_BATCH_DOCUMENTS = 10000
+
+@app.on_event("startup")
+async def start_service():
+    await service.start()
+
+@app.on_event("shutdown")
+async def stop_service():
+    await service.close()
 
 class PolicyCheck(BaseModel):
     """Policy check request model."""
@@ -43,49 +73,130 @@ class ComplianceResult(BaseModel):
     category_scores: Dict[str, ComplianceScore]
     report_url: Optional[str] = None
 
+def to_response(result, policy_id: str, min_score: float,
+                report_url: Optional[str] = None) -> ComplianceResult:
+    """Convert an analyzer result to the API response model."""
+    # Prepare category scores
+    category_scores = {}
+    for category, score in result.category_scores.items():
+        patterns = [p[1] for p in result.found_patterns.get(category, [])]
+        category_scores[category] = ComplianceScore(
+            score=score,
+            found_patterns=patterns,
+            status="PASS" if score >= min_score else "FAIL"
+        )
+
+    return ComplianceResult(
+        policy_id=policy_id,
+        timestamp=result.timestamp,
+        overall_score=result.score,
+        status="PASS" if result.is_compliant else "FAIL",
+        category_scores=category_scores,
+        report_url=report_url
+    )
+
 @app.post("/check", response_model=ComplianceResult)
-async def check_policy(policy: PolicyCheck, background_tasks: BackgroundTasks):
+async def check_policy(policy: PolicyCheck):
     """Check a policy for compliance."""
     try:
         # Generate policy ID if not provided
         policy_id = policy.policy_id or datetime.now().strftime("%Y%m%d_%H%M%S")
 
         # Analyze policy
-        result = analyzer.check_compliance(policy.content, min_score=policy.min_score)
-
-        # Prepare category scores
-        category_scores = {}
-        for category, score in result.category_scores.items():
-            patterns = [p[1] for p in result.found_patterns.get(category, [])]
-            category_scores[category] = ComplianceScore(
-                score=score,
-                found_patterns=patterns,
-                status="PASS" if score >= policy.min_score else "FAIL"
-            )
-
-        # Generate report in background
+        result = await service.analyze(
+            policy.content, min_score=policy.min_score, policy_id=policy_id
+        )
+
+        # Generate report in the render workers
         report_path = Path(f"reports/{policy_id}_report.pdf")
         report_path.parent.mkdir(exist_ok=True)
 
-        background_tasks.add_task(
-            generate_report,
-            result,
-            str(report_path),
-            policy.notify_url
-        )
+        report_url = f"/reports/{policy_id}"
+        try:
+            rendered = service.submit_report(result, str(report_path))
+        except ServiceBusy:
+            # The check itself succeeded; only the report is skipped under load
+            report_url = None
+        else:
+            if policy.notify_url:
+                asyncio.ensure_future(notify_when_rendered(rendered, policy.notify_url))
 
-        return ComplianceResult(
-            policy_id=policy_id,
-            timestamp=result.timestamp,
-            overall_score=result.score,
-            status="PASS" if result.is_compliant else "FAIL",
-            category_scores=category_scores,
-            report_url=f"/reports/{policy_id}"
-        )
+        return to_response(result, policy_id, policy.min_score, report_url)
 
+    except ServiceBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(RETRY_AFTER)})
+    except MatchTimeout as e:
+        # Partial scores from the patterns that finished; nothing was stored
+        raise HTTPException(status_code=422, detail={
+            'error': str(e),
+            'unfinished_patterns': e.patterns,
+            'partial_result': jsonable_encoder(to_response(e.result, policy_id, policy.min_score)),
+        })
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+async def read_batch(request: Request) -> List[PolicyCheck]:
+    """Parse a batch given as a JSON array of checks or as a multipart upload of files.
+
+    Uploaded files are checked with the form's ``min_score`` and use their
+    file names as policy IDs.
+    """
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("multipart/form-data"):
+        form = await request.form()
+        min_score = float(form.get("min_score", 0.6))
+        policies = []
+        for upload in form.getlist("files"):
+            content = await upload.read()
+            policies.append(PolicyCheck(
+                content=content.decode("utf-8"), policy_id=upload.filename, min_score=min_score
+            ))
+        return policies
+
+    payload = await request.json()
+    if not isinstance(payload, list):
+        raise ValueError("Expected a JSON array of policy checks")
+    return [PolicyCheck(**item) for item in payload]
+
+@app.post("/check/batch")
+async def check_policy_batch(request: Request):
+    """Check many policies, streaming one NDJSON line per document as each completes.
+
+    Lines carry the document's ``index`` in the request plus either the
+    result fields or an ``error``. Results are written to history in one
+    transaction after the last document; a final ``batch`` line summarizes it.
+    """
+    try:
+        policies = await read_batch(request)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if len(policies) > MAX_BATCH_DOCUMENTS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_DOCUMENTS} documents per batch")
+
+    batch_id = datetime.now().strftime("%Y%m%d_%H%M%S")
+    policy_ids = [policy.policy_id or f"{batch_id}_{idx}" for idx, policy in enumerate(policies)]
+    try:
+        outcomes = service.analyze_batch([
+            (policy.content, policy.min_score, policy_id)
+            for policy, policy_id in zip(policies, policy_ids)
+        ])
+    except ServiceBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(RETRY_AFTER)})
+
+    async def stream():
+        errors = 0
+        async for index, result, error in outcomes:
+            if error is not None:
+                errors += 1
+                line = {'index': index, 'policy_id': policy_ids[index], 'error': error}
+            else:
+                response = to_response(result, policy_ids[index], policies[index].min_score)
+                line = {'index': index, **jsonable_encoder(response)}
+            yield json.dumps(line) + "\n"
+        yield json.dumps({'batch': {'documents': len(policies), 'errors': errors}}) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
 @app.get("/reports/{policy_id}")
 async def get_report(policy_id: str):
     """Get the PDF report for a policy check."""
@@ -100,59 +211,92 @@ async def get_report(policy_id: str):
     )
 
 @app.get("/history")
-async def get_history(
+def get_history(
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
-    min_score: Optional[float] = None
+    min_score: Optional[float] = None,
+    max_score: Optional[float] = None,
+    status: Optional[str] = None,
+    policy_id: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None
 ):
-    """Get compliance check history."""
+    """Get compliance check history, filtered and paginated in the database."""
     try:
-        # Read from SQLite database
-        history = analyzer.get_historical_trends()
+        page = analyzer.query_history(
+            start=start_date,
+            end=end_date,
+            min_score=min_score,
+            max_score=max_score,
+            is_compliant=None if status is None else status.upper() == "PASS",
+            policy_id=policy_id,
+            limit=limit,
+            cursor=cursor
+        )
+        return {'results': page.results, 'next_cursor': page.next_cursor}
 
-        # Filter results
-        filtered = []
-        for idx, timestamp in enumerate(history['timestamps']):
-            score = history['overall_scores'][idx]
-            if min_score and score < min_score:
-                continue
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-            if start_date and timestamp < start_date:
-                continue
+@app.get("/history/categories")
+def get_category_history(
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    policy_id: Optional[str] = None
+):
+    """Get per-category score aggregates over the compliance history."""
+    try:
+        return analyzer.get_category_aggregates(
+            start=start_date, end=end_date, policy_id=policy_id
+        )
 
-            if end_date and timestamp > end_date:
-                continue
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-            filtered.append({
-                'timestamp': timestamp,
-                'score': score,
-                'category_scores': {
-                    cat: scores[idx]
-                    for cat, scores in history['category_scores'].items()
-                }
-            })
+@app.get("/history/{history_id}/matches")
+def get_history_matches(history_id: int):
+    """Get the stored match positions of a past check, for highlighting without a re-scan."""
+    index = analyzer.get_match_index(history_id)
+    if index is None:
+        raise HTTPException(status_code=404, detail="No match index stored for this check")
+    patterns = [p.pattern for category in analyzer.categories for p in category.patterns]
+    return {
+        'counts': list(index.counts),
+        'matches': [
+            {
+                'pattern_id': pattern_id,
+                'pattern': patterns[pattern_id] if pattern_id < len(patterns) else None,
+                'start': start,
+                'end': end
+            }
+            for pattern_id, start, end in index.matches()
+        ]
+    }
 
-        return {'results': filtered}
+@app.get("/metrics")
+def get_metrics(format: str = "prometheus"):
+    """Stage timings, documents, bytes analyzed and matches per pattern, for Prometheus or as JSON."""
+    if format == "json":
+        return metrics.snapshot()
+    if format != "prometheus":
+        raise HTTPException(status_code=400, detail="format must be 'prometheus' or 'json'")
+    return PlainTextResponse(metrics.to_prometheus(), media_type=PROMETHEUS_CONTENT_TYPE)
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+async def notify_when_rendered(rendered: "asyncio.Future[str]", notify_url: str):
+    """Send a notification once a queued report has been rendered."""
+    report_path = await rendered
 
-async def generate_report(result, report_path: str, notify_url: Optional[str] = None):
-    """Generate PDF report and notify if URL provided."""
-    from ai_governance_tool.report import generate_pdf_report
-
-    # Generate report
-    generate_pdf_report(result, analyzer, report_path)
-
-    # Send notification if URL provided
-    if notify_url:
-        import aiohttp
-        async with aiohttp.ClientSession() as session:
-            await session.post(notify_url, json={
-                'status': 'complete',
-                'report_path': report_path,
-                'timestamp': datetime.now().isoformat()
-            })
+    import aiohttp
+    async with aiohttp.ClientSession() as session:
+        await session.post(notify_url, json={
+            'status': 'complete',
+            'report_path': report_path,
+            'timestamp': datetime.now().isoformat()
+        })
 
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
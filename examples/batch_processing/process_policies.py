@@ -7,9 +7,10 @@ from pathlib import Path
 from datetime import datetime
 import pandas as pd
 from ai_governance_tool import ComplianceAnalyzer
+from ingestion import ExtractionError, check_documents, supported_suffixes
 
-def process_directory(input_dir: str, output_dir: str, min_score: float = 0.6):
-    """Process all policy files in a directory."""
+def process_directory(input_dir: str, output_dir: str, min_score: float = 0.6, workers: int = 1):
+    """Process all policy files in a directory: text, Markdown, HTML, Word and PDF."""
     input_path = Path(input_dir)
     output_path = Path(output_dir)
     output_path.mkdir(exist_ok=True)
@@ -20,16 +21,16 @@ def process_directory(input_dir: str, output_dir: str, min_score: float = 0.6):
     # Track results for summary
     results = []
 
-    # Process each policy file
-    for policy_file in input_path.glob("**/*.md"):
+    # Documents are extracted in parallel, cached by file hash, and streamed into the analyzer
+    policy_files = sorted(path for path in input_path.glob("**/*")
+                          if path.suffix.lower() in supported_suffixes())
+    for path, result, error in check_documents(analyzer, policy_files, min_score, workers):
+        policy_file = Path(path)
         print(f"Processing: {policy_file}")
 
         try:
-            # Read and analyze policy
-            with open(policy_file, 'r') as f:
-                content = f.read()
-
-            result = analyzer.check_compliance(content, min_score=min_score)
+            if error is not None:
+                raise ExtractionError(error)
 
             # Generate report name
             report_name = output_path / f"{policy_file.stem}_report.pdf"
@@ -78,9 +79,11 @@ def main():
                        help='Output directory for reports')
     parser.add_argument('--min-score', '-m', type=float, default=0.6,
                        help='Minimum compliance score (0.0-1.0)')
+    parser.add_argument('--workers', '-w', type=int, default=1,
+                       help='Number of text extraction processes')
 
     args = parser.parse_args()
-    process_directory(args.input_dir, args.output_dir, args.min_score)
+    process_directory(args.input_dir, args.output_dir, args.min_score, args.workers)
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -2,6 +2,7 @@
 """Example of real-time policy monitoring using watchdog."""
 
 import sys
+import threading
 import time
 from pathlib import Path
 from watchdog.observers import Observer
@@ -9,33 +10,66 @@ from watchdog.events import FileSystemEventHandler
 import json
 from datetime import datetime
 from ai_governance_tool import ComplianceAnalyzer
+from ingestion import extract_document, supported_suffixes
+
+# Suffix of the reports written next to each policy; they are never checked themselves
+REPORT_SUFFIX = '.report.pdf'
 
 class PolicyMonitor(FileSystemEventHandler):
-    def __init__(self, analyzer, webhook_url=None):
+    def __init__(self, analyzer, webhook_url=None, debounce=0.5):
         self.analyzer = analyzer
         self.webhook_url = webhook_url
         self.history = {}
+        # Editors fire several events per save; wait this long for a burst to settle
+        self.debounce = debounce
+        self._timers = {}
+        self._timers_lock = threading.Lock()
+        # One check per file at a time; its incremental index is not thread-safe
+        self._check_locks = {}
+        self._last_results = {}
 
     def on_modified(self, event):
         if event.is_directory:
             return
 
-        if not any(event.src_path.endswith(ext)
-                  for ext in ['.md', '.txt', '.policy']):
+        # Text, Markdown, HTML, Word and PDF policies, but not the reports written here
+        path = event.src_path.lower()
+        if not path.endswith(supported_suffixes()) or path.endswith(REPORT_SUFFIX):
             return
 
-        self.check_policy(event.src_path)
+        self.schedule_check(event.src_path)
+
+    def schedule_check(self, policy_path):
+        """Coalesce a burst of events for one file into a single check."""
+        with self._timers_lock:
+            timer = self._timers.pop(policy_path, None)
+            if timer is not None:
+                timer.cancel()
+            timer = threading.Timer(self.debounce, self._run_check, args=(policy_path,))
+            timer.daemon = True
+            self._timers[policy_path] = timer
+            timer.start()
+
+    def _run_check(self, policy_path):
+        with self._timers_lock:
+            self._timers.pop(policy_path, None)
+            check_lock = self._check_locks.setdefault(policy_path, threading.Lock())
+        # A save during a running check waits for it, then checks the newer text
+        with check_lock:
+            self.check_policy(policy_path)
 
     def check_policy(self, policy_path):
         """Check a policy file for compliance."""
         try:
             print(f"\nChecking modified policy: {policy_path}")
 
-            # Read and analyze policy
-            with open(policy_path, 'r') as f:
-                content = f.read()
+            # Read and analyze policy; unchanged documents reuse their extracted text
+            content = extract_document(policy_path).read_text()
 
-            result = self.analyzer.check_compliance(content)
+            # Only the paragraphs edited since the last check are re-scanned
+            result = self.analyzer.check_compliance_incremental(
+                policy_path, content, policy_id=policy_path
+            )
 
             # Store result in history
             self.history[policy_path] = {
@@ -48,8 +82,14 @@ class PolicyMonitor(FileSystemEventHandler):
             print(f"Score: {result.score:.2f}")
             print(f"Status: {'PASS' if result.is_compliant else 'FAIL'}")
 
+            # Saves that leave the findings unchanged keep the existing report
+            findings = (result.category_scores, result.found_patterns, result.proximity_scores)
+            if self._last_results.get(policy_path) == findings:
+                return
+            self._last_results[policy_path] = findings
+
             # Generate report name
-            report_path = Path(policy_path).with_suffix('.report.pdf')
+            report_path = Path(policy_path).with_suffix(REPORT_SUFFIX)
 
             # Generate PDF report
             from ai_governance_tool.report import generate_pdf_report
@@ -86,14 +126,23 @@ def main():
     parser = argparse.ArgumentParser(description='Monitor policies for changes')
     parser.add_argument('watch_dir', help='Directory to monitor')
     parser.add_argument('--webhook', help='Webhook URL for notifications')
+    parser.add_argument('--debounce', type=float, default=0.5,
+                        help='Seconds to wait for a burst of file events to settle')
+    parser.add_argument('--metrics-port', type=int,
+                        help='Serve /metrics (Prometheus) and /metrics.json on this port')
     args = parser.parse_args()
 
-    # Initialize analyzer
+    # Initialize analyzer; saves that restore an earlier text reuse its cached result
     analyzer = ComplianceAnalyzer()
+    analyzer.enable_result_cache(persistent=True)
+    if args.metrics_port is not None:
+        from metrics import serve_metrics
+        serve_metrics(analyzer.enable_metrics(), args.metrics_port)
+        print(f"Metrics: http://127.0.0.1:{args.metrics_port}/metrics")
 
     # Create observer
     observer = Observer()
-    monitor = PolicyMonitor(analyzer, args.webhook)
+    monitor = PolicyMonitor(analyzer, args.webhook, args.debounce)
     observer.schedule(monitor, args.watch_dir, recursive=True)
     observer.start()
 
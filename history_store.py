@@ -0,0 +1,382 @@
+"""SQLite persistence for compliance history with batched, write-behind inserts."""
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+import json
+import sqlite3
+import threading
+
+TimeBound = Union[str, datetime, None]
+
+_EPOCH = datetime(1970, 1, 1)
+
+def to_epoch(value: Union[str, datetime]) -> float:
+    """Convert an ISO timestamp or datetime to the seconds stored in ``recorded_at``.
+
+    History timestamps are naive local times, so they are counted from a naive
+    epoch; aware datetimes are converted to local time first.
+    """
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is not None:
+        value = value.astimezone().replace(tzinfo=None)
+    return (value - _EPOCH).total_seconds()
+
+# Each entry upgrades the schema by one version, tracked in PRAGMA user_version
+MIGRATIONS: List[List[str]] = [
+    # 1: original schema
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS compliance_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp TEXT,
+            overall_score REAL,
+            is_compliant INTEGER,
+            category_scores TEXT,
+            found_patterns TEXT
+        )
+        ''',
+    ],
+    # 2: typed time and policy columns, per-category scores and query indexes
+    [
+        "ALTER TABLE compliance_history ADD COLUMN recorded_at REAL",
+        "ALTER TABLE compliance_history ADD COLUMN policy_id TEXT",
+        "UPDATE compliance_history SET recorded_at = (julianday(timestamp) - 2440587.5) * 86400.0",
+        '''
+        CREATE TABLE compliance_category_scores (
+            history_id INTEGER NOT NULL REFERENCES compliance_history(id),
+            category TEXT NOT NULL,
+            score REAL NOT NULL,
+            PRIMARY KEY (history_id, category)
+        ) WITHOUT ROWID
+        ''',
+        '''
+        INSERT INTO compliance_category_scores (history_id, category, score)
+        SELECT h.id, j.key, j.value
+        FROM compliance_history h, json_each(h.category_scores) j
+        ''',
+        "CREATE INDEX idx_history_recorded_at ON compliance_history (recorded_at, id)",
+        "CREATE INDEX idx_history_policy ON compliance_history (policy_id, recorded_at, id)",
+        "CREATE INDEX idx_history_status ON compliance_history (is_compliant, recorded_at, id)",
+    ],
+    # 3: on-disk tier of the result cache
+    [
+        '''
+        CREATE TABLE compliance_result_cache (
+            key TEXT PRIMARY KEY,
+            created_at REAL NOT NULL,
+            result TEXT NOT NULL
+        )
+        ''',
+        "CREATE INDEX idx_result_cache_created_at ON compliance_result_cache (created_at)",
+    ],
+    # 4: match positions of every pattern, serialized by match_index.MatchIndex
+    [
+        "ALTER TABLE compliance_history ADD COLUMN match_index BLOB",
+    ],
+]
+
+@dataclass
+class HistoryRecord:
+    """One compliance check as written to the history tables."""
+    timestamp: str
+    overall_score: float
+    is_compliant: bool
+    category_scores: Dict[str, float]
+    found_patterns: Dict[str, List[Tuple[str, str]]]
+    policy_id: Optional[str] = None
+    match_index: Optional[bytes] = None
+
+@dataclass
+class HistoryPage:
+    """A page of history rows, newest first, with the cursor for the next page."""
+    results: List[Dict[str, Any]]
+    next_cursor: Optional[str] = None
+
+@dataclass
+class HistoryFilter:
+    """Conditions shared by history queries and aggregates."""
+    start: TimeBound = None
+    end: TimeBound = None
+    min_score: Optional[float] = None
+    max_score: Optional[float] = None
+    is_compliant: Optional[bool] = None
+    policy_id: Optional[str] = None
+
+    def to_sql(self, alias: str = "h") -> Tuple[str, List[Any]]:
+        clauses: List[str] = []
+        params: List[Any] = []
+        if self.start is not None:
+            clauses.append(f"{alias}.recorded_at >= ?")
+            params.append(to_epoch(self.start))
+        if self.end is not None:
+            clauses.append(f"{alias}.recorded_at <= ?")
+            params.append(to_epoch(self.end))
+        if self.min_score is not None:
+            clauses.append(f"{alias}.overall_score >= ?")
+            params.append(self.min_score)
+        if self.max_score is not None:
+            clauses.append(f"{alias}.overall_score <= ?")
+            params.append(self.max_score)
+        if self.is_compliant is not None:
+            clauses.append(f"{alias}.is_compliant = ?")
+            params.append(1 if self.is_compliant else 0)
+        if self.policy_id is not None:
+            clauses.append(f"{alias}.policy_id = ?")
+            params.append(self.policy_id)
+        return " AND ".join(clauses) or "1", params
+
+class HistoryStore:
+    """Own one long-lived SQLite connection per analyzer.
+
+    Durable writes are committed before ``append`` returns. Non-durable writes,
+    and statements queued with ``enqueue``, are flushed by a background thread
+    in a single transaction once ``batch_size`` are pending or
+    ``flush_interval`` seconds have passed. ``query`` flushes the queue first,
+    so callers always see their own writes; ``read`` does not.
+    """
+
+    INSERT_SQL = '''
+    INSERT INTO compliance_history
+    (timestamp, recorded_at, overall_score, is_compliant, category_scores, found_patterns, policy_id,
+     match_index)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    '''
+    INSERT_CATEGORY_SQL = '''
+    INSERT INTO compliance_category_scores (history_id, category, score)
+    VALUES (?, ?, ?)
+    '''
+
+    def __init__(self, db_path: str, batch_size: int = 100, flush_interval: float = 1.0):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self._conn: Optional[sqlite3.Connection] = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # WAL keeps committed transactions safe across application crashes without an fsync per commit
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+
+        self._db_lock = threading.RLock()
+        self._pending: List[HistoryRecord] = []
+        self._pending_statements: List[Tuple[str, Sequence]] = []
+        self._pending_cond = threading.Condition()
+        self._flusher: Optional[threading.Thread] = None
+        self._closing = False
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            raise sqlite3.ProgrammingError("History store is closed")
+        return self._conn
+
+    def initialize(self):
+        """Create the history tables or upgrade them to the latest schema version."""
+        with self._db_lock:
+            conn = self.conn
+            # IMMEDIATE takes the write lock up front, so concurrent processes migrate once
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                version = conn.execute("PRAGMA user_version").fetchone()[0]
+                for statements in MIGRATIONS[version:]:
+                    for statement in statements:
+                        conn.execute(statement)
+                conn.execute(f"PRAGMA user_version = {len(MIGRATIONS)}")
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+    def append(self, record: HistoryRecord, durable: bool = True):
+        """Insert one history record, either committed now or queued for the next batch."""
+        if durable:
+            self.append_many([record])
+            return
+
+        with self._pending_cond:
+            self._pending.append(record)
+            self._ensure_flusher()
+            if self._pending_count() >= self.batch_size:
+                self._pending_cond.notify()
+
+    def enqueue(self, sql: str, params: Sequence = ()):
+        """Queue a write statement to be committed with the next batch of records."""
+        with self._pending_cond:
+            self._pending_statements.append((sql, tuple(params)))
+            self._ensure_flusher()
+            if self._pending_count() >= self.batch_size:
+                self._pending_cond.notify()
+
+    def append_many(self, records: Sequence[HistoryRecord]):
+        """Commit records, together with anything still queued, in one transaction."""
+        with self._pending_cond:
+            batch = self._pending + list(records)
+            statements = self._pending_statements
+            self._pending, self._pending_statements = [], []
+        self._write(batch, statements)
+
+    def flush(self):
+        """Commit every queued record."""
+        self.append_many([])
+
+    def query(self, sql: str, params: Sequence = ()) -> List[tuple]:
+        """Run a read query after flushing queued writes."""
+        self.flush()
+        return self.read(sql, params)
+
+    def read(self, sql: str, params: Sequence = ()) -> List[tuple]:
+        """Run a read query against committed data only, leaving queued writes queued."""
+        with self._db_lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def execute(self, sql: str, params: Sequence = ()):
+        """Run a single write statement in its own transaction."""
+        with self._db_lock, self.conn:
+            self.conn.execute(sql, params)
+
+    def query_page(self, filters: HistoryFilter, limit: int = 100,
+                   cursor: Optional[str] = None) -> HistoryPage:
+        """Return history rows matching ``filters``, newest first, using keyset pagination."""
+        where, params = filters.to_sql()
+        if cursor is not None:
+            recorded_at, last_id = cursor.split("/")
+            where += " AND (h.recorded_at, h.id) < (?, ?)"
+            params += [float(recorded_at), int(last_id)]
+
+        rows = self.query(f'''
+        SELECT h.id, h.timestamp, h.recorded_at, h.policy_id, h.overall_score,
+               h.is_compliant, h.category_scores
+        FROM compliance_history h
+        WHERE {where}
+        ORDER BY h.recorded_at DESC, h.id DESC
+        LIMIT ?
+        ''', params + [limit + 1])
+
+        results = [
+            {
+                'id': row_id,
+                'timestamp': timestamp,
+                'policy_id': policy_id,
+                'score': score,
+                'is_compliant': bool(is_compliant),
+                'category_scores': json.loads(category_scores),
+            }
+            for row_id, timestamp, _, policy_id, score, is_compliant, category_scores in rows[:limit]
+        ]
+        next_cursor = None
+        if len(rows) > limit:
+            last = rows[limit - 1]
+            next_cursor = f"{last[2]!r}/{last[0]}"
+        return HistoryPage(results=results, next_cursor=next_cursor)
+
+    def query_rows(self, filters: HistoryFilter, limit: Optional[int] = None) -> List[tuple]:
+        """Return (timestamp, policy_id, score, is_compliant, category_scores, found_patterns,
+        match_index) for matching rows, oldest first."""
+        where, params = filters.to_sql()
+        limit_sql = ""
+        if limit is not None:
+            limit_sql = "LIMIT ?"
+            params.append(limit)
+        return self.query(f'''
+        SELECT h.timestamp, h.policy_id, h.overall_score, h.is_compliant, h.category_scores,
+               h.found_patterns, h.match_index
+        FROM compliance_history h
+        WHERE {where}
+        ORDER BY h.recorded_at, h.id
+        {limit_sql}
+        ''', params)
+
+    def match_index(self, history_id: int) -> Optional[bytes]:
+        """Return the serialized match index stored with a history row, if any."""
+        rows = self.query("SELECT match_index FROM compliance_history WHERE id = ?", (history_id,))
+        return rows[0][0] if rows else None
+
+    def category_aggregates(self, filters: HistoryFilter) -> Dict[str, Dict[str, float]]:
+        """Return count, mean, min and max score per category for matching rows."""
+        where, params = filters.to_sql()
+        rows = self.query(f'''
+        SELECT c.category, COUNT(*), AVG(c.score), MIN(c.score), MAX(c.score)
+        FROM compliance_history h
+        JOIN compliance_category_scores c ON c.history_id = h.id
+        WHERE {where}
+        GROUP BY c.category
+        ORDER BY c.category
+        ''', params)
+        return {
+            category: {'count': count, 'mean': mean, 'min': low, 'max': high}
+            for category, count, mean, low, high in rows
+        }
+
+    def close(self):
+        """Flush queued records, stop the background flusher and close the connection."""
+        if self._conn is None:
+            return
+        with self._pending_cond:
+            self._closing = True
+            self._pending_cond.notify()
+        if self._flusher is not None:
+            self._flusher.join()
+            self._flusher = None
+        self.flush()
+        with self._db_lock:
+            self._conn.close()
+            self._conn = None
+
+    def __enter__(self) -> "HistoryStore":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _write(self, records: Sequence[HistoryRecord], statements: Sequence[Tuple[str, Sequence]] = ()):
+        if not records and not statements:
+            return
+        with self._db_lock, self.conn:
+            conn = self.conn
+            for sql, params in statements:
+                conn.execute(sql, params)
+            for record in records:
+                cursor = conn.execute(self.INSERT_SQL, (
+                    record.timestamp,
+                    to_epoch(record.timestamp),
+                    record.overall_score,
+                    1 if record.is_compliant else 0,
+                    json.dumps(record.category_scores),
+                    json.dumps(record.found_patterns),
+                    record.policy_id,
+                    record.match_index
+                ))
+                conn.executemany(self.INSERT_CATEGORY_SQL, [
+                    (cursor.lastrowid, category, score)
+                    for category, score in record.category_scores.items()
+                ])
+
+    def _pending_count(self) -> int:
+        # Caller holds self._pending_cond
+        return len(self._pending) + len(self._pending_statements)
+
+    def _ensure_flusher(self):
+        # Caller holds self._pending_cond
+        if self._flusher is None and not self._closing:
+            self._flusher = threading.Thread(
+                target=self._flush_loop, name="history-flusher", daemon=True
+            )
+            self._flusher.start()
+
+    def _flush_loop(self):
+        while True:
+            with self._pending_cond:
+                if not self._closing and self._pending_count() < self.batch_size:
+                    self._pending_cond.wait(self.flush_interval)
+                if self._closing:
+                    return
+                batch, self._pending = self._pending, []
+                statements, self._pending_statements = self._pending_statements, []
+            try:
+                self._write(batch, statements)
+            except sqlite3.Error:
+                # Keep the records queued; the next flush retries them
+                with self._pending_cond:
+                    self._pending[:0] = batch
+                    self._pending_statements[:0] = statements
@@ -0,0 +1,170 @@
+"""Incremental re-analysis of documents that are edited in place."""
+
+from bisect import bisect_left, bisect_right
+from typing import List, Optional, Tuple
+import hashlib
+import re
+
+from pattern_engine import CompiledRuleEngine, Span
+from proximity import WORD_PATTERN, Mark, WordIndex
+from streaming import DEFAULT_OVERLAP
+
+# Paragraphs end after a run of whitespace containing a blank line, so every
+# segment boundary falls between words
+SEGMENT_BREAK = re.compile(r"\n[^\S\n]*\n\s*")
+
+# (content hash, length, word count)
+Segment = Tuple[bytes, int, int]
+
+def split_segments(text: str) -> List[str]:
+    """Split text into paragraphs whose concatenation is the original text."""
+    pieces = []
+    start = 0
+    for m in SEGMENT_BREAK.finditer(text):
+        pieces.append(text[start:m.end()])
+        start = m.end()
+    if start < len(text) or not pieces:
+        pieces.append(text[start:])
+    return pieces
+
+def _segment_hash(piece: str) -> bytes:
+    return hashlib.blake2b(piece.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+
+class DocumentIndex:
+    """Per-paragraph index of one document's pattern matches.
+
+    ``update`` diffs the new text against the previous version by paragraph
+    hash and re-scans only the changed paragraphs plus ``margin`` characters
+    on each side; matches in the untouched prefix are kept and matches in the
+    untouched suffix are shifted. As with streaming, the result equals a full
+    scan as long as no match (with its look-around) spans more than
+    ``margin`` characters. When the scan state cannot be shown to resync
+    after the edit, the whole document is scanned again.
+    """
+
+    def __init__(self, engine: CompiledRuleEngine, margin: int = DEFAULT_OVERLAP):
+        self.engine = engine
+        self.margin = margin
+        self.text = ""
+        self.segments: List[Segment] = []
+        self.spans: List[List[Span]] = [[] for _ in engine.patterns]
+        self.marks: List[List[Mark]] = [[] for _ in engine.patterns]
+        # Characters scanned by the last update, for monitoring
+        self.rescanned = 0
+
+    def update(self, text: str) -> bool:
+        """Bring the index up to date with ``text``; returns False if nothing changed."""
+        pieces = split_segments(text)
+        hashes = [_segment_hash(piece) for piece in pieces]
+        old = self.segments
+
+        prefix = 0
+        limit = min(len(old), len(hashes))
+        while prefix < limit and old[prefix][0] == hashes[prefix]:
+            prefix += 1
+        suffix = 0
+        while (suffix < limit - prefix
+               and old[len(old) - 1 - suffix][0] == hashes[len(hashes) - 1 - suffix]):
+            suffix += 1
+
+        if prefix == len(old) == len(hashes):
+            self.text = text
+            self.rescanned = 0
+            return False
+
+        # Word counts of unchanged paragraphs carry over; only new ones are tokenized
+        segments: List[Segment] = old[:prefix]
+        for idx in range(prefix, len(pieces) - suffix):
+            piece = pieces[idx]
+            segments.append((hashes[idx], len(piece), len(WORD_PATTERN.findall(piece))))
+        if suffix:
+            segments.extend(old[len(old) - suffix:])
+
+        if not old or not self._rescan(text, segments, prefix, suffix):
+            self._rescan_all(text, segments)
+        self.text = text
+        self.segments = segments
+        return True
+
+    def _rescan_all(self, text: str, segments: List[Segment]):
+        self.spans = self.engine.scan(text)
+        words = WordIndex(text)
+        self.marks = [words.marks(spans) for spans in self.spans]
+        self.rescanned = len(text)
+
+    def _rescan(self, text: str, segments: List[Segment], prefix: int, suffix: int) -> bool:
+        """Re-scan the edited region in place; returns False if a full scan is needed."""
+        old = self.segments
+        margin = self.margin
+        changed_start = sum(length for _, length, _ in segments[:prefix])
+        old_changed_end = len(self.text) - sum(length for _, length, _ in old[len(old) - suffix:])
+        changed_end = len(text) - (len(self.text) - old_changed_end)
+        shift = changed_end - old_changed_end
+        word_shift = (sum(words for _, _, words in segments[prefix:len(segments) - suffix])
+                      - sum(words for _, _, words in old[prefix:len(old) - suffix]))
+
+        # Region to re-scan, widened to paragraph boundaries so word counts stay exact
+        offsets = [0]
+        for _, length, _ in segments:
+            offsets.append(offsets[-1] + length)
+        scan_from = max(0, changed_start - margin)
+        accept_to = changed_end + margin
+        scan_to = min(len(text), accept_to + margin)
+        first_segment = bisect_right(offsets, scan_from) - 1
+        last_segment = bisect_left(offsets, scan_to)
+        region_start, region_end = offsets[first_segment], offsets[last_segment]
+        words_before = sum(words for _, _, words in segments[:first_segment])
+
+        kept: List[List[Span]] = []
+        starts: List[int] = []
+        for spans in self.spans:
+            keep = bisect_left(spans, (scan_from, -1))
+            kept.append(keep)
+            starts.append(max(scan_from, spans[keep - 1][1]) if keep else scan_from)
+
+        hits = self.engine.scan(text, scan_from, scan_to, starts)
+        at_end = scan_to == len(text)
+        words = WordIndex(text[region_start:region_end])
+
+        new_spans: List[List[Span]] = []
+        new_marks: List[List[Mark]] = []
+        for idx, found in enumerate(hits):
+            old_spans, old_marks = self.spans[idx], self.marks[idx]
+            if not at_end:
+                found = [span for span in found if span[0] < accept_to]
+                # Both scans continue identically after the window if neither has a
+                # match running past it, or both end on the same unchanged match
+                resume = bisect_left(old_spans, (accept_to - shift, -1))
+                new_last = found[-1] if found else (starts[idx], starts[idx])
+                old_last = old_spans[resume - 1] if resume else (0, 0)
+                same_last = (new_last[0] >= changed_end
+                             and new_last == (old_last[0] + shift, old_last[1] + shift))
+                if not same_last and (new_last[1] > accept_to or old_last[1] > accept_to - shift):
+                    return False
+            else:
+                resume = len(old_spans)
+
+            region_marks = [
+                (start + region_start, end + region_start, first + words_before, last + words_before)
+                for start, end, first, last in words.marks(
+                    [(start - region_start, end - region_start) for start, end in found]
+                )
+            ]
+            new_spans.append(
+                old_spans[:kept[idx]] + found
+                + [(start + shift, end + shift) for start, end in old_spans[resume:]]
+            )
+            new_marks.append(
+                old_marks[:kept[idx]] + region_marks
+                + [(start + shift, end + shift, first + word_shift, last + word_shift)
+                   for start, end, first, last in old_marks[resume:]]
+            )
+
+        self.spans = new_spans
+        self.marks = new_marks
+        self.rescanned = scan_to - scan_from
+        return True
+
+    def first_matches(self) -> List[Optional[str]]:
+        """Return the text of each pattern's first match, or None when it has none."""
+        return [self.text[spans[0][0]:spans[0][1]] if spans else None for spans in self.spans]
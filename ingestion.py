@@ -0,0 +1,382 @@
+"""Text extraction from PDF, Word, HTML and Markdown policies, cached by file hash."""
+
+from dataclasses import dataclass
+from html.parser import HTMLParser
+from itertools import repeat
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+import hashlib
+import os
+import re
+import tempfile
+
+from streaming import DEFAULT_CHUNK_SIZE, iter_file_chunks
+
+if TYPE_CHECKING:
+    from main import ComplianceAnalyzer, ComplianceResult
+
+# Bump when extracted text changes for every extractor, so cached text is re-extracted
+EXTRACTION_FORMAT = 1
+# Overrides the default extracted-text directory
+CACHE_DIR_ENV = "AI_GOVERNANCE_EXTRACT_CACHE_DIR"
+# Overrides the largest total size, in bytes, the extracted-text directory may grow to
+CACHE_MAX_BYTES_ENV = "AI_GOVERNANCE_EXTRACT_CACHE_MAX_BYTES"
+DEFAULT_CACHE_MAX_BYTES = 1 << 30
+# Bytes hashed per read when fingerprinting a source file
+HASH_BLOCK_SIZE = 1 << 20
+
+PathLike = Union[str, Path]
+
+class ExtractionError(ValueError):
+    """Raised when a document's text cannot be extracted."""
+
+class Extractor:
+    """Turns one kind of document into plain text, yielded in chunks.
+
+    Subclass, set ``name`` and ``suffixes``, implement ``extract`` and pass an
+    instance to ``register_extractor``. Bump ``version`` when the output
+    changes so cached text is extracted again. Extractors are sent to worker
+    processes, so keep them picklable. ``passthrough`` extractors read plain
+    text files, which are analyzed in place instead of being cached.
+    """
+    name = "text"
+    suffixes: Tuple[str, ...] = ()
+    version = 1
+    passthrough = False
+
+    def extract(self, path: Path) -> Iterator[str]:
+        raise NotImplementedError
+
+class TextExtractor(Extractor):
+    name = "text"
+    suffixes = (".txt", ".policy")
+    passthrough = True
+
+    def extract(self, path: Path) -> Iterator[str]:
+        return iter_file_chunks(str(path))
+
+# Markdown syntax that is dropped: images and links keep their text, emphasis and code marks go
+_MD_FENCE = re.compile(r"^\s*(?:```|~~~)")
+_MD_LINE_PREFIX = re.compile(r"^\s{0,3}(?:#{1,6}\s+|>\s?)+")
+_MD_LINK = re.compile(r"!?\[([^\]]*)\]\([^)]*\)")
+_MD_EMPHASIS = re.compile(r"(\*{1,3}|`+|~~)(?=\S)(.+?)(?<=\S)\1")
+_MD_UNDERSCORE = re.compile(r"\b(_{1,3})(?=\S)(.+?)(?<=\S)\1\b")  # Not inside snake_case words
+_MD_TAG = re.compile(r"</?[A-Za-z][^>]*>")
+
+class MarkdownExtractor(Extractor):
+    name = "markdown"
+    suffixes = (".md", ".markdown")
+
+    def extract(self, path: Path) -> Iterator[str]:
+        lines: List[str] = []
+        size = 0
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                if _MD_FENCE.match(line):
+                    continue
+                line = _MD_LINE_PREFIX.sub("", line)
+                line = _MD_LINK.sub(r"\1", line)
+                line = _MD_EMPHASIS.sub(r"\2", line)
+                line = _MD_UNDERSCORE.sub(r"\2", line)
+                line = _MD_TAG.sub("", line)
+                lines.append(line)
+                size += len(line)
+                if size >= DEFAULT_CHUNK_SIZE:
+                    yield "".join(lines)
+                    lines, size = [], 0
+        if lines:
+            yield "".join(lines)
+
+class _TextCollector(HTMLParser):
+    # Elements whose content is not document text
+    SKIPPED = {"script", "style", "noscript", "template", "svg"}
+    # Elements that start a new line of text
+    BLOCKS = {"p", "div", "br", "li", "tr", "section", "article", "header", "footer", "table",
+              "h1", "h2", "h3", "h4", "h5", "h6", "ul", "ol", "dl", "dt", "dd", "blockquote", "pre"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts: List[str] = []
+        self.skipping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIPPED:
+            self.skipping += 1
+        elif tag in self.BLOCKS:
+            self.parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIPPED:
+            self.skipping = max(0, self.skipping - 1)
+        elif tag in self.BLOCKS:
+            self.parts.append("\n")
+
+    def handle_data(self, data):
+        if not self.skipping:
+            self.parts.append(data)
+
+    def take(self) -> str:
+        text = "".join(self.parts)
+        self.parts = []
+        return text
+
+class HTMLExtractor(Extractor):
+    name = "html"
+    suffixes = (".html", ".htm")
+
+    def extract(self, path: Path) -> Iterator[str]:
+        collector = _TextCollector()
+        for chunk in iter_file_chunks(str(path), encoding='utf-8'):
+            collector.feed(chunk)
+            yield collector.take()
+        collector.close()
+        yield collector.take()
+
+_WORD_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+class DocxExtractor(Extractor):
+    """Word documents, read from their XML with the standard library; one line per paragraph."""
+    name = "docx"
+    suffixes = (".docx",)
+
+    def extract(self, path: Path) -> Iterator[str]:
+        import xml.etree.ElementTree as ET
+        import zipfile
+
+        # Elements that stand for whitespace in the extracted text
+        separators = {_WORD_NS + "tab": "\t", _WORD_NS + "br": "\n", _WORD_NS + "cr": "\n",
+                      _WORD_NS + "p": "\n"}
+        text, paragraph = _WORD_NS + "t", _WORD_NS + "p"
+        try:
+            with zipfile.ZipFile(path) as archive, archive.open("word/document.xml") as body:
+                parts: List[str] = []
+                size = 0
+                for _, element in ET.iterparse(body):
+                    tag = element.tag
+                    if tag == text and element.text:
+                        parts.append(element.text)
+                        size += len(element.text)
+                    elif tag in separators:
+                        parts.append(separators[tag])
+                    if tag == paragraph:
+                        element.clear()  # Parsed paragraphs are not kept in memory
+                        if size >= DEFAULT_CHUNK_SIZE:
+                            yield "".join(parts)
+                            parts, size = [], 0
+                yield "".join(parts)
+        except (zipfile.BadZipFile, KeyError, ET.ParseError) as e:
+            raise ExtractionError(f"{path}: not a readable Word document: {e}") from None
+
+class PDFExtractor(Extractor):
+    """PDF text, one page at a time; needs pypdf installed."""
+    name = "pdf"
+    suffixes = (".pdf",)
+
+    def extract(self, path: Path) -> Iterator[str]:
+        try:
+            from pypdf import PdfReader
+            from pypdf.errors import PyPdfError
+        except ImportError:
+            raise ExtractionError(f"{path}: pypdf is required to extract PDF text") from None
+        try:
+            for page in PdfReader(str(path)).pages:
+                yield (page.extract_text() or "") + "\n"
+        except PyPdfError as e:
+            raise ExtractionError(f"{path}: not a readable PDF: {e}") from None
+
+_extractors: Dict[str, Extractor] = {}
+
+def register_extractor(extractor: Extractor):
+    """Use ``extractor`` for every file suffix it lists, replacing earlier extractors."""
+    for suffix in extractor.suffixes:
+        _extractors[suffix.lower()] = extractor
+
+# Files whose suffix has no registered extractor are read as plain text
+_text_extractor = TextExtractor()
+
+for _extractor in (_text_extractor, MarkdownExtractor(), HTMLExtractor(), DocxExtractor(), PDFExtractor()):
+    register_extractor(_extractor)
+
+def supported_suffixes() -> Tuple[str, ...]:
+    return tuple(sorted(_extractors))
+
+def get_extractor(path: PathLike) -> Extractor:
+    """Return the extractor registered for a file's suffix; other files are read as plain text."""
+    return _extractors.get(Path(path).suffix.lower(), _text_extractor)
+
+def default_cache_dir() -> Path:
+    """Return the directory extracted text is kept in."""
+    override = os.environ.get(CACHE_DIR_ENV)
+    if override:
+        return Path(override)
+    return Path.home() / ".cache" / "ai_governance_tool" / "extracted"
+
+def default_cache_max_bytes() -> int:
+    """Return the size limit of the extracted-text directory."""
+    override = os.environ.get(CACHE_MAX_BYTES_ENV, "").strip()
+    return int(override) if override else DEFAULT_CACHE_MAX_BYTES
+
+def file_digest(path: PathLike) -> str:
+    """Return the SHA-256 of a file's bytes, read in blocks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+class ExtractionCache:
+    """Extracted text stored as UTF-8 files named after the source file's hash and its extractor.
+
+    Unchanged files map to the same entry wherever they live, so they are
+    never extracted twice; any edit changes the hash. Entries are written
+    atomically, so concurrent workers can share one directory. Each write
+    prunes the least recently used entries once their total size exceeds
+    ``max_bytes``, so superseded versions of edited files do not pile up.
+    """
+
+    def __init__(self, directory: Optional[PathLike] = None, max_bytes: Optional[int] = None):
+        self.directory = Path(directory or default_cache_dir())
+        self.max_bytes = default_cache_max_bytes() if max_bytes is None else max_bytes
+
+    def key(self, digest: str, extractor: Extractor) -> str:
+        header = f"{EXTRACTION_FORMAT}:{extractor.name}:{extractor.version}:{digest}"
+        return hashlib.sha256(header.encode()).hexdigest()
+
+    def path(self, key: str) -> Path:
+        return self.directory / f"{key}.txt"
+
+    def get(self, key: str) -> Optional[Path]:
+        path = self.path(key)
+        try:
+            os.utime(path)  # Marks the entry as recently used for pruning
+        except OSError:
+            return None
+        return path
+
+    def put(self, key: str, chunks: Iterable[str]) -> Path:
+        """Write extracted text chunk by chunk and return the entry's path."""
+        path = self.path(key)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        self.prune(keep=path)
+        return path
+
+    def prune(self, keep: Optional[Path] = None):
+        """Delete the least recently used entries, except ``keep``, until the cache fits ``max_bytes``."""
+        entries = []
+        with os.scandir(self.directory) as scan:
+            for entry in scan:
+                if entry.name.endswith(".txt"):
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue  # Pruned by another worker
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if keep is not None and path == str(keep):
+                continue
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+@dataclass
+class ExtractedDocument:
+    source: str                 # the original file
+    text_path: str              # where its plain text is read from
+    extractor: str
+    cached: bool = False        # the text came from the cache without extracting
+    encoding: Optional[str] = "utf-8"
+
+    def chunks(self, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[str]:
+        """Yield the text in chunks, e.g. for ``ComplianceAnalyzer.check_compliance_stream``."""
+        return iter_file_chunks(self.text_path, chunk_size, self.encoding)
+
+    def read_text(self) -> str:
+        return Path(self.text_path).read_text(encoding=self.encoding)
+
+def extract_document(path: PathLike, cache: Optional[ExtractionCache] = None) -> ExtractedDocument:
+    """Extract a document's text into the cache, unless an unchanged copy was extracted before."""
+    return _extract(Path(path), get_extractor(path), cache or ExtractionCache())
+
+def _extract(path: Path, extractor: Extractor, cache: ExtractionCache) -> ExtractedDocument:
+    if extractor.passthrough:
+        return ExtractedDocument(str(path), str(path), extractor.name, encoding=None)
+    key = cache.key(file_digest(path), extractor)
+    text_path = cache.get(key)
+    if text_path is not None:
+        return ExtractedDocument(str(path), str(text_path), extractor.name, cached=True)
+    try:
+        text_path = cache.put(key, extractor.extract(path))
+    except (ExtractionError, OSError):
+        raise
+    except Exception as e:
+        # Third-party parsers raise all kinds of errors on malformed files
+        raise ExtractionError(f"{path}: {extractor.name} extraction failed: {e}") from None
+    return ExtractedDocument(str(path), str(text_path), extractor.name)
+
+def _extract_quietly(path: Path, extractor: Extractor,
+                     cache: ExtractionCache) -> Tuple[Optional[ExtractedDocument], Optional[str]]:
+    try:
+        return _extract(path, extractor, cache), None
+    except (ExtractionError, OSError) as e:
+        return None, str(e)
+
+def extract_documents(paths: Sequence[PathLike], workers: int = 1,
+                      cache: Optional[ExtractionCache] = None
+                      ) -> Iterator[Tuple[str, Optional[ExtractedDocument], Optional[str]]]:
+    """Extract many documents, in a process pool when ``workers`` > 1.
+
+    Yields (path, document, error) in input order as soon as each document
+    and the ones before it are done; a file that cannot be extracted yields
+    its error instead of stopping the run. Workers write the text to the
+    cache and only its location crosses back to this process.
+    """
+    paths = [Path(path) for path in paths]
+    # Looked up here, so extractors registered in this process also run in the workers
+    extractors = [get_extractor(path) for path in paths]
+    cache = cache or ExtractionCache()
+    if workers <= 1 or len(paths) <= 1:
+        for path, extractor in zip(paths, extractors):
+            document, error = _extract_quietly(path, extractor, cache)
+            yield str(path), document, error
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    chunksize = max(1, min(32, len(paths) // (workers * 4)))
+    with ProcessPoolExecutor(min(workers, len(paths))) as pool:
+        outcomes = pool.map(_extract_quietly, paths, extractors, repeat(cache), chunksize=chunksize)
+        for path, (document, error) in zip(paths, outcomes):
+            yield str(path), document, error
+
+def check_documents(analyzer: "ComplianceAnalyzer", paths: Sequence[PathLike], min_score: float = 0.6,
+                    workers: int = 1, store: bool = True, cache: Optional[ExtractionCache] = None
+                    ) -> Iterator[Tuple[str, Optional["ComplianceResult"], Optional[str]]]:
+    """Extract policies in parallel and stream each one's text into ``analyzer``.
+
+    Yields (path, result, error) in input order. Results are recorded under
+    the file's path as policy ID and written to history in batches.
+    """
+    for path, document, error in extract_documents(paths, workers, cache):
+        if error is not None:
+            yield path, None, error
+            continue
+        result = analyzer.check_compliance_stream(
+            document.chunks(), min_score=min_score, durable=False, policy_id=path, store=store
+        )
+        yield path, result, None
+    if store:
+        analyzer.flush()
@@ -1,45 +1,128 @@
-from typing import Dict, List, Tuple, Optional
-from dataclasses import dataclass
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, List, Tuple, Optional
+from copy import deepcopy
+from dataclasses import asdict, dataclass, field, replace
 from datetime import datetime
+import base64
 import json
 import re
-import sqlite3
+import sys
+import threading
+import warnings
 from pathlib import Path
-import matplotlib.pyplot as plt
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-import numpy as np
 from collections import defaultdict
-
-@dataclass
+from pattern_engine import CompiledRuleEngine
+from ruleset_registry import CompiledRuleset, ProximityPair, default_registry, ruleset_spec
+from proximity import ProximitySettings, ProximityTracker, WordIndex, proximity_score
+from streaming import DEFAULT_OVERLAP, StreamScanner
+from incremental import DocumentIndex
+from match_guard import MatchGuard, MatchTimeout
+from match_index import MatchIndex, MatchIndexBuilder, Span, load_match_index
+from metrics import (BYTES_ANALYZED, DOCUMENTS, PATTERN_MATCHES, MetricsRecorder, MetricsRegistry,
+                     MetricsSink, timed)
+from regex_safety import UnsafePatternWarning
+from result_cache import DEFAULT_TTL, MemoryCacheTier, ResultCache, SQLiteCacheTier, make_cache_key
+from history_store import HistoryFilter, HistoryPage, HistoryRecord, HistoryStore, TimeBound
+
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
+    from result_batch import ResultBatch
+
+# Slotted dataclasses (Python 3.10+) have no per-instance __dict__
+_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+@dataclass(**_SLOTS)
 class CompliancePattern:
     pattern: str
     weight: float
     category: str
     description: str
 
-@dataclass
+@dataclass(**_SLOTS)
 class ComplianceCategory:
     name: str
     patterns: List[CompliancePattern]
     required_score: float
     weight: float
 
-@dataclass
+@dataclass(**_SLOTS)
 class ComplianceResult:
+    """Outcome of one compliance check.
+
+    Category names, patterns, matched text and proximity keys are interned,
+    so results share their key strings with each other and with the ruleset.
+    For many results at once, ``result_batch.ResultBatch`` stores the same
+    data in columns.
+    """
     is_compliant: bool
     score: float
     category_scores: Dict[str, float]
     found_patterns: Dict[str, List[Tuple[str, str]]]  # category -> [(pattern, matched_text)]
     timestamp: str
     proximity_scores: Dict[str, float]
+    policy_id: Optional[str] = None
+    # Offsets of every match per pattern, for highlighting and diffing without a re-scan
+    match_index: Optional[MatchIndex] = field(default=None, repr=False, compare=False)
+
+    def __reduce__(self):
+        # Results unpickled from worker processes share key strings with local ones
+        return _interned_result, (self.is_compliant, self.score, self.category_scores,
+                                  self.found_patterns, self.timestamp, self.proximity_scores,
+                                  self.policy_id, self.match_index)
+
+def _interned_result(is_compliant: bool, score: float, category_scores: Dict[str, float],
+                     found_patterns: Dict[str, List[Tuple[str, str]]], timestamp: str,
+                     proximity_scores: Dict[str, float], policy_id: Optional[str] = None,
+                     match_index: Optional[MatchIndex] = None) -> ComplianceResult:
+    intern = sys.intern
+    return ComplianceResult(
+        is_compliant=is_compliant,
+        score=score,
+        category_scores={intern(k): v for k, v in category_scores.items()},
+        found_patterns={
+            intern(category): [(intern(pattern), intern(text)) for pattern, text in matches]
+            for category, matches in found_patterns.items()
+        },
+        timestamp=timestamp,
+        proximity_scores={intern(k): v for k, v in proximity_scores.items()},
+        policy_id=policy_id,
+        match_index=match_index
+    )
+
+def _result_to_json(result: ComplianceResult) -> str:
+    data = asdict(replace(result, match_index=None))
+    if result.match_index is not None:
+        data['match_index'] = base64.b64encode(result.match_index.to_bytes()).decode()
+    return json.dumps(data)
+
+def _result_from_json(payload: str) -> ComplianceResult:
+    """Rebuild a result serialized with ``_result_to_json``."""
+    data = json.loads(payload)
+    if data.get('match_index') is not None:
+        data['match_index'] = MatchIndex.from_bytes(base64.b64decode(data['match_index']))
+    return _interned_result(**data)
 
 class ComplianceAnalyzer:
-    def __init__(self, db_path: str = "compliance_history.db"):
+    def __init__(self, db_path: str = "compliance_history.db",
+                 ruleset: Optional[CompiledRuleset] = None,
+                 proximity: Optional[ProximitySettings] = None,
+                 match_timeout: Optional[float] = None):
         self.db_path = db_path
         self.initialize_db()
+        self._ruleset: Optional[CompiledRuleset] = None
+        self._ruleset_spec: Optional[List] = None
+        self.result_cache: Optional[ResultCache] = None
+        self._documents: Dict[str, DocumentIndex] = {}
+        # Stage timers and counters; None keeps instrumentation to one attribute check
+        self.metrics: Optional[MetricsSink] = None
+        self._metric_labels: Optional[Tuple[str, List[Dict[str, str]]]] = None
+        # Which pattern pairs are scored for proximity; part of the ruleset fingerprint
+        self.proximity = proximity or ProximitySettings()
+        # Seconds a document's pattern matching may take before MatchTimeout; None scans
+        # in-process without a limit. Incremental checks then fall back to guarded full
+        # scans, and streamed checks refuse rulesets with backtracking-prone patterns.
+        self.match_timeout = match_timeout
+        self._match_guard: Optional[MatchGuard] = None
+        self._match_guard_lock = threading.Lock()
 
         # Define compliance patterns with regex and proximity requirements
         self.categories = [
@@ -125,140 +208,507 @@ class ComplianceAnalyzer:
                 weight=0.3
             )
         ]
+        if ruleset is not None:
+            self.use_ruleset(ruleset)
 
     def initialize_db(self):
         """Initialize SQLite database for historical tracking."""
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-
-        c.execute('''
-        CREATE TABLE IF NOT EXISTS compliance_history (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            timestamp TEXT,
-            overall_score REAL,
-            is_compliant INTEGER,
-            category_scores TEXT,
-            found_patterns TEXT
-        )
-        ''')
+        self.history = HistoryStore(self.db_path)
+        self.history.initialize()
+
+    def enable_result_cache(self, max_entries: int = 1024, ttl: Optional[float] = DEFAULT_TTL,
+                            persistent: bool = False, max_disk_entries: int = 100000) -> ResultCache:
+        """Cache results by text, threshold and ruleset so unchanged documents skip the scan.
+
+        The in-memory tier is an LRU of ``max_entries`` results. With
+        ``persistent=True`` results are also kept in the history database, so
+        they survive restarts and are shared by analyzers on the same file.
+        """
+        tiers = [MemoryCacheTier(max_entries, ttl)]
+        if persistent:
+            tiers.append(SQLiteCacheTier(self.history, max_disk_entries, ttl))
+        self.result_cache = ResultCache(tiers)
+        return self.result_cache
+
+    def enable_metrics(self, sink: Optional[MetricsSink] = None) -> MetricsSink:
+        """Time the scan, proximity, scoring, persistence and report stages and count
+        documents, bytes analyzed and matches per pattern into ``sink``.
+
+        Defaults to a new in-process ``MetricsRegistry``. Analyses run in process
+        pools by ``check_compliance_async`` are recorded in the worker and
+        replayed into the sink.
+        """
+        self.metrics = sink if sink is not None else MetricsRegistry()
+        return self.metrics
+
+    def _record_document(self, ruleset: CompiledRuleset, size: int, counts: Iterable[int]):
+        """Count one analyzed document of ``size`` bytes and its matches per pattern."""
+        metrics = self.metrics
+        if self._metric_labels is None or self._metric_labels[0] != ruleset.fingerprint:
+            self._metric_labels = (ruleset.fingerprint, [
+                {'category': category.name, 'pattern': p.description}
+                for category in ruleset.categories for p in category.patterns
+            ])
+        metrics.increment(DOCUMENTS)
+        metrics.increment(BYTES_ANALYZED, size)
+        for labels, count in zip(self._metric_labels[1], counts):
+            if count:
+                metrics.increment(PATTERN_MATCHES, count, labels)
+
+    def use_ruleset(self, ruleset: CompiledRuleset):
+        """Analyze with a shared compiled ruleset, e.g. one from ``default_registry.lookup``."""
+        self.categories = deepcopy(ruleset.categories)
+        self.proximity = ruleset.proximity
+        self._ruleset = ruleset
+        self._ruleset_spec = ruleset_spec(self.categories, self.proximity)
+        self._warn_unsafe(ruleset)
+
+    def get_ruleset(self) -> CompiledRuleset:
+        """Return the shared compiled ruleset for the current categories.
+
+        Analyzers with identical categories get the same instance from the
+        process-wide registry, so each distinct ruleset is compiled once.
+        """
+        spec = ruleset_spec(self.categories, self.proximity)
+        if self._ruleset is None or spec != self._ruleset_spec:
+            self._ruleset = default_registry.get(self.categories, self.proximity)
+            self._ruleset_spec = spec
+            self._warn_unsafe(self._ruleset)
+        return self._ruleset
+
+    def _warn_unsafe(self, ruleset: CompiledRuleset):
+        if ruleset.unsafe_patterns and self.match_timeout is None:
+            warnings.warn(
+                f"{len(ruleset.unsafe_patterns)} pattern(s) can backtrack catastrophically; "
+                "set match_timeout to bound how long a document may take to match",
+                UnsafePatternWarning, stacklevel=3
+            )
+
+    def ruleset_fingerprint(self) -> str:
+        """Return a hash of the active categories, patterns and proximity settings."""
+        return self.get_ruleset().fingerprint
 
-        conn.commit()
-        conn.close()
+    def get_rule_engine(self) -> CompiledRuleEngine:
+        """Return the compiled engine for the current categories, rebuilding it if they changed."""
+        return self.get_ruleset().engine
 
     def calculate_proximity_score(self, text: str, pattern1: str, pattern2: str) -> float:
         """Calculate how close two patterns appear in the text."""
-        matches1 = list(re.finditer(pattern1, text, re.IGNORECASE))
-        matches2 = list(re.finditer(pattern2, text, re.IGNORECASE))
-
-        if not matches1 or not matches2:
-            return 0.0
-
-        # Find minimum word distance between any two matches
-        min_distance = float('inf')
-        for m1 in matches1:
-            for m2 in matches2:
-                start1, end1 = m1.span()
-                start2, end2 = m2.span()
-
-                # Count words between matches
-                between_text = text[min(end1, end2):max(start1, start2)]
-                word_distance = len(between_text.split())
-
-                min_distance = min(min_distance, word_distance)
-
-        # Convert distance to score (closer = higher score)
-        if min_distance == float('inf'):
-            return 0.0
-        return 1.0 / (1.0 + min_distance)
-
-    def check_compliance(self, text: str, min_score: float = 0.6) -> ComplianceResult:
-        """Perform comprehensive compliance analysis with pattern matching and proximity scoring."""
-        category_scores = {}
-        found_patterns = defaultdict(list)
-        proximity_scores = {}
+        words = WordIndex(text)
+        spans1 = [m.span() for m in re.finditer(pattern1, text, re.IGNORECASE)]
+        spans2 = [m.span() for m in re.finditer(pattern2, text, re.IGNORECASE)]
+        return proximity_score(words.marks(spans1), words.marks(spans2))
+
+    def check_compliance(self, text: str, min_score: float = 0.6, durable: bool = True,
+                         policy_id: Optional[str] = None, store: bool = True) -> ComplianceResult:
+        """Perform comprehensive compliance analysis with pattern matching and proximity scoring.
+
+        ``durable`` controls whether the history row is committed before returning
+        or written behind in the next batch. ``policy_id`` is recorded with the row
+        so history can be filtered per policy. With ``store=False`` nothing is
+        written and the caller is responsible for persisting the result.
+        """
+        result = self._cached_analyze(text, min_score)
+        result.policy_id = policy_id
 
-        # Pattern matching within categories
-        for category in self.categories:
-            category_score = 0.0
-            max_possible_score = sum(p.weight for p in category.patterns)
-
-            for pattern in category.patterns:
-                matches = list(re.finditer(pattern.pattern, text, re.IGNORECASE))
-                if matches:
-                    matched_text = [text[m.start():m.end()] for m in matches]
-                    found_patterns[category.name].append((pattern.pattern, matched_text[0]))
-                    category_score += pattern.weight
-
-            # Normalize category score to 0-1 range
-            category_scores[category.name] = category_score / max_possible_score if max_possible_score > 0 else 0.0
-
-        # Calculate proximity scores between related patterns
-        for category in self.categories:
-            patterns = category.patterns
-            for i in range(len(patterns)):
-                for j in range(i + 1, len(patterns)):
-                    key = f"{patterns[i].description} - {patterns[j].description}"
-                    proximity_scores[key] = self.calculate_proximity_score(
-                        text, patterns[i].pattern, patterns[j].pattern
-                    )
+        # Store result in database
+        if store:
+            self.store_result(result, durable=durable)
+
+        return result
+
+    async def check_compliance_async(self, text: str, min_score: float = 0.6,
+                                     policy_id: Optional[str] = None, store: bool = True,
+                                     executor: Optional["Executor"] = None) -> ComplianceResult:
+        """Analyze a document without blocking the running event loop.
+
+        The scan runs in ``executor``. A thread pool (the loop's default when
+        None) shares this analyzer and its result cache; a process pool scales
+        across cores, with each worker analyzing against a copy of the current
+        categories while this process consults and fills the result cache. The
+        history row is written behind, so the coroutine never waits on SQLite.
+        """
+        import asyncio
+        from concurrent.futures import ProcessPoolExecutor
+
+        loop = asyncio.get_running_loop()
+        if isinstance(executor, ProcessPoolExecutor):
+            cache_key, result = await loop.run_in_executor(None, self._cache_lookup, text, min_score)
+            if result is None:
+                result = await self._analyze_in_process(executor, text, min_score)
+                await loop.run_in_executor(None, self._cache_store, cache_key, result)
+        else:
+            result = await loop.run_in_executor(executor, self._cached_analyze, text, min_score)
+
+        result.policy_id = policy_id
+        if store:
+            self.store_result(result, durable=False)
+        return result
+
+    async def _analyze_in_process(self, executor: "Executor", text: str, min_score: float) -> ComplianceResult:
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        if self.metrics is not None:
+            result, recorder = await loop.run_in_executor(
+                executor, _analyze_in_worker_measured, self.categories, self.proximity, text, min_score,
+                self.match_timeout
+            )
+            recorder.replay(self.metrics)
+            return result
+        return await loop.run_in_executor(
+            executor, _analyze_in_worker, self.categories, self.proximity, text, min_score,
+            self.match_timeout
+        )
+
+    def check_compliance_stream(self, chunks: Iterable[str], min_score: float = 0.6,
+                                durable: bool = True, policy_id: Optional[str] = None,
+                                store: bool = True, overlap: int = DEFAULT_OVERLAP) -> ComplianceResult:
+        """Analyze a document delivered as an iterable of text chunks.
+
+        Only about one chunk plus ``overlap`` characters of text is held in
+        memory, along with the match offsets, so documents larger than RAM can
+        be checked, e.g. with ``iter_file_chunks``.
+        The result is the same as ``check_compliance`` on the joined text as long
+        as no single match spans more than ``overlap`` characters. Streamed
+        documents bypass the result cache. Chunks are matched in this process,
+        so with ``match_timeout`` set a ruleset with backtracking-prone patterns
+        raises ``ValueError`` rather than running without its time limit.
+        """
+        ruleset = self.get_ruleset()
+        if self.match_timeout is not None and ruleset.unsafe_patterns:
+            raise ValueError(
+                f"Streamed checks cannot apply match_timeout, and {len(ruleset.unsafe_patterns)} "
+                "pattern(s) can backtrack catastrophically; check the whole text instead"
+            )
+        scanner = StreamScanner(ruleset.engine, overlap)
+        pairs = ruleset.proximity_pairs
+        trackers = [ProximityTracker(ruleset.proximity.max_words) for _ in pairs]
+        positions = MatchIndexBuilder(len(ruleset.engine.patterns))
+
+        def track(marks):
+            for pattern_id, pattern_marks in enumerate(marks):
+                if pattern_marks:
+                    positions.add(pattern_id, pattern_marks)
+            for tracker, (_, i, j) in zip(trackers, pairs):
+                if marks[i] or marks[j]:
+                    tracker.feed(marks[i], marks[j])
+
+        metrics = self.metrics
+        size = 0
+        # Proximity tracking is interleaved with the scan and timed with it
+        with timed(metrics, "scan"):
+            for chunk in chunks:
+                if metrics is not None:
+                    size += len(chunk.encode())
+                track(scanner.feed(chunk))
+            track(scanner.finish())
+
+        proximity_scores = {}
+        for tracker, (key, i, j) in zip(trackers, pairs):
+            # A pair only scores when both patterns matched somewhere in the document
+            found = scanner.first_match[i] is not None and scanner.first_match[j] is not None
+            proximity_scores[key] = tracker.score() if found else 0.0
+
+        match_index = positions.build()
+        if metrics is not None:
+            self._record_document(ruleset, size, match_index.counts)
+        result = self._build_result(scanner.first_match, proximity_scores, min_score, match_index)
+        result.policy_id = policy_id
+        if store:
+            self.store_result(result, durable=durable)
+        return result
 
-        # Calculate overall score
-        total_score = sum(
-            score * next(cat.weight for cat in self.categories if cat.name == category)
-            for category, score in category_scores.items()
+    def check_compliance_incremental(self, document_id: str, text: str, min_score: float = 0.6,
+                                     durable: bool = True, policy_id: Optional[str] = None,
+                                     store: bool = True) -> ComplianceResult:
+        """Re-analyze a document that was checked before, scanning only the edited paragraphs.
+
+        A ``DocumentIndex`` of match positions is kept per ``document_id``; the
+        first call scans the whole text. Results are the same as
+        ``check_compliance`` under the overlap assumption of ``DocumentIndex``.
+        With a result cache, a text seen before, e.g. a file restored to an
+        earlier version, is served from the cache without touching the index.
+        Edits cannot be matched under ``match_timeout``, so with a timeout set
+        every check is a full scan that may raise ``MatchTimeout``.
+        """
+        result = self._cached_analyze(
+            text, min_score, lambda text, min_score: self._analyze_incremental(document_id, text, min_score)
         )
+        result.policy_id = policy_id
+        if store:
+            self.store_result(result, durable=durable)
+        return result
+
+    def _analyze_incremental(self, document_id: str, text: str, min_score: float) -> ComplianceResult:
+        if self.match_timeout is not None:
+            self._documents.pop(document_id, None)
+            return self._analyze(text, min_score)
+        engine = self.get_rule_engine()
+        index = self._documents.get(document_id)
+        if index is None or index.engine is not engine:
+            index = self._documents[document_id] = DocumentIndex(engine)
+        metrics = self.metrics
+        with timed(metrics, "scan"):
+            index.update(text)
+
+        ruleset = self.get_ruleset()
+        proximity_scores = {}
+        with timed(metrics, "proximity"):
+            for key, i, j in ruleset.proximity_pairs:
+                proximity_scores[key] = proximity_score(index.marks[i], index.marks[j],
+                                                        ruleset.proximity.max_words)
+
+        if metrics is not None:
+            self._record_document(ruleset, len(text.encode()), map(len, index.spans))
+        return self._build_result(index.first_matches(), proximity_scores, min_score,
+                                  MatchIndex.from_spans(index.spans))
+
+    def forget_document(self, document_id: str):
+        """Drop the incremental index kept for a document."""
+        self._documents.pop(document_id, None)
+
+    def _cached_analyze(self, text: str, min_score: float,
+                        analyze: Optional[Callable[[str, float], ComplianceResult]] = None) -> ComplianceResult:
+        """Return the cached result for a document, analyzing and caching it on a miss.
+
+        ``analyze`` produces the result on a miss; it defaults to a full scan.
+        """
+        cache_key, cached = self._cache_lookup(text, min_score)
+        if cached is not None:
+            return cached
+        result = (analyze or self._analyze)(text, min_score)
+        self._cache_store(cache_key, result)
+        return result
 
-        is_compliant = total_score >= min_score
+    def _cache_lookup(self, text: str, min_score: float) -> Tuple[Optional[str], Optional[ComplianceResult]]:
+        """Return a document's cache key (None without a cache) and its cached result, if any."""
+        if self.result_cache is None:
+            return None, None
+        cache_key = make_cache_key(text, min_score, self.ruleset_fingerprint())
+        payload = self.result_cache.get(cache_key)
+        if payload is not None:
+            cached = _result_from_json(payload)
+            # Entries cached before match indexes existed are refreshed
+            if cached.match_index is not None:
+                return cache_key, replace(cached, timestamp=datetime.now().isoformat())
+        return cache_key, None
+
+    def _cache_store(self, cache_key: Optional[str], result: ComplianceResult):
+        if cache_key is not None and self.result_cache is not None:
+            self.result_cache.put(cache_key, _result_to_json(result))
+
+    def _proximity_pairs(self) -> List[ProximityPair]:
+        """Return (key, pattern index, pattern index) for every pattern pair to score.
+
+        Indexes refer to the flat pattern list the rule engine is built from.
+        Empty when proximity analysis is disabled.
+        """
+        return self.get_ruleset().proximity_pairs
+
+    def _build_result(self, first_matches: List[Optional[str]], proximity_scores: Dict[str, float],
+                      min_score: float, match_index: Optional[MatchIndex] = None) -> ComplianceResult:
+        """Score categories from the first match text of each pattern (None when absent)."""
+        with timed(self.metrics, "scoring"):
+            category_scores = {}
+            found_patterns = defaultdict(list)
+
+            # Pattern matching within categories
+            matches = iter(first_matches)
+            for category in self.categories:
+                category_score = 0.0
+                max_possible_score = sum(p.weight for p in category.patterns)
+
+                for pattern in category.patterns:
+                    matched_text = next(matches)
+                    if matched_text is not None:
+                        found_patterns[category.name].append((pattern.pattern, sys.intern(matched_text)))
+                        category_score += pattern.weight
+
+                # Normalize category score to 0-1 range
+                category_scores[category.name] = category_score / max_possible_score if max_possible_score > 0 else 0.0
+
+            # Calculate overall score
+            total_score = sum(
+                category_scores[category.name] * category.weight for category in self.categories
+            )
+
+            is_compliant = total_score >= min_score
 
-        result = ComplianceResult(
+        return ComplianceResult(
             is_compliant=is_compliant,
             score=total_score,
             category_scores=category_scores,
             found_patterns=dict(found_patterns),
             timestamp=datetime.now().isoformat(),
-            proximity_scores=proximity_scores
+            proximity_scores=proximity_scores,
+            match_index=match_index
         )
 
-        # Store result in database
-        self.store_result(result)
-
+    def _analyze(self, text: str, min_score: float) -> ComplianceResult:
+        """Scan and score a document without touching the cache or history."""
+        hits, first_matches, proximity_scores, unfinished = self._scan(text)
+        result = self._build_result(first_matches, proximity_scores, min_score,
+                                    MatchIndex.from_spans(hits))
+        if unfinished:
+            raise MatchTimeout(result, self._pattern_descriptions(unfinished), self.match_timeout)
         return result
 
-    def store_result(self, result: ComplianceResult):
-        """Store compliance result in SQLite database."""
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-
-        c.execute('''
-        INSERT INTO compliance_history
-        (timestamp, overall_score, is_compliant, category_scores, found_patterns)
-        VALUES (?, ?, ?, ?, ?)
-        ''', (
-            result.timestamp,
-            result.score,
-            1 if result.is_compliant else 0,
-            json.dumps(result.category_scores),
-            json.dumps(result.found_patterns)
-        ))
-
-        conn.commit()
-        conn.close()
+    def _scan(self, text: str) -> Tuple[List[List[Span]], List[Optional[str]], Dict[str, float], List[int]]:
+        """Return the match spans and first match text of each pattern, the proximity scores,
+        and the ids of patterns that did not finish within ``match_timeout``."""
+        # Collect matches for every pattern in a single pass over the text
+        ruleset = self.get_ruleset()
+        metrics = self.metrics
+        with timed(metrics, "scan"):
+            if self.match_timeout is None:
+                hits, unfinished = ruleset.engine.scan(text), []
+            else:
+                hits, unfinished = self._get_match_guard().scan(ruleset, text)
+        first_matches = [text[spans[0][0]:spans[0][1]] if spans else None for spans in hits]
+
+        # Calculate proximity scores between the requested pattern pairs, reusing the
+        # scan's match positions. The document is only tokenized if some pair co-occurs.
+        max_words = ruleset.proximity.max_words
+        proximity_scores = {}
+        words = None
+        marks = {}
+        with timed(metrics, "proximity"):
+            for key, i, j in ruleset.proximity_pairs:
+                if not hits[i] or not hits[j]:
+                    proximity_scores[key] = 0.0
+                    continue
+                if words is None:
+                    words = WordIndex(text)
+                for idx in (i, j):
+                    if idx not in marks:
+                        marks[idx] = words.marks(hits[idx])
+                proximity_scores[key] = proximity_score(marks[i], marks[j], max_words)
+
+        if metrics is not None:
+            self._record_document(ruleset, len(text.encode()), map(len, hits))
+        return hits, first_matches, proximity_scores, unfinished
+
+    def _get_match_guard(self) -> MatchGuard:
+        # Concurrent checks on a thread pool must share one guard and its worker processes
+        if self._match_guard is None:
+            with self._match_guard_lock:
+                if self._match_guard is None:
+                    self._match_guard = MatchGuard(self.match_timeout)
+        self._match_guard.budget = self.match_timeout
+        return self._match_guard
+
+    def _pattern_descriptions(self, pattern_ids: Iterable[int]) -> List[str]:
+        patterns = [p for category in self.get_ruleset().categories for p in category.patterns]
+        return [f"{patterns[idx].category}: {patterns[idx].description}" for idx in pattern_ids]
+
+    def store_result(self, result: ComplianceResult, durable: bool = True):
+        """Store compliance result in SQLite database.
+
+        With ``durable=False`` the row is queued and committed with the next batch.
+        """
+        with timed(self.metrics, "persistence"):
+            self.history.append(self._history_record(result), durable=durable)
+
+    def store_results(self, results: List[ComplianceResult]):
+        """Store many compliance results in a single transaction."""
+        with timed(self.metrics, "persistence"):
+            self.history.append_many([self._history_record(result) for result in results])
+
+    def check_batch(self, texts: Iterable[str], min_score: float = 0.6,
+                    policy_ids: Optional[Iterable[Optional[str]]] = None,
+                    store: bool = True) -> "ResultBatch":
+        """Check many documents and return their results as a columnar ``ResultBatch``.
+
+        Results are packed into the batch as they are produced, so no per-document
+        objects outlive their check. With ``store=True`` the batch is written to
+        history in one transaction.
+        """
+        from result_batch import ResultBatchBuilder, ResultKeys
+
+        builder = ResultBatchBuilder(ResultKeys.from_ruleset(self.get_ruleset()))
+        ids = iter(policy_ids) if policy_ids is not None else None
+        for text in texts:
+            result = self._cached_analyze(text, min_score)
+            result.policy_id = next(ids) if ids is not None else None
+            builder.add(result)
+        batch = builder.build()
+        if store:
+            self.store_batch(batch)
+        return batch
+
+    def score_many(self, texts: Iterable[str], min_score: float = 0.6,
+                   policy_ids: Optional[Iterable[Optional[str]]] = None,
+                   store: bool = False) -> "ResultBatch":
+        """Scan many documents, then score them all at once with matrix products.
+
+        Each scan only fills a row of the batch's documents-by-patterns
+        ``matched`` matrix; category and overall scores are computed for the
+        whole corpus by ``ResultBatch.rescore``, which can later rescore the
+        same batch under other weights or thresholds without re-scanning.
+        The result cache is not consulted. A document that runs over
+        ``match_timeout`` raises ``MatchTimeout`` with its partial result.
+        """
+        from result_batch import ResultBatchBuilder, ResultKeys
+
+        builder = ResultBatchBuilder(ResultKeys.from_ruleset(self.get_ruleset()))
+        ids = iter(policy_ids) if policy_ids is not None else None
+        for text in texts:
+            hits, first_matches, proximity_scores, unfinished = self._scan(text)
+            if unfinished:
+                result = self._build_result(first_matches, proximity_scores, min_score,
+                                            MatchIndex.from_spans(hits))
+                raise MatchTimeout(result, self._pattern_descriptions(unfinished), self.match_timeout)
+            builder.add_scan(first_matches, [len(spans) for spans in hits], proximity_scores,
+                             datetime.now().isoformat(), next(ids) if ids is not None else None,
+                             MatchIndex.from_spans(hits))
+        with timed(self.metrics, "scoring"):
+            batch = builder.build().rescore(min_score)
+        if store:
+            self.store_batch(batch)
+        return batch
+
+    def store_batch(self, batch: "ResultBatch"):
+        """Store every row of a ``ResultBatch`` in a single transaction."""
+        with timed(self.metrics, "persistence"):
+            self.history.append_many(list(batch.history_records()))
+
+    def _history_record(self, result: ComplianceResult) -> HistoryRecord:
+        return HistoryRecord(
+            timestamp=result.timestamp,
+            overall_score=result.score,
+            is_compliant=result.is_compliant,
+            category_scores=result.category_scores,
+            found_patterns=result.found_patterns,
+            policy_id=result.policy_id,
+            match_index=result.match_index.to_bytes() if result.match_index is not None else None
+        )
+
+    def flush(self):
+        """Commit any queued history rows."""
+        self.history.flush()
+
+    def close(self):
+        """Flush queued history rows, release the database connection and stop the match worker."""
+        self.history.close()
+        if self._match_guard is not None:
+            self._match_guard.close()
+
+    def __enter__(self) -> "ComplianceAnalyzer":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
 
     def get_historical_trends(self) -> Dict:
         """Retrieve historical compliance data for trending."""
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-
-        c.execute('''
+        results = self.history.query('''
         SELECT timestamp, overall_score, category_scores
         FROM compliance_history
-        ORDER BY timestamp DESC
+        ORDER BY recorded_at DESC, id DESC
         LIMIT 10
         ''')
 
-        results = c.fetchall()
-        conn.close()
-
         if not results:
             return {}
 
@@ -278,107 +728,81 @@ class ComplianceAnalyzer:
 
         return trends
 
+    def query_history(self, start: TimeBound = None, end: TimeBound = None,
+                      min_score: Optional[float] = None, max_score: Optional[float] = None,
+                      is_compliant: Optional[bool] = None, policy_id: Optional[str] = None,
+                      limit: int = 100, cursor: Optional[str] = None) -> HistoryPage:
+        """Query compliance history with all filtering and paging done in SQL.
+
+        Results are newest first. Pass ``next_cursor`` from the previous page as
+        ``cursor`` to continue; it stays stable while new checks are recorded.
+        """
+        filters = HistoryFilter(start, end, min_score, max_score, is_compliant, policy_id)
+        return self.history.query_page(filters, limit=limit, cursor=cursor)
+
+    def query_history_batch(self, start: TimeBound = None, end: TimeBound = None,
+                            min_score: Optional[float] = None, max_score: Optional[float] = None,
+                            is_compliant: Optional[bool] = None, policy_id: Optional[str] = None,
+                            limit: Optional[int] = None) -> "ResultBatch":
+        """Load matching history rows, oldest first, as a columnar ``ResultBatch``.
+
+        Columns follow the current ruleset; proximity scores are not kept in
+        history and come back as NaN.
+        """
+        from result_batch import batch_from_history
+
+        filters = HistoryFilter(start, end, min_score, max_score, is_compliant, policy_id)
+        return batch_from_history(self.history.query_rows(filters, limit), self.get_ruleset())
+
+    def get_match_index(self, history_id: int) -> Optional[MatchIndex]:
+        """Return the match positions stored with a history row, e.g. to highlight a past check."""
+        return load_match_index(self.history.match_index(history_id))
+
+    def get_category_aggregates(self, start: TimeBound = None, end: TimeBound = None,
+                                min_score: Optional[float] = None, max_score: Optional[float] = None,
+                                is_compliant: Optional[bool] = None,
+                                policy_id: Optional[str] = None) -> Dict[str, Dict[str, float]]:
+        """Return count, mean, min and max score per category over matching history rows."""
+        filters = HistoryFilter(start, end, min_score, max_score, is_compliant, policy_id)
+        return self.history.category_aggregates(filters)
+
+# Analyzer owned by each process-pool worker of check_compliance_async
+_worker_analyzer: Optional[ComplianceAnalyzer] = None
+
+def _get_worker_analyzer(categories: List[ComplianceCategory], proximity: ProximitySettings,
+                         match_timeout: Optional[float] = None) -> ComplianceAnalyzer:
+    global _worker_analyzer
+    if _worker_analyzer is None:
+        # Workers only analyze; the parent process owns the history database
+        _worker_analyzer = ComplianceAnalyzer(":memory:")
+    _worker_analyzer.categories = categories
+    _worker_analyzer.proximity = proximity
+    _worker_analyzer.match_timeout = match_timeout
+    return _worker_analyzer
+
+def _analyze_in_worker(categories: List[ComplianceCategory], proximity: ProximitySettings,
+                       text: str, min_score: float,
+                       match_timeout: Optional[float] = None) -> ComplianceResult:
+    return _get_worker_analyzer(categories, proximity, match_timeout)._analyze(text, min_score)
+
+def _analyze_in_worker_measured(categories: List[ComplianceCategory], proximity: ProximitySettings,
+                                text: str, min_score: float, match_timeout: Optional[float] = None
+                                ) -> Tuple[ComplianceResult, MetricsRecorder]:
+    """Like ``_analyze_in_worker``, also returning the measurements to replay into the parent's sink."""
+    analyzer = _get_worker_analyzer(categories, proximity, match_timeout)
+    recorder = analyzer.enable_metrics(MetricsRecorder())
+    try:
+        return analyzer._analyze(text, min_score), recorder
+    finally:
+        analyzer.metrics = None
+
 def generate_pdf_report(result: ComplianceResult, analyzer: ComplianceAnalyzer, output_path: str):
     """Generate a detailed PDF report with charts and analysis."""
-    doc = SimpleDocTemplate(output_path, pagesize=letter)
-    styles = getSampleStyleSheet()
-    story = []
-
-    # Title
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        spaceAfter=30
-    )
-    story.append(Paragraph("ISO 42001 Compliance Report", title_style))
-    story.append(Spacer(1, 12))
-
-    # Overall Results
-    story.append(Paragraph(f"Overall Compliance: {'PASS' if result.is_compliant else 'FAIL'}", styles['Heading2']))
-    story.append(Paragraph(f"Score: {result.score:.2f}", styles['Normal']))
-    story.append(Paragraph(f"Timestamp: {result.timestamp}", styles['Normal']))
-    story.append(Spacer(1, 12))
-
-    # Category Results
-    story.append(Paragraph("Category Analysis", styles['Heading2']))
-    for category, score in result.category_scores.items():
-        story.append(Paragraph(f"{category}: {score:.2f}", styles['Normal']))
-    story.append(Spacer(1, 12))
-
-    # Pattern Matches
-    story.append(Paragraph("Detected Patterns", styles['Heading2']))
-    for category, patterns in result.found_patterns.items():
-        story.append(Paragraph(f"{category}:", styles['Heading3']))
-        for pattern, match in patterns:
-            story.append(Paragraph(f"- Pattern '{pattern}' matched: '{match}'", styles['Normal']))
-    story.append(Spacer(1, 12))
-
-    # Proximity Analysis
-    story.append(Paragraph("Pattern Proximity Analysis", styles['Heading2']))
-    proximity_data = []
-    for key, score in result.proximity_scores.items():
-        if score > 0:
-            proximity_data.append([key, f"{score:.2f}"])
-
-    if proximity_data:
-        t = Table(proximity_data)
-        t.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 14),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
-            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 1), (-1, -1), 12),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        story.append(t)
-    story.append(Spacer(1, 12))
-
-    # Historical Trends
-    story.append(Paragraph("Historical Trends", styles['Heading2']))
-    trends = analyzer.get_historical_trends()
+    from report_renderer import get_report_renderer
 
-    if trends:
-        # Create trend charts using matplotlib
-        plt.figure(figsize=(8, 4))
-        plt.plot(range(len(trends['overall_scores'])), trends['overall_scores'], marker='o')
-        plt.title('Overall Compliance Score Trend')
-        plt.xlabel('Assessment Number')
-        plt.ylabel('Score')
-        plt.grid(True)
-
-        # Save plot to file and add to PDF
-        trend_path = 'trend_chart.png'
-        plt.savefig(trend_path)
-        story.append(Image(trend_path))
-
-        # Category trends
-        plt.figure(figsize=(8, 4))
-        for category, scores in trends['category_scores'].items():
-            plt.plot(range(len(scores)), scores, marker='o', label=category)
-        plt.title('Category Score Trends')
-        plt.xlabel('Assessment Number')
-        plt.ylabel('Score')
-        plt.legend()
-        plt.grid(True)
-
-        category_trend_path = 'category_trends.png'
-        plt.savefig(category_trend_path)
-        story.append(Image(category_trend_path))
-
-    doc.build(story)
-
-    # Cleanup temporary files
-    if Path('trend_chart.png').exists():
-        Path('trend_chart.png').unlink()
-    if Path('category_trends.png').exists():
-        Path('category_trends.png').unlink()
+    trends = analyzer.get_historical_trends()
+    with timed(analyzer.metrics, "report"):
+        get_report_renderer().render(result, trends, output_path)
 
 def analyze_policy_file(file_path: str) -> None:
     """Analyze an AI policy document for ISO 42001 compliance."""
@@ -0,0 +1,149 @@
+"""Pattern matching in killable worker processes, under a per-document time budget."""
+
+from multiprocessing import get_context
+from time import monotonic
+from typing import Any, List, Optional, Sequence, Tuple
+import threading
+
+from pattern_engine import CompiledRuleEngine, Span
+
+class MatchTimeout(RuntimeError):
+    """Raised when matching a document takes longer than the analyzer's budget.
+
+    ``result`` is scored from the patterns that finished in time and is
+    neither stored nor cached; ``patterns`` lists the descriptions of the
+    patterns that did not finish.
+    """
+
+    def __init__(self, result: Any, patterns: Sequence[str], budget: float):
+        super().__init__(
+            f"Pattern matching exceeded its {budget:g}s budget; "
+            f"unfinished patterns: {', '.join(patterns)}"
+        )
+        self.result = result
+        self.patterns = list(patterns)
+        self.budget = budget
+
+    def __reduce__(self):
+        return (MatchTimeout, (self.result, self.patterns, self.budget))
+
+def match_units(pattern_count: int, unsafe_ids: Sequence[int]) -> List[List[int]]:
+    """Group pattern ids into the units a guarded scan reports one by one.
+
+    Safe patterns share one single-pass scan; each backtracking-prone
+    pattern runs on its own afterwards, so a runaway pattern only costs the
+    patterns behind it.
+    """
+    unsafe = set(unsafe_ids)
+    safe = [idx for idx in range(pattern_count) if idx not in unsafe]
+    return ([safe] if safe else []) + [[idx] for idx in sorted(unsafe)]
+
+def _match_worker(conn):
+    engines: List[CompiledRuleEngine] = []
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            return
+        if message[0] == "load":
+            _, patterns, flags, units = message
+            engines = [CompiledRuleEngine([patterns[idx] for idx in unit], flags) for unit in units]
+            conn.send(("loaded", None))
+        elif message[0] == "scan":
+            for engine in engines:
+                try:
+                    conn.send(("hits", engine.scan(message[1])))
+                except Exception as e:
+                    conn.send(("error", f"{type(e).__name__}: {e}"))
+                    break
+
+class _MatchWorker:
+    """One worker process and the ruleset it has compiled."""
+
+    def __init__(self):
+        self.conn, child = get_context().Pipe()
+        self.process = get_context().Process(target=_match_worker, args=(child,), daemon=True)
+        self.process.start()
+        child.close()
+        self.loaded: Optional[str] = None  # fingerprint of the compiled ruleset
+        self.units: List[List[int]] = []
+
+    def load(self, ruleset: Any):
+        if self.loaded != ruleset.fingerprint:
+            units = match_units(len(ruleset.engine.patterns), list(ruleset.unsafe_patterns))
+            self.conn.send(("load", ruleset.engine.patterns, ruleset.engine.flags, units))
+            self.receive()
+            self.units = units
+            self.loaded = ruleset.fingerprint
+
+    def receive(self) -> Tuple[str, Any]:
+        try:
+            return self.conn.recv()
+        except (EOFError, OSError):
+            self.kill()
+            raise RuntimeError("The pattern matching worker exited unexpectedly") from None
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+    def stop(self):
+        self.conn.close()  # The worker exits when its end of the pipe closes
+        self.process.join(timeout=1)
+        if self.process.is_alive():
+            self.kill()
+
+class MatchGuard:
+    """Scan documents in worker processes that are killed once a document runs over ``budget`` seconds.
+
+    The regex engine cannot be interrupted from another thread, so matching
+    runs in a separate process. It reports each unit of ``match_units`` as
+    it finishes, so a killed scan still returns the spans of every unit done
+    by then. Each concurrent scan takes an idle worker or starts one; killed
+    workers are replaced on demand.
+    """
+
+    def __init__(self, budget: float):
+        if budget <= 0:
+            raise ValueError("The match budget must be positive")
+        self.budget = budget
+        self._lock = threading.Lock()
+        self._idle: List[_MatchWorker] = []
+
+    def scan(self, ruleset: Any, text: str) -> Tuple[List[List[Span]], List[int]]:
+        """Return the spans of every pattern of a compiled ruleset, and the ids of the
+        patterns that did not finish within the budget (their spans are empty)."""
+        with self._lock:
+            worker = self._idle.pop() if self._idle else None
+        if worker is None:
+            worker = _MatchWorker()
+        worker.load(ruleset)
+
+        hits: List[List[Span]] = [[] for _ in ruleset.engine.patterns]
+        deadline = monotonic() + self.budget
+        worker.conn.send(("scan", text))
+        for done, unit in enumerate(worker.units):
+            remaining = deadline - monotonic()
+            if remaining <= 0 or not worker.conn.poll(remaining):
+                worker.kill()
+                return hits, [idx for pending in worker.units[done:] for idx in pending]
+            kind, payload = worker.receive()
+            if kind == "error":
+                self._release(worker)
+                raise RuntimeError(f"Pattern matching failed: {payload}")
+            for pattern_id, spans in zip(unit, payload):
+                hits[pattern_id] = spans
+        self._release(worker)
+        return hits, []
+
+    def _release(self, worker: _MatchWorker):
+        with self._lock:
+            self._idle.append(worker)
+
+    def close(self):
+        """Stop the idle worker processes."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for worker in idle:
+            worker.stop()
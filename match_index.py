@@ -0,0 +1,164 @@
+"""Compact, array-backed index of every pattern match in a document."""
+
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+import struct
+import sys
+
+Span = Tuple[int, int]
+# (pattern id, start, end)
+Match = Tuple[int, int, int]
+
+# magic, format version, offset typecode, pattern count
+_HEADER = struct.Struct("<3sBcI")
+_MAGIC = b"MIX"
+_FORMAT = 1
+# Offsets below 4 GiB are stored in 4 bytes each
+_SMALL_OFFSET_LIMIT = 1 << 32
+
+def _little_endian(values: array) -> bytes:
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+def _from_little_endian(typecode: str, data: bytes) -> array:
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+class MatchIndex:
+    """Start and end offsets of every match, grouped by pattern id.
+
+    Pattern ids are positions in the flat pattern list the rule engine was
+    built from. Offsets are kept in flat typed arrays, pattern after pattern,
+    with a per-pattern match count, so an index costs a few bytes per match
+    and serializes without per-match overhead.
+    """
+
+    __slots__ = ("counts", "starts", "ends", "_offsets")
+
+    def __init__(self, counts: array, starts: array, ends: array):
+        self.counts = counts
+        self.starts = starts
+        self.ends = ends
+        self._offsets = [0]
+        for count in counts:
+            self._offsets.append(self._offsets[-1] + count)
+
+    @classmethod
+    def from_spans(cls, hits: Sequence[Sequence[Span]]) -> "MatchIndex":
+        """Build an index from match spans per pattern, as returned by ``CompiledRuleEngine.scan``."""
+        builder = MatchIndexBuilder(len(hits))
+        for pattern_id, spans in enumerate(hits):
+            builder.add(pattern_id, spans)
+        return builder.build()
+
+    @property
+    def pattern_count(self) -> int:
+        return len(self.counts)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, MatchIndex):
+            return NotImplemented
+        return (list(self.counts) == list(other.counts) and list(self.starts) == list(other.starts)
+                and list(self.ends) == list(other.ends))
+
+    def spans(self, pattern_id: int) -> List[Span]:
+        """Return the match spans of one pattern in document order."""
+        lo, hi = self._offsets[pattern_id], self._offsets[pattern_id + 1]
+        return list(zip(self.starts[lo:hi], self.ends[lo:hi]))
+
+    def matches(self) -> Iterator[Match]:
+        """Yield (pattern id, start, end) for every match, ordered by start, e.g. for highlighting."""
+        entries = [
+            (self.starts[pos], pattern_id, self.ends[pos])
+            for pattern_id in range(self.pattern_count)
+            for pos in range(self._offsets[pattern_id], self._offsets[pattern_id + 1])
+        ]
+        entries.sort()
+        for start, pattern_id, end in entries:
+            yield pattern_id, start, end
+
+    def diff(self, other: "MatchIndex") -> Dict[int, Tuple[List[Span], List[Span]]]:
+        """Return (removed, added) spans per pattern whose matches differ in ``other``.
+
+        Both indexes must come from the same ruleset; offsets are compared as
+        they are, so this is meant for re-checks of the same document.
+        """
+        if other.pattern_count != self.pattern_count:
+            raise ValueError("Match indexes were built from different rulesets")
+        changes = {}
+        for pattern_id in range(self.pattern_count):
+            old, new = self.spans(pattern_id), other.spans(pattern_id)
+            if old != new:
+                old_set, new_set = set(old), set(new)
+                changes[pattern_id] = (
+                    [span for span in old if span not in new_set],
+                    [span for span in new if span not in old_set],
+                )
+        return changes
+
+    def to_bytes(self) -> bytes:
+        """Serialize the index to a compact, platform-independent binary form."""
+        typecode = self.starts.typecode
+        return b"".join((
+            _HEADER.pack(_MAGIC, _FORMAT, typecode.encode(), self.pattern_count),
+            _little_endian(self.counts),
+            _little_endian(self.starts),
+            _little_endian(self.ends),
+        ))
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "MatchIndex":
+        """Rebuild an index serialized with ``to_bytes``."""
+        try:
+            magic, version, typecode, pattern_count = _HEADER.unpack_from(data)
+        except struct.error:
+            raise ValueError("Truncated match index") from None
+        if magic != _MAGIC or version != _FORMAT:
+            raise ValueError("Data does not contain a match index")
+        typecode = typecode.decode()
+        pos = _HEADER.size
+        count_size = array("I").itemsize
+        counts = _from_little_endian("I", data[pos:pos + count_size * pattern_count])
+        pos += count_size * pattern_count
+        total = sum(counts)
+        size = array(typecode).itemsize
+        starts = _from_little_endian(typecode, data[pos:pos + size * total])
+        ends = _from_little_endian(typecode, data[pos + size * total:pos + 2 * size * total])
+        if len(counts) != pattern_count or len(ends) != total:
+            raise ValueError("Truncated match index")
+        return cls(counts, starts, ends)
+
+class MatchIndexBuilder:
+    """Collect match spans pattern by pattern, e.g. while a document is streamed."""
+
+    def __init__(self, pattern_count: int):
+        self._starts = [array("Q") for _ in range(pattern_count)]
+        self._ends = [array("Q") for _ in range(pattern_count)]
+
+    def add(self, pattern_id: int, spans: Iterable[Sequence[int]]):
+        """Append matches of one pattern; each item starts with its (start, end) offsets."""
+        starts, ends = self._starts[pattern_id], self._ends[pattern_id]
+        for span in spans:
+            starts.append(span[0])
+            ends.append(span[1])
+
+    def build(self) -> MatchIndex:
+        largest = max((ends[-1] for ends in self._ends if ends), default=0)
+        typecode = "I" if largest < _SMALL_OFFSET_LIMIT else "Q"
+        starts, ends = array(typecode), array(typecode)
+        for pattern_starts, pattern_ends in zip(self._starts, self._ends):
+            starts.fromlist(pattern_starts.tolist())
+            ends.fromlist(pattern_ends.tolist())
+        return MatchIndex(array("I", map(len, self._starts)), starts, ends)
+
+def load_match_index(data: Optional[bytes]) -> Optional[MatchIndex]:
+    """Decode a stored index column, which is NULL for rows written before indexes existed."""
+    return MatchIndex.from_bytes(data) if data is not None else None
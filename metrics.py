@@ -0,0 +1,189 @@
+"""Stage timers and counters for the analysis pipeline, with pluggable sinks."""
+
+from contextlib import nullcontext
+from dataclasses import dataclass
+from time import perf_counter
+from typing import Any, ContextManager, Dict, List, Optional, Tuple
+import json
+import threading
+
+# Stages an analyzer times
+STAGES = ("scan", "proximity", "scoring", "persistence", "report")
+
+# Counters an analyzer increments
+DOCUMENTS = "documents"
+BYTES_ANALYZED = "bytes_analyzed"
+PATTERN_MATCHES = "pattern_matches"  # labelled by category and pattern description
+
+Labels = Tuple[Tuple[str, str], ...]
+
+_DISABLED = nullcontext()
+
+class MetricsSink:
+    """Receives an analyzer's measurements.
+
+    Subclass and override ``observe`` and ``increment`` to forward them
+    elsewhere, e.g. to StatsD; ``MetricsRegistry`` keeps them in process.
+    """
+
+    def observe(self, stage: str, seconds: float):
+        """Record the duration of one pass through a stage."""
+
+    def increment(self, name: str, value: float = 1, labels: Optional[Dict[str, str]] = None):
+        """Add ``value`` to a counter."""
+
+    def timer(self, stage: str) -> "StageTimer":
+        """Return a context manager that observes the time spent inside it."""
+        return StageTimer(self, stage)
+
+class StageTimer:
+    __slots__ = ("sink", "stage", "started")
+
+    def __init__(self, sink: MetricsSink, stage: str):
+        self.sink = sink
+        self.stage = stage
+
+    def __enter__(self):
+        self.started = perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.sink.observe(self.stage, perf_counter() - self.started)
+
+def timed(sink: Optional[MetricsSink], stage: str) -> ContextManager:
+    """Time a block into ``sink``; a shared no-op context when metrics are disabled."""
+    return sink.timer(stage) if sink is not None else _DISABLED
+
+@dataclass
+class TimerStats:
+    count: int = 0
+    total: float = 0.0
+    max: float = 0.0
+
+class MetricsRegistry(MetricsSink):
+    """Thread-safe in-process store of stage timings and counters.
+
+    Render it with ``to_prometheus`` for a scrape endpoint or ``to_json`` for
+    a dump; ``snapshot`` returns the same data as plain dicts.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._timers: Dict[str, TimerStats] = {}
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+
+    def observe(self, stage: str, seconds: float):
+        with self._lock:
+            stats = self._timers.get(stage)
+            if stats is None:
+                stats = self._timers[stage] = TimerStats()
+            stats.count += 1
+            stats.total += seconds
+            if seconds > stats.max:
+                stats.max = seconds
+
+    def increment(self, name: str, value: float = 1, labels: Optional[Dict[str, str]] = None):
+        key = (name, tuple(sorted(labels.items())) if labels else ())
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def reset(self):
+        with self._lock:
+            self._timers.clear()
+            self._counters.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return the timers per stage and the counters, each counter as a list of labelled values."""
+        with self._lock:
+            timers = {
+                stage: {'count': stats.count, 'seconds': stats.total, 'max_seconds': stats.max}
+                for stage, stats in self._timers.items()
+            }
+            counters: Dict[str, List[Dict[str, Any]]] = {}
+            for (name, labels), value in sorted(self._counters.items()):
+                counters.setdefault(name, []).append({'labels': dict(labels), 'value': value})
+        return {'timers': timers, 'counters': counters}
+
+    def to_json(self, indent: Optional[int] = 2) -> str:
+        return json.dumps(self.snapshot(), indent=indent)
+
+    def to_prometheus(self, prefix: str = "ai_governance") -> str:
+        """Render the Prometheus text exposition format."""
+        snapshot = self.snapshot()
+        lines = []
+        if snapshot['timers']:
+            name = f"{prefix}_stage_seconds"
+            lines += [f"# HELP {name} Time spent in each analysis stage.", f"# TYPE {name} summary"]
+            for stage, stats in snapshot['timers'].items():
+                label = _format_labels({'stage': stage})
+                lines.append(f"{name}_count{label} {stats['count']}")
+                lines.append(f"{name}_sum{label} {stats['seconds']!r}")
+            name = f"{prefix}_stage_max_seconds"
+            lines += [f"# HELP {name} Longest single pass through each stage.", f"# TYPE {name} gauge"]
+            for stage, stats in snapshot['timers'].items():
+                lines.append(f"{name}{_format_labels({'stage': stage})} {stats['max_seconds']!r}")
+        for counter, values in snapshot['counters'].items():
+            name = f"{prefix}_{counter}_total"
+            lines.append(f"# TYPE {name} counter")
+            for entry in values:
+                lines.append(f"{name}{_format_labels(entry['labels'])} {entry['value']!r}")
+        return "\n".join(lines) + "\n"
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        f'{key}="' + str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+        for key, value in labels.items()
+    )
+    return "{" + ",".join(escaped) + "}"
+
+class MetricsRecorder(MetricsSink):
+    """Buffer measurements, e.g. in a worker process, to ``replay`` into another sink later."""
+
+    def __init__(self):
+        self.events: List[Tuple] = []
+
+    def observe(self, stage: str, seconds: float):
+        self.events.append((stage, seconds))
+
+    def increment(self, name: str, value: float = 1, labels: Optional[Dict[str, str]] = None):
+        self.events.append((name, value, labels))
+
+    def replay(self, sink: MetricsSink):
+        for event in self.events:
+            if len(event) == 2:
+                sink.observe(*event)
+            else:
+                sink.increment(*event)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+def serve_metrics(registry: MetricsRegistry, port: int, host: str = "127.0.0.1"):
+    """Serve ``/metrics`` (Prometheus text) and ``/metrics.json`` from a daemon thread.
+
+    Returns the server; call ``shutdown()`` on it to stop serving.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == "/metrics":
+                body, content_type = registry.to_prometheus().encode(), PROMETHEUS_CONTENT_TYPE
+            elif self.path == "/metrics.json":
+                body, content_type = registry.to_json().encode(), "application/json"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # Scrapes would flood the console
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
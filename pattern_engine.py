@@ -0,0 +1,228 @@
+"""Single-pass regex engine for compliance pattern sets."""
+
+from dataclasses import dataclass, field
+from time import perf_counter
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+import re
+
+try:
+    from re import _parser as sre_parse  # Python 3.11+
+except ImportError:  # pragma: no cover - older interpreters
+    import sre_parse
+
+Span = Tuple[int, int]
+
+# Shortest literal prefix worth prefiltering on; shorter ones fire on almost every word
+MIN_PREFIX_LENGTH = 3
+# Upper bound on the alternatives a single pattern may expand to
+MAX_PREFIXES = 32
+
+# Non-ASCII characters that IGNORECASE treats as equal to an ASCII letter. Folding
+# them first keeps str.lower() length-preserving and consistent with the re module.
+_CASE_FOLD = str.maketrans({0x130: "i", 0x131: "i", 0x17F: "s", 0x212A: "k"})
+
+def fold_case(text: str) -> str:
+    """Lowercase text the way IGNORECASE compares ASCII literals, keeping offsets intact."""
+    return text.translate(_CASE_FOLD).lower()
+
+def _literal_prefixes(items) -> Tuple[Set[str], bool]:
+    """Return the ASCII literals every match of a parsed regex must start with.
+
+    The flag is True when the literals cover the whole match, i.e. the regex is
+    a plain (possibly alternated) literal and following items may be appended.
+    """
+    prefixes = {""}
+    for op, av in items:
+        if op == sre_parse.LITERAL and av < 128:
+            prefixes = {p + chr(av).lower() for p in prefixes}
+            continue
+
+        if op == sre_parse.SUBPATTERN and not av[1] and not av[2]:
+            sub, complete = _literal_prefixes(av[-1])
+        elif op == sre_parse.BRANCH:
+            sub, complete = set(), True
+            for branch in av[1]:
+                branch_prefixes, branch_complete = _literal_prefixes(branch)
+                sub |= branch_prefixes
+                complete = complete and branch_complete
+        elif op == sre_parse.IN and all(o == sre_parse.LITERAL and a < 128 for o, a in av):
+            sub, complete = {chr(a).lower() for _, a in av}, True
+        else:
+            return prefixes, False
+
+        combined = {p + s for p in prefixes for s in sub}
+        if len(combined) > MAX_PREFIXES:
+            return prefixes, False
+        prefixes = combined
+        if not complete:
+            return prefixes, False
+    return prefixes, True
+
+def _trie_regex(literals: Set[str]) -> str:
+    """Build a regex that matches where any of the literals starts."""
+    trie: Dict = {}
+    for literal in sorted(literals, key=len):
+        node = trie
+        for ch in literal:
+            if node.get("") is True:
+                break  # a shorter literal already covers this one
+            node = node.setdefault(ch, {})
+        else:
+            node.clear()
+            node[""] = True
+
+    def emit(node: Dict) -> str:
+        if node.get("") is True:
+            return ""
+        branches = [re.escape(ch) + emit(child) for ch, child in sorted(node.items())]
+        return branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+
+    return emit(trie)
+
+@dataclass
+class PatternCost:
+    """Work one pattern did during a profiled scan."""
+    prefiltered: bool
+    seconds: float = 0.0
+    candidates: int = 0  # positions the pattern was tried at; 0 for standalone patterns
+    matches: int = 0
+
+@dataclass
+class ScanProfile:
+    """Match spans of a profiled scan with the time spent per pattern.
+
+    ``prefilter_seconds`` is the shared prefilter pass and candidate dispatch,
+    i.e. the scan's time not attributed to any one pattern.
+    """
+    hits: List[List[Span]]
+    prefilter_seconds: float
+    patterns: List[PatternCost] = field(default_factory=list)
+
+class CompiledRuleEngine:
+    """Collect every match of many patterns with one scan of the text.
+
+    Each pattern is reduced to the ASCII literals its matches must start with.
+    Those literals are merged into a single trie-shaped regex that is run once
+    over the case-folded text to find candidate positions; each candidate is
+    then verified with the real pattern, anchored at that position. The spans
+    reported for each pattern are exactly what ``re.finditer`` would return.
+    Patterns without a usable literal prefix are scanned on their own.
+    """
+
+    def __init__(self, patterns: Sequence[str], flags: int = re.IGNORECASE):
+        self.patterns = list(patterns)
+        self.flags = flags
+        self.compiled = [re.compile(p, flags) for p in self.patterns]
+
+        # first folded character -> [(pattern index, literal prefixes)]
+        self._buckets: Dict[str, List[Tuple[int, Tuple[str, ...]]]] = {}
+        self._standalone_ids: List[int] = []
+        literals: Set[str] = set()
+        for idx, compiled in enumerate(self.compiled):
+            prefixes = self._usable_prefixes(compiled)
+            if prefixes is None:
+                self._standalone_ids.append(idx)
+                continue
+            literals |= prefixes
+            for first in {p[0] for p in prefixes}:
+                self._buckets.setdefault(first, []).append(
+                    (idx, tuple(p for p in prefixes if p[0] == first))
+                )
+
+        self.prefilter: Optional[re.Pattern] = (
+            re.compile(f"(?=({_trie_regex(literals)}))") if literals else None
+        )
+
+    def _usable_prefixes(self, compiled: re.Pattern) -> Optional[Set[str]]:
+        """Return the prefilter literals for a pattern, or None to scan it on its own."""
+        # Folding only matches IGNORECASE semantics when the whole pattern is case-insensitive
+        if not compiled.flags & re.IGNORECASE:
+            return None
+        try:
+            parsed = sre_parse.parse(compiled.pattern, compiled.flags)
+        except re.error:
+            return None
+        prefixes, _ = _literal_prefixes(parsed)
+        if not prefixes or min(len(p) for p in prefixes) < MIN_PREFIX_LENGTH:
+            return None
+        return prefixes
+
+    def is_prefiltered(self, pattern_id: int) -> bool:
+        """Whether a pattern is found through the shared prefilter rather than scanned on its own."""
+        return pattern_id not in self._standalone_ids
+
+    def scan(self, text: str, pos: int = 0, endpos: Optional[int] = None,
+             starts: Optional[Sequence[int]] = None) -> List[List[Span]]:
+        """Return the match spans of every pattern, indexed like ``self.patterns``.
+
+        ``starts`` optionally gives, per pattern, the offset its first match may
+        begin at (at least ``pos``), for resuming a scan part way through a text.
+        """
+        if endpos is None:
+            endpos = len(text)
+        if starts is None:
+            starts = [pos] * len(self.patterns)
+        hits: List[List[Span]] = [[] for _ in self.patterns]
+
+        if self.prefilter is not None:
+            folded = fold_case(text)
+            buckets = self._buckets
+            compiled = self.compiled
+            last_end = list(starts)
+            startswith = folded.startswith
+
+            for candidate in self.prefilter.finditer(folded, pos, endpos):
+                start = candidate.start()
+                for idx, prefixes in buckets[folded[start]]:
+                    if start < last_end[idx] or not any(startswith(p, start) for p in prefixes):
+                        continue
+                    m = compiled[idx].match(text, start, endpos)
+                    if m is not None:
+                        hits[idx].append(m.span())
+                        last_end[idx] = m.end()
+
+        for idx in self._standalone_ids:
+            hits[idx] = [m.span() for m in self.compiled[idx].finditer(text, starts[idx], endpos)]
+
+        return hits
+
+    def profile(self, text: str) -> ScanProfile:
+        """Scan like ``scan`` while timing each pattern's own work, for finding costly patterns.
+
+        Prefiltered patterns are charged for verifying their candidate
+        positions, standalone patterns for their full ``finditer`` pass.
+        Timing every candidate makes this slower than ``scan``.
+        """
+        standalone = set(self._standalone_ids)
+        costs = [PatternCost(prefiltered=idx not in standalone) for idx in range(len(self.patterns))]
+        hits: List[List[Span]] = [[] for _ in self.patterns]
+        prefilter_seconds = 0.0
+
+        if self.prefilter is not None:
+            started = perf_counter()
+            folded = fold_case(text)
+            last_end = [0] * len(self.patterns)
+            for candidate in self.prefilter.finditer(folded):
+                start = candidate.start()
+                for idx, prefixes in self._buckets[folded[start]]:
+                    if start < last_end[idx] or not any(folded.startswith(p, start) for p in prefixes):
+                        continue
+                    cost = costs[idx]
+                    began = perf_counter()
+                    m = self.compiled[idx].match(text, start)
+                    cost.seconds += perf_counter() - began
+                    cost.candidates += 1
+                    if m is not None:
+                        hits[idx].append(m.span())
+                        last_end[idx] = m.end()
+            verified = sum(costs[idx].seconds for idx in range(len(costs)) if idx not in standalone)
+            prefilter_seconds = perf_counter() - started - verified
+
+        for idx in self._standalone_ids:
+            began = perf_counter()
+            hits[idx] = [m.span() for m in self.compiled[idx].finditer(text)]
+            costs[idx].seconds = perf_counter() - began
+
+        for cost, spans in zip(costs, hits):
+            cost.matches = len(spans)
+        return ScanProfile(hits, prefilter_seconds, costs)
@@ -0,0 +1,157 @@
+"""Compare any number of policies against one ruleset with a single analysis pass each."""
+
+from dataclasses import dataclass
+from itertools import repeat
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Union
+import json
+
+from ingestion import ExtractionError, extract_documents
+from main import ComplianceAnalyzer, ComplianceResult, _analyze_in_worker
+
+if TYPE_CHECKING:
+    import numpy
+    from result_batch import ResultBatch
+
+@dataclass
+class PatternInfo:
+    """One row of the presence matrix."""
+    category: str
+    pattern: str
+    description: str
+
+@dataclass
+class PolicyComparison:
+    """Results of many policies side by side.
+
+    ``counts`` is a pattern-by-document matrix of match counts taken from
+    each result's match index, ``presence`` its boolean form, and
+    ``category_scores`` a category-by-document score matrix. Rows follow
+    ``patterns`` and ``categories``, columns follow ``labels``.
+    """
+    labels: List[str]
+    results: List[ComplianceResult]
+    patterns: List[PatternInfo]
+    categories: List[str]
+    counts: "numpy.ndarray"
+    presence: "numpy.ndarray"
+    category_scores: "numpy.ndarray"
+
+    @property
+    def scores(self) -> List[float]:
+        return [result.score for result in self.results]
+
+    def coverage(self) -> "numpy.ndarray":
+        """Fraction of documents that match each pattern."""
+        return self.presence.mean(axis=1)
+
+    def common_patterns(self) -> List[PatternInfo]:
+        """Patterns every document matches."""
+        return [self.patterns[i] for i in self.presence.all(axis=1).nonzero()[0]]
+
+    def missing_everywhere(self) -> List[PatternInfo]:
+        """Patterns no document matches."""
+        return [self.patterns[i] for i in (~self.presence.any(axis=1)).nonzero()[0]]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return a JSON-serializable form of the comparison."""
+        coverage = self.coverage()
+        return {
+            'policies': [
+                {
+                    'label': label,
+                    'score': result.score,
+                    'is_compliant': result.is_compliant,
+                    'category_scores': result.category_scores,
+                }
+                for label, result in zip(self.labels, self.results)
+            ],
+            'categories': self.categories,
+            'patterns': [
+                {
+                    'category': info.category,
+                    'pattern': info.pattern,
+                    'description': info.description,
+                    'coverage': float(coverage[row]),
+                    'matches': self.counts[row].tolist(),
+                }
+                for row, info in enumerate(self.patterns)
+            ],
+            'common_patterns': [info.description for info in self.common_patterns()],
+            'missing_patterns': [info.description for info in self.missing_everywhere()],
+        }
+
+def analyze_texts(analyzer: ComplianceAnalyzer, texts: Sequence[str], min_score: float = 0.6,
+                  workers: int = 1) -> List[ComplianceResult]:
+    """Analyze each text once, in a process pool when ``workers`` > 1; nothing is stored."""
+    if workers <= 1 or len(texts) <= 1:
+        return [analyzer.check_compliance(text, min_score=min_score, store=False) for text in texts]
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    chunksize = max(1, len(texts) // (workers * 4))
+    with ProcessPoolExecutor(min(workers, len(texts))) as pool:
+        return list(pool.map(
+            _analyze_in_worker, repeat(analyzer.categories), repeat(analyzer.proximity),
+            texts, repeat(min_score), repeat(analyzer.match_timeout), chunksize=chunksize
+        ))
+
+def compare_texts(analyzer: ComplianceAnalyzer, texts: Sequence[str], labels: Sequence[str],
+                  min_score: float = 0.6, workers: int = 1, store: bool = False) -> PolicyComparison:
+    """Analyze the texts and build the presence and score matrices.
+
+    With ``store=True`` the results are written to history in one transaction.
+    """
+    from result_batch import ResultBatch
+
+    if len(texts) != len(labels):
+        raise ValueError("Every text needs a label")
+    results = analyze_texts(analyzer, texts, min_score, workers)
+    if store:
+        analyzer.store_results(results)
+    return compare_batch(ResultBatch.from_results(results, analyzer.get_ruleset()), labels, results)
+
+def compare_batch(batch: "ResultBatch", labels: Sequence[str],
+                  results: Optional[List[ComplianceResult]] = None) -> PolicyComparison:
+    """Build a comparison from a columnar batch, e.g. one loaded from history, without re-scanning."""
+    if len(batch) != len(labels):
+        raise ValueError("Every row needs a label")
+    keys = batch.keys
+    patterns = [
+        PatternInfo(keys.categories[category], pattern, description)
+        for pattern, category, description in zip(keys.patterns, keys.pattern_categories,
+                                                   keys.descriptions)
+    ]
+    # Pattern columns are the match index's pattern ids, so presence needs no pattern lookups
+    return PolicyComparison(
+        labels=list(labels),
+        results=results if results is not None else list(batch),
+        patterns=patterns,
+        categories=list(keys.categories),
+        counts=batch.match_counts.T,
+        presence=batch.matched.T,
+        category_scores=batch.category_scores.T,
+    )
+
+def compare_files(analyzer: ComplianceAnalyzer, paths: Sequence[Union[str, Path]],
+                  min_score: float = 0.6, workers: int = 1, store: bool = False) -> PolicyComparison:
+    """Compare policy files, labelled by file name (or full path when names repeat).
+
+    PDF, Word, HTML and Markdown files are compared by their extracted text.
+    """
+    paths = [Path(path) for path in paths]
+    names = [path.name for path in paths]
+    labels = names if len(set(names)) == len(names) else [str(path) for path in paths]
+    texts = []
+    for _, document, error in extract_documents(paths, workers):
+        if error is not None:
+            raise ExtractionError(error)
+        texts.append(document.read_text())
+    return compare_texts(analyzer, texts, labels, min_score, workers, store)
+
+def write_comparison_json(comparison: PolicyComparison, output_path: Optional[str] = None) -> str:
+    """Write the comparison as JSON to ``output_path`` and return the JSON text."""
+    payload = json.dumps(comparison.to_dict(), indent=2)
+    if output_path is not None:
+        Path(output_path).write_text(payload)
+    return payload
@@ -0,0 +1,136 @@
+"""Word-distance proximity scoring between pattern matches."""
+
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from typing import List, Mapping, Optional, Sequence, Tuple
+import os
+import re
+
+# Words are maximal runs of non-whitespace, the same tokens str.split() produces
+WORD_PATTERN = re.compile(r"\S+")
+
+Span = Tuple[int, int]
+# (start, end, words starting before start, words ending at or before end)
+Mark = Tuple[int, int, int, int]
+
+# Environment variables shared with the web backend's Settings
+ENABLE_ENV = "ENABLE_PROXIMITY_ANALYSIS"
+MAX_WORDS_ENV = "PROXIMITY_MAX_WORDS"
+
+@dataclass(frozen=True)
+class ProximitySettings:
+    """Which pattern pairs are scored for proximity, and how far apart they may be.
+
+    ``pairs`` names pattern pairs by description; by default every pair of
+    patterns within a category is scored. Matches more than ``max_words``
+    words apart score 0. With ``enabled=False`` the stage is skipped and
+    results carry no proximity scores.
+    """
+    enabled: bool = True
+    pairs: Optional[Tuple[Tuple[str, str], ...]] = None
+    max_words: Optional[int] = None
+
+    def __post_init__(self):
+        if self.pairs is not None:
+            object.__setattr__(self, "pairs", tuple((a, b) for a, b in self.pairs))
+        if self.max_words is not None and self.max_words < 0:
+            raise ValueError("max_words must not be negative")
+
+    def spec(self) -> Optional[List]:
+        """Return the JSON-serializable definition, or None for the defaults."""
+        if self == ProximitySettings():
+            return None
+        return [self.enabled, [list(pair) for pair in self.pairs] if self.pairs is not None else None,
+                self.max_words]
+
+    @classmethod
+    def from_env(cls, environ: Mapping[str, str] = os.environ) -> "ProximitySettings":
+        """Read ``ENABLE_PROXIMITY_ANALYSIS`` and ``PROXIMITY_MAX_WORDS``, as the backend does."""
+        enabled = environ.get(ENABLE_ENV, "true").strip().lower() not in ("0", "false", "no", "off")
+        max_words = environ.get(MAX_WORDS_ENV, "").strip()
+        return cls(enabled=enabled, max_words=int(max_words) if max_words else None)
+
+class WordIndex:
+    """Word offsets of a document, tokenized once and shared by every pattern pair."""
+
+    def __init__(self, text: str):
+        self.starts: List[int] = []
+        self.ends: List[int] = []
+        for m in WORD_PATTERN.finditer(text):
+            self.starts.append(m.start())
+            self.ends.append(m.end())
+
+    def marks(self, spans: Sequence[Span]) -> List[Mark]:
+        """Map match spans to their positions in the word sequence."""
+        starts, ends = self.starts, self.ends
+        return [
+            (start, end, bisect_left(starts, start), bisect_right(ends, end))
+            for start, end in spans
+        ]
+
+class ProximityTracker:
+    """Running minimum word gap between the matches of two patterns.
+
+    Matches are fed in start order, possibly over several calls, so the gap
+    can be tracked while a document is streamed. Each match is only compared
+    with the previous match of the other pattern that reaches furthest, which
+    is always the closest one, so the cost is linear in the number of matches.
+    """
+
+    def __init__(self, max_words: Optional[int] = None):
+        self.max_words = max_words
+        self.best: Optional[int] = None
+        self._reach: List[Optional[Mark]] = [None, None]  # furthest-ending mark seen per pattern
+
+    def feed(self, marks1: Sequence[Mark], marks2: Sequence[Mark]):
+        """Add the next matches of both patterns; each list must be sorted by start."""
+        reach = self._reach
+        best = self.best
+        n1, n2 = len(marks1), len(marks2)
+        i = j = 0
+        while (i < n1 or j < n2) and best != 0:
+            if j >= n2 or (i < n1 and marks1[i][0] <= marks2[j][0]):
+                side, current = 0, marks1[i]
+                i += 1
+            else:
+                side, current = 1, marks2[j]
+                j += 1
+
+            other = reach[1 - side]
+            if other is not None:
+                # Touching or overlapping matches have no words between them
+                gap = 0 if other[1] >= current[0] else current[2] - other[3]
+                if best is None or gap < best:
+                    best = gap
+
+            previous = reach[side]
+            if previous is None or current[1] > previous[1]:
+                reach[side] = current
+        self.best = best
+
+    def score(self) -> float:
+        """Convert the minimum word gap to a score in (0, 1]; closer matches score higher.
+
+        Gaps wider than ``max_words`` score 0.
+        """
+        if self.best is None or (self.max_words is not None and self.best > self.max_words):
+            return 0.0
+        return 1.0 / (1.0 + self.best)
+
+def min_word_gap(marks1: Sequence[Mark], marks2: Sequence[Mark]) -> Optional[int]:
+    """Return the fewest words between any match of one list and any match of the other.
+
+    Both lists must be sorted by start offset. The gap counts the whitespace-
+    separated tokens in the text between the two matches, including partial
+    words, and is 0 when the matches touch or overlap.
+    """
+    tracker = ProximityTracker()
+    tracker.feed(marks1, marks2)
+    return tracker.best
+
+def proximity_score(marks1: Sequence[Mark], marks2: Sequence[Mark],
+                    max_words: Optional[int] = None) -> float:
+    """Convert the minimum word gap to a score in (0, 1]; closer matches score higher."""
+    tracker = ProximityTracker(max_words)
+    tracker.feed(marks1, marks2)
+    return tracker.score()
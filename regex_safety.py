@@ -0,0 +1,168 @@
+"""Static checks for regex shapes that backtrack catastrophically."""
+
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+import re
+import string
+
+from pattern_engine import sre_parse
+
+class UnsafePatternWarning(UserWarning):
+    """Issued when a ruleset with backtracking-prone patterns is used without a match timeout."""
+
+_REPEATS = (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT)
+# Possessive repeats and atomic groups never backtrack into their body (Python 3.11+)
+_POSSESSIVE_REPEAT = getattr(sre_parse, "POSSESSIVE_REPEAT", None)
+_ATOMIC_GROUP = getattr(sre_parse, "ATOMIC_GROUP", None)
+_ASCII = frozenset(chr(code) for code in range(128))
+_CATEGORIES = {
+    sre_parse.CATEGORY_DIGIT: frozenset(string.digits),
+    sre_parse.CATEGORY_SPACE: frozenset(" \t\n\r\f\v"),
+    sre_parse.CATEGORY_WORD: frozenset(string.ascii_letters + string.digits + "_"),
+}
+_CATEGORIES.update({
+    sre_parse.CATEGORY_NOT_DIGIT: _ASCII - _CATEGORIES[sre_parse.CATEGORY_DIGIT],
+    sre_parse.CATEGORY_NOT_SPACE: _ASCII - _CATEGORIES[sre_parse.CATEGORY_SPACE],
+    sre_parse.CATEGORY_NOT_WORD: _ASCII - _CATEGORIES[sre_parse.CATEGORY_WORD],
+})
+
+NESTED_QUANTIFIER = "nested quantifier"
+OVERLAPPING_ALTERNATION = "quantified alternation with overlapping branches"
+ADJACENT_QUANTIFIERS = "adjacent quantifiers over overlapping characters"
+
+def _fold(chars) -> Set[str]:
+    return {ch.lower() for ch in chars}
+
+def _class_chars(items) -> Set[str]:
+    """ASCII characters matched by the body of a ``[...]`` class."""
+    chars: Set[str] = set()
+    negate = False
+    for op, av in items:
+        if op == sre_parse.NEGATE:
+            negate = True
+        elif op == sre_parse.LITERAL:
+            if av < 128:
+                chars.add(chr(av))
+        elif op == sre_parse.RANGE:
+            chars |= {chr(code) for code in range(av[0], min(av[1], 127) + 1)}
+        elif op == sre_parse.CATEGORY:
+            chars |= _CATEGORIES.get(av, _ASCII)
+        else:
+            chars |= _ASCII
+    return _fold(_ASCII - chars if negate else chars)
+
+def _first_chars(items) -> Tuple[Set[str], bool]:
+    """Return the ASCII characters a match of ``items`` can start with, and whether it can be empty."""
+    chars: Set[str] = set()
+    for op, av in items:
+        if op == sre_parse.LITERAL:
+            item, nullable = _fold({chr(av)}) if av < 128 else set(), False
+        elif op == sre_parse.NOT_LITERAL:
+            item, nullable = _fold(_ASCII - {chr(av)}), False
+        elif op == sre_parse.ANY:
+            item, nullable = set(_ASCII - {"\n"}), False
+        elif op == sre_parse.IN:
+            item, nullable = _class_chars(av), False
+        elif op == sre_parse.SUBPATTERN:
+            item, nullable = _first_chars(av[-1])
+        elif op in _REPEATS or op == _POSSESSIVE_REPEAT:
+            item, nullable = _first_chars(av[2])
+            nullable = nullable or av[0] == 0
+        elif op == _ATOMIC_GROUP:
+            item, nullable = _first_chars(av)
+        elif op == sre_parse.BRANCH:
+            item, nullable = set(), False
+            for branch in av[1]:
+                branch_chars, branch_nullable = _first_chars(branch)
+                item |= branch_chars
+                nullable = nullable or branch_nullable
+        elif op in (sre_parse.AT, sre_parse.ASSERT, sre_parse.ASSERT_NOT):
+            item, nullable = set(), True
+        else:
+            item, nullable = set(_ASCII), True  # back-references and the like: assume anything
+        chars |= item
+        if not nullable:
+            return chars, False
+    return chars, True
+
+def _single_character(body) -> Optional[Set[str]]:
+    """Characters of a repeat body that matches exactly one character, else None."""
+    if len(body) == 1 and body[0][0] in (sre_parse.LITERAL, sre_parse.NOT_LITERAL,
+                                          sre_parse.ANY, sre_parse.IN):
+        return _first_chars(body)[0]
+    return None
+
+def _alternations(body):
+    """Yield the branch lists of alternations in a repeat body, looking through plain groups."""
+    for op, av in body:
+        if op == sre_parse.BRANCH:
+            yield av[1]
+        elif op == sre_parse.SUBPATTERN:
+            yield from _alternations(av[-1])
+
+def _walk(items, in_repeat: bool, risks: List[str]):
+    run: Set[str] = set()  # characters of the run of single-character repeats just seen
+    for op, av in items:
+        if op in _REPEATS:
+            low, high, body = av
+            if in_repeat and high > 1 and high != low:
+                risks.append(NESTED_QUANTIFIER)
+            if high > 1:
+                # A branch that can match nothing is followed by the next repetition
+                body_first, _ = _first_chars(body)
+                for branches in _alternations(body):
+                    seen: Set[str] = set()
+                    for branch in branches:
+                        first, nullable = _first_chars(branch)
+                        if nullable:
+                            first |= body_first
+                        if seen & first:
+                            risks.append(OVERLAPPING_ALTERNATION)
+                            break
+                        seen |= first
+            chars = _single_character(body) if high == sre_parse.MAXREPEAT else None
+            if chars is not None:
+                if run & chars:
+                    risks.append(ADJACENT_QUANTIFIERS)
+                run = run | chars if low == 0 else set(chars)
+            else:
+                run = set()
+            _walk(body, in_repeat or high > 1, risks)
+        elif op in (_POSSESSIVE_REPEAT, _ATOMIC_GROUP):
+            run = set()
+        elif op == sre_parse.SUBPATTERN:
+            run = set()
+            _walk(av[-1], in_repeat, risks)
+        elif op == sre_parse.BRANCH:
+            run = set()
+            for branch in av[1]:
+                _walk(branch, in_repeat, risks)
+        elif op in (sre_parse.ASSERT, sre_parse.ASSERT_NOT):
+            _walk(av[1], in_repeat, risks)
+        elif op != sre_parse.AT:
+            run = set()
+
+def backtracking_risks(pattern: str, flags: int = re.IGNORECASE) -> List[str]:
+    """Return the shapes in a regex known to cause catastrophic backtracking.
+
+    Flags nested variable quantifiers such as ``(a+)+``, repeated
+    alternations whose branches can start with the same character such as
+    ``(a|aa)+``, and consecutive unbounded single-character repeats over
+    overlapping characters such as ``\\w+\\w*``. These are candidates, not
+    proof: whether a pattern blows up depends on the text it fails on.
+    """
+    try:
+        parsed = sre_parse.parse(pattern, flags)
+    except re.error as e:
+        return [f"invalid regex: {e}"]
+    risks: List[str] = []
+    _walk(parsed, False, risks)
+    return list(dict.fromkeys(risks))
+
+def unsafe_patterns(patterns: Sequence[str], flags: int = re.IGNORECASE) -> Dict[int, List[str]]:
+    """Return the backtracking risks of each risky pattern, keyed by its index in ``patterns``."""
+    risky = {}
+    for idx, pattern in enumerate(patterns):
+        risks = backtracking_risks(pattern, flags)
+        if risks:
+            risky[idx] = risks
+    return risky
@@ -0,0 +1,301 @@
+"""Reusable PDF report renderer with styles and table layouts built once per process."""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+import html
+import threading
+
+from charts import chart_image, render_grouped_bar_chart, render_line_chart
+
+# Fonts used by the report styles; their metrics are loaded up front
+REPORT_FONTS = ("Helvetica", "Helvetica-Bold")
+
+def escape(text: str) -> str:
+    """Escape ``&``, ``<`` and ``>`` for paragraph markup.
+
+    Same as ``xml.sax.saxutils.escape``, which would import urllib and ssl at startup.
+    """
+    return html.escape(text, quote=False)
+
+class ReportRenderer:
+    """Render compliance and comparison reports with shared, prebuilt layout.
+
+    The sample stylesheet, custom paragraph styles and table styles are built
+    once and reused for every report; they are read-only, so one renderer can
+    be shared by threads. Detected patterns are laid out as one paragraph per
+    category instead of one per match.
+    """
+
+    def __init__(self):
+        # Report dependencies are heavy to import, so they are only loaded when rendering
+        from reportlab.lib import colors
+        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+        from reportlab.pdfbase import pdfmetrics
+        from reportlab.platypus import TableStyle
+
+        for font in REPORT_FONTS:
+            pdfmetrics.getFont(font)
+
+        self.styles = getSampleStyleSheet()
+        self.title_style = ParagraphStyle(
+            'CustomTitle',
+            parent=self.styles['Heading1'],
+            fontSize=24,
+            spaceAfter=30
+        )
+        self.comparison_title_style = ParagraphStyle(
+            'ComparisonTitle',
+            parent=self.styles['Heading1'],
+            fontSize=24,
+            spaceAfter=30,
+            alignment=1  # Center alignment
+        )
+        self.comparison_heading_style = ParagraphStyle(
+            'ComparisonHeading2',
+            parent=self.styles['Heading2'],
+            fontSize=16,
+            spaceBefore=20,
+            spaceAfter=10
+        )
+
+        header = [
+            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ]
+        body = [
+            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+            ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
+        ]
+        grid = [('GRID', (0, 0), (-1, -1), 1, colors.black)]
+        self.proximity_table_style = TableStyle(header + [
+            ('FONTSIZE', (0, 0), (-1, 0), 14),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ] + body + [
+            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 1), (-1, -1), 12),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ] + grid)
+        self.summary_table_style = TableStyle(header + [
+            ('FONTSIZE', (0, 0), (-1, 0), 14),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ] + body + [
+            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 1), (-1, -1), 12),
+        ] + grid)
+        self.comparison_table_style = TableStyle(header + [
+            ('FONTSIZE', (0, 0), (-1, 0), 12),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ] + body + grid)
+
+    def render(self, result, trends: Optional[Dict], output_path: str):
+        """Write the compliance report for one result and its historical trends."""
+        from reportlab.lib.pagesizes import letter
+        from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table
+
+        styles = self.styles
+        normal, heading2, heading3 = styles['Normal'], styles['Heading2'], styles['Heading3']
+        story = [
+            Paragraph("ISO 42001 Compliance Report", self.title_style),
+            Spacer(1, 12),
+            # Overall Results
+            Paragraph(f"Overall Compliance: {'PASS' if result.is_compliant else 'FAIL'}", heading2),
+            Paragraph(f"Score: {result.score:.2f}", normal),
+            Paragraph(f"Timestamp: {result.timestamp}", normal),
+            Spacer(1, 12),
+            # Category Results
+            Paragraph("Category Analysis", heading2),
+        ]
+        story.extend(
+            Paragraph(f"{escape(category)}: {score:.2f}", normal)
+            for category, score in result.category_scores.items()
+        )
+        story.append(Spacer(1, 12))
+
+        # Pattern Matches, one paragraph per category
+        story.append(Paragraph("Detected Patterns", heading2))
+        for category, patterns in result.found_patterns.items():
+            story.append(Paragraph(f"{escape(category)}:", heading3))
+            if patterns:
+                story.append(Paragraph("<br/>".join(
+                    f"- Pattern '{escape(pattern)}' matched: '{escape(match)}'"
+                    for pattern, match in patterns
+                ), normal))
+        story.append(Spacer(1, 12))
+
+        # Proximity Analysis
+        story.append(Paragraph("Pattern Proximity Analysis", heading2))
+        proximity_data = [
+            [key, f"{score:.2f}"] for key, score in result.proximity_scores.items() if score > 0
+        ]
+        if proximity_data:
+            table = Table(proximity_data)
+            table.setStyle(self.proximity_table_style)
+            story.append(table)
+        story.append(Spacer(1, 12))
+
+        # Historical Trends
+        story.append(Paragraph("Historical Trends", heading2))
+        if trends:
+            # Charts are rendered in memory; nothing is written to the working directory
+            story.append(chart_image(render_line_chart(
+                {'Overall': trends['overall_scores']},
+                'Overall Compliance Score Trend', 'Assessment Number', 'Score', legend=False
+            )))
+            story.append(chart_image(render_line_chart(
+                trends['category_scores'],
+                'Category Score Trends', 'Assessment Number', 'Score'
+            )))
+
+        SimpleDocTemplate(output_path, pagesize=letter).build(story)
+
+    def render_many(self, jobs: Iterable[Tuple[object, Optional[Dict], str]]) -> List[Optional[str]]:
+        """Render (result, trends, output path) jobs in turn; returns an error message or None per job."""
+        errors: List[Optional[str]] = []
+        for result, trends, output_path in jobs:
+            try:
+                self.render(result, trends, output_path)
+                errors.append(None)
+            except Exception as e:
+                errors.append(str(e))
+        return errors
+
+    def render_comparison(self, failing_result, passing_result, output_path: str):
+        """Write a side-by-side report of a non-compliant and a compliant policy."""
+        from reportlab.lib.pagesizes import letter, landscape
+        from reportlab.lib.units import inch
+        from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table
+
+        heading2 = self.comparison_heading_style
+        story = [Paragraph("ISO 42001 Compliance Comparison Report", self.comparison_title_style),
+                 Spacer(1, 20)]
+
+        # Overall Comparison Table
+        overall_data = [
+            ["Metric", "Non-Compliant Policy", "Compliant Policy"],
+            ["Overall Score", f"{failing_result.score:.2f}", f"{passing_result.score:.2f}"],
+            ["Status", "FAIL" if not failing_result.is_compliant else "PASS",
+             "FAIL" if not passing_result.is_compliant else "PASS"],
+        ]
+        table = Table(overall_data, colWidths=[2*inch, 3*inch, 3*inch])
+        table.setStyle(self.summary_table_style)
+        story += [table, Spacer(1, 20)]
+
+        # Category Comparison
+        story.append(Paragraph("Category Analysis", heading2))
+        categories = list(failing_result.category_scores.keys())
+        categories_data = [["Category", "Non-Compliant Score", "Compliant Score", "Difference"]]
+        for category in categories:
+            fail_score = failing_result.category_scores[category]
+            pass_score = passing_result.category_scores[category]
+            categories_data.append([
+                category, f"{fail_score:.2f}", f"{pass_score:.2f}", f"{pass_score - fail_score:+.2f}"
+            ])
+        table = Table(categories_data, colWidths=[2*inch, 2*inch, 2*inch, 2*inch])
+        table.setStyle(self.comparison_table_style)
+        story += [table, Spacer(1, 20)]
+
+        # Create comparison chart
+        chart = render_grouped_bar_chart(
+            categories,
+            {
+                'Non-Compliant': [failing_result.category_scores[cat] for cat in categories],
+                'Compliant': [passing_result.category_scores[cat] for cat in categories],
+            },
+            'Category Comparison', 'Score'
+        )
+        story += [chart_image(chart, width=400, height=200), Spacer(1, 20)]
+
+        # Pattern Analysis
+        story.append(Paragraph("Pattern Matches", heading2))
+        failing_patterns = {p[0] for patterns in failing_result.found_patterns.values() for p in patterns}
+        passing_patterns = {p[0] for patterns in passing_result.found_patterns.values() for p in patterns}
+        pattern_data = [["Pattern", "Non-Compliant", "Compliant"]] + [
+            [pattern,
+             "✓" if pattern in failing_patterns else "✘",
+             "✓" if pattern in passing_patterns else "✘"]
+            for pattern in sorted(failing_patterns | passing_patterns)
+        ]
+        table = Table(pattern_data, colWidths=[3*inch, 2*inch, 2*inch])
+        table.setStyle(self.comparison_table_style)
+        story.append(table)
+
+        SimpleDocTemplate(output_path, pagesize=landscape(letter)).build(story)
+
+    def render_portfolio(self, comparison, output_path: str, columns_per_table: int = 6):
+        """Write a report comparing any number of policies from a ``PolicyComparison``.
+
+        Documents are split across tables of at most ``columns_per_table``
+        columns so wide portfolios stay readable.
+        """
+        from reportlab.lib.pagesizes import letter, landscape
+        from reportlab.lib.units import inch
+        from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table
+
+        heading2 = self.comparison_heading_style
+        labels = comparison.labels
+        story = [Paragraph(f"ISO 42001 Compliance Comparison: {len(labels)} Policies",
+                           self.comparison_title_style), Spacer(1, 20)]
+
+        # Overall results, one row per policy
+        overall_data = [["Policy", "Overall Score", "Status"]] + [
+            [label, f"{result.score:.2f}", "PASS" if result.is_compliant else "FAIL"]
+            for label, result in zip(labels, comparison.results)
+        ]
+        table = Table(overall_data, colWidths=[4*inch, 2*inch, 2*inch], repeatRows=1)
+        table.setStyle(self.summary_table_style)
+        story += [table, Spacer(1, 20)]
+
+        groups = [range(lo, min(lo + columns_per_table, len(labels)))
+                  for lo in range(0, len(labels), columns_per_table)]
+        width = 9 * inch
+
+        # Category scores, categories by policies
+        story.append(Paragraph("Category Analysis", heading2))
+        for group in groups:
+            data = [["Category"] + [labels[col] for col in group]] + [
+                [category] + [f"{comparison.category_scores[row, col]:.2f}" for col in group]
+                for row, category in enumerate(comparison.categories)
+            ]
+            table = Table(data, colWidths=[2*inch] + [(width - 2*inch) / len(group)] * len(group),
+                          repeatRows=1)
+            table.setStyle(self.comparison_table_style)
+            story += [table, Spacer(1, 12)]
+
+        if len(labels) <= columns_per_table:
+            chart = render_grouped_bar_chart(
+                comparison.categories,
+                {label: comparison.category_scores[:, col].tolist() for col, label in enumerate(labels)},
+                'Category Comparison', 'Score'
+            )
+            story += [chart_image(chart, width=400, height=200), Spacer(1, 20)]
+
+        # Pattern presence, patterns by policies
+        story.append(Paragraph("Pattern Matches", heading2))
+        coverage = comparison.coverage()
+        for group in groups:
+            data = [["Pattern", "Coverage"] + [labels[col] for col in group]] + [
+                [info.description, f"{coverage[row]:.0%}"] + [
+                    f"✓ {comparison.counts[row, col]}" if comparison.presence[row, col] else "✘"
+                    for col in group
+                ]
+                for row, info in enumerate(comparison.patterns)
+            ]
+            table = Table(data, colWidths=[2.5*inch, 1*inch] + [(width - 3.5*inch) / len(group)] * len(group),
+                          repeatRows=1)
+            table.setStyle(self.comparison_table_style)
+            story += [table, Spacer(1, 12)]
+
+        SimpleDocTemplate(output_path, pagesize=landscape(letter)).build(story)
+
+_renderer: Optional[ReportRenderer] = None
+_renderer_lock = threading.Lock()
+
+def get_report_renderer() -> ReportRenderer:
+    """Return the process-wide renderer, building it on first use."""
+    global _renderer
+    if _renderer is None:
+        with _renderer_lock:
+            if _renderer is None:
+                _renderer = ReportRenderer()
+    return _renderer
@@ -0,0 +1,335 @@
+"""Columnar storage for many compliance results sharing one ruleset."""
+
+from dataclasses import dataclass, replace
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+import json
+import sys
+
+import numpy as np
+
+from history_store import HistoryRecord
+from main import ComplianceResult, _interned_result
+from match_index import MatchIndex
+from ruleset_registry import CompiledRuleset
+
+@dataclass(frozen=True)
+class ResultKeys:
+    """Key table shared by every row of a batch: the columns' names, in order."""
+    categories: Tuple[str, ...]
+    category_weights: Tuple[float, ...]
+    patterns: Tuple[str, ...]
+    descriptions: Tuple[str, ...]
+    pattern_categories: Tuple[int, ...]  # category column of each pattern column
+    proximity: Tuple[str, ...]
+    fingerprint: str  # ruleset the matches were collected with
+    pattern_weights: Tuple[float, ...] = ()
+
+    @classmethod
+    def from_ruleset(cls, ruleset: CompiledRuleset) -> "ResultKeys":
+        intern = sys.intern
+        return cls(
+            categories=tuple(intern(category.name) for category in ruleset.categories),
+            category_weights=tuple(category.weight for category in ruleset.categories),
+            patterns=tuple(intern(p.pattern) for category in ruleset.categories for p in category.patterns),
+            descriptions=tuple(
+                intern(p.description) for category in ruleset.categories for p in category.patterns
+            ),
+            pattern_categories=tuple(
+                idx for idx, category in enumerate(ruleset.categories) for _ in category.patterns
+            ),
+            proximity=tuple(intern(key) for key, _, _ in ruleset.proximity_pairs),
+            fingerprint=ruleset.fingerprint,
+            pattern_weights=tuple(p.weight for category in ruleset.categories for p in category.patterns),
+        )
+
+    def weights_matrix(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the patterns-by-categories weight matrix and each category's total weight.
+
+        ``matched @ weights / totals`` gives the normalized category scores of
+        every row at once; categories without weight score 0.
+        """
+        weights = np.zeros((len(self.patterns), len(self.categories)))
+        weights[np.arange(len(self.patterns)), list(self.pattern_categories)] = self.pattern_weights
+        return weights, weights.sum(axis=0)
+
+class ResultBatch:
+    """Many results held as NumPy columns instead of one object and four dicts each.
+
+    Row ``i`` is one document. ``category_scores`` has a column per
+    ``keys.categories``; ``matched`` and ``match_counts`` a column per
+    ``keys.patterns``; ``proximity_scores`` a column per ``keys.proximity``
+    (NaN where not recorded). ``first_matches`` keeps the interned first
+    matched text per pattern, or None, when the batch was built from results.
+    ``match_indexes`` keeps each row's serialized match index, or None, so
+    rows written to history keep their match positions.
+    """
+
+    def __init__(self, keys: ResultKeys, scores: np.ndarray, is_compliant: np.ndarray,
+                 category_scores: np.ndarray, matched: np.ndarray, match_counts: np.ndarray,
+                 proximity_scores: np.ndarray, timestamps: List[str],
+                 policy_ids: List[Optional[str]], first_matches: Optional[np.ndarray] = None,
+                 match_indexes: Optional[List[Optional[bytes]]] = None):
+        self.keys = keys
+        self.scores = scores
+        self.is_compliant = is_compliant
+        self.category_scores = category_scores
+        self.matched = matched
+        self.match_counts = match_counts
+        self.proximity_scores = proximity_scores
+        self.timestamps = timestamps
+        self.policy_ids = policy_ids
+        self.first_matches = first_matches
+        self.match_indexes = match_indexes if match_indexes is not None else [None] * len(scores)
+
+    @classmethod
+    def from_results(cls, results: Iterable[ComplianceResult], ruleset: CompiledRuleset) -> "ResultBatch":
+        """Pack results produced with ``ruleset`` into columns."""
+        builder = ResultBatchBuilder(ResultKeys.from_ruleset(ruleset))
+        for result in results:
+            builder.add(result)
+        return builder.build()
+
+    @classmethod
+    def concat(cls, batches: Sequence["ResultBatch"]) -> "ResultBatch":
+        """Join batches built with the same ruleset."""
+        if not batches:
+            raise ValueError("No batches to join")
+        keys = batches[0].keys
+        if any(batch.keys != keys for batch in batches):
+            raise ValueError("Batches were built from different rulesets")
+        with_matches = all(batch.first_matches is not None for batch in batches)
+        return cls(
+            keys,
+            np.concatenate([batch.scores for batch in batches]),
+            np.concatenate([batch.is_compliant for batch in batches]),
+            np.concatenate([batch.category_scores for batch in batches]),
+            np.concatenate([batch.matched for batch in batches]),
+            np.concatenate([batch.match_counts for batch in batches]),
+            np.concatenate([batch.proximity_scores for batch in batches]),
+            [ts for batch in batches for ts in batch.timestamps],
+            [pid for batch in batches for pid in batch.policy_ids],
+            np.concatenate([batch.first_matches for batch in batches]) if with_matches else None,
+            [blob for batch in batches for blob in batch.match_indexes],
+        )
+
+    def __len__(self) -> int:
+        return len(self.scores)
+
+    def __getitem__(self, index: int) -> ComplianceResult:
+        return self.result(index)
+
+    def __iter__(self) -> Iterator[ComplianceResult]:
+        for index in range(len(self)):
+            yield self.result(index)
+
+    def rescore(self, min_score: float = 0.6, pattern_weights: Optional[Sequence[float]] = None,
+                category_weights: Optional[Sequence[float]] = None) -> "ResultBatch":
+        """Score every row from the ``matched`` column, e.g. under new weights or a new threshold.
+
+        Weights default to the batch's own and are given in ``keys.patterns``
+        and ``keys.categories`` order. No text is re-scanned: the returned
+        batch shares the match columns and only its scores are new.
+        """
+        keys = self.keys
+        if pattern_weights is not None:
+            if len(pattern_weights) != len(keys.patterns):
+                raise ValueError(f"Expected {len(keys.patterns)} pattern weights, got {len(pattern_weights)}")
+            keys = replace(keys, pattern_weights=tuple(float(w) for w in pattern_weights))
+        if category_weights is not None:
+            if len(category_weights) != len(keys.categories):
+                raise ValueError(
+                    f"Expected {len(keys.categories)} category weights, got {len(category_weights)}"
+                )
+            keys = replace(keys, category_weights=tuple(float(w) for w in category_weights))
+
+        weights, totals = keys.weights_matrix()
+        raw = self.matched.astype(float) @ weights
+        category_scores = np.divide(raw, totals, out=np.zeros_like(raw), where=totals > 0)
+        scores = category_scores @ np.asarray(keys.category_weights, dtype=float)
+        return ResultBatch(
+            keys, scores, scores >= min_score, category_scores, self.matched, self.match_counts,
+            self.proximity_scores, self.timestamps, self.policy_ids, self.first_matches,
+            self.match_indexes,
+        )
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the numeric columns."""
+        return sum(column.nbytes for column in (
+            self.scores, self.is_compliant, self.category_scores, self.matched,
+            self.match_counts, self.proximity_scores
+        ))
+
+    def result(self, index: int) -> ComplianceResult:
+        """Materialize one row as a ``ComplianceResult`` (without a match index)."""
+        keys = self.keys
+        found_patterns: Dict[str, List[Tuple[str, str]]] = {}
+        for col in self.matched[index].nonzero()[0]:
+            text = self.first_matches[index, col] if self.first_matches is not None else None
+            found_patterns.setdefault(keys.categories[keys.pattern_categories[col]], []).append(
+                (keys.patterns[col], text if text is not None else keys.patterns[col])
+            )
+        proximity = self.proximity_scores[index]
+        return ComplianceResult(
+            is_compliant=bool(self.is_compliant[index]),
+            score=float(self.scores[index]),
+            category_scores=dict(zip(keys.categories, self.category_scores[index].tolist())),
+            found_patterns=found_patterns,
+            timestamp=self.timestamps[index],
+            proximity_scores={
+                key: float(score) for key, score in zip(keys.proximity, proximity) if not np.isnan(score)
+            },
+            policy_id=self.policy_ids[index],
+        )
+
+    def history_records(self) -> Iterator[HistoryRecord]:
+        """Yield one history record per row, for ``HistoryStore.append_many``."""
+        for index in range(len(self)):
+            result = self.result(index)
+            yield HistoryRecord(
+                timestamp=result.timestamp,
+                overall_score=result.score,
+                is_compliant=result.is_compliant,
+                category_scores=result.category_scores,
+                found_patterns=result.found_patterns,
+                policy_id=result.policy_id,
+                match_index=self.match_indexes[index]
+            )
+
+class ResultBatchBuilder:
+    """Append results row by row, then freeze them into a ``ResultBatch``."""
+
+    def __init__(self, keys: ResultKeys, capacity: int = 64):
+        self.keys = keys
+        self._size = 0
+        self._scores = np.empty(capacity)
+        self._compliant = np.empty(capacity, dtype=bool)
+        self._categories = np.empty((capacity, len(keys.categories)))
+        self._matched = np.empty((capacity, len(keys.patterns)), dtype=bool)
+        self._counts = np.empty((capacity, len(keys.patterns)), dtype=np.int32)
+        self._proximity = np.empty((capacity, len(keys.proximity)))
+        self._first = np.empty((capacity, len(keys.patterns)), dtype=object)
+        self._timestamps: List[str] = []
+        self._policy_ids: List[Optional[str]] = []
+        self._match_indexes: List[Optional[bytes]] = []
+        self._pattern_columns = {
+            (keys.categories[keys.pattern_categories[col]], pattern): col
+            for col, pattern in enumerate(keys.patterns)
+        }
+        self._proximity_columns = {key: col for col, key in enumerate(keys.proximity)}
+
+    def _grow(self):
+        for name in ("_scores", "_compliant", "_categories", "_matched", "_counts", "_proximity", "_first"):
+            column = getattr(self, name)
+            grown = np.empty((len(column) * 2,) + column.shape[1:], dtype=column.dtype)
+            grown[:len(column)] = column
+            setattr(self, name, grown)
+
+    def add(self, result: ComplianceResult):
+        """Append one result produced with the builder's ruleset."""
+        if self._size == len(self._scores):
+            self._grow()
+        row = self._size
+        keys = self.keys
+        self._scores[row] = result.score
+        self._compliant[row] = result.is_compliant
+        self._categories[row] = [result.category_scores.get(name, 0.0) for name in keys.categories]
+
+        self._matched[row] = False
+        self._first[row] = None
+        for category, matches in result.found_patterns.items():
+            for pattern, text in matches:
+                col = self._pattern_columns[category, pattern]
+                self._matched[row, col] = True
+                self._first[row, col] = sys.intern(text)
+        if result.match_index is not None:
+            self._counts[row] = result.match_index.counts
+        else:
+            self._counts[row] = self._matched[row]
+
+        self._proximity[row] = np.nan
+        for key, score in result.proximity_scores.items():
+            self._proximity[row, self._proximity_columns[key]] = score
+
+        self._timestamps.append(result.timestamp)
+        self._policy_ids.append(result.policy_id)
+        self._match_indexes.append(
+            result.match_index.to_bytes() if result.match_index is not None else None
+        )
+        self._size += 1
+
+    def add_scan(self, first_matches: Sequence[Optional[str]], counts: Sequence[int],
+                 proximity_scores: Dict[str, float], timestamp: str, policy_id: Optional[str] = None,
+                 match_index: Optional[MatchIndex] = None):
+        """Append one unscored document from its scan: the first match text and
+        match count of each pattern, in ``keys.patterns`` order, and its match index.
+
+        Scores are left NaN for ``ResultBatch.rescore`` to fill in.
+        """
+        if self._size == len(self._scores):
+            self._grow()
+        row = self._size
+        self._scores[row] = np.nan
+        self._compliant[row] = False
+        self._categories[row] = np.nan
+        self._counts[row] = counts
+        self._matched[row] = self._counts[row] > 0
+        self._first[row] = [sys.intern(text) if text is not None else None for text in first_matches]
+
+        self._proximity[row] = np.nan
+        for key, score in proximity_scores.items():
+            self._proximity[row, self._proximity_columns[key]] = score
+
+        self._timestamps.append(timestamp)
+        self._policy_ids.append(policy_id)
+        self._match_indexes.append(match_index.to_bytes() if match_index is not None else None)
+        self._size += 1
+
+    def build(self) -> ResultBatch:
+        size = self._size
+        return ResultBatch(
+            self.keys,
+            self._scores[:size].copy(),
+            self._compliant[:size].copy(),
+            self._categories[:size].copy(),
+            self._matched[:size].copy(),
+            self._counts[:size].copy(),
+            self._proximity[:size].copy(),
+            self._timestamps,
+            self._policy_ids,
+            self._first[:size].copy(),
+            self._match_indexes,
+        )
+
+def batch_from_history(rows: Sequence[Tuple[Any, ...]], ruleset: CompiledRuleset) -> ResultBatch:
+    """Build a batch from (timestamp, policy_id, score, is_compliant, category_scores json,
+    found_patterns json, match_index blob) history rows.
+
+    Match counts come from the stored match index when it was built with a
+    ruleset of the same shape, otherwise from the found patterns.
+    Proximity scores are not stored in history and are NaN.
+    """
+    from match_index import load_match_index
+
+    keys = ResultKeys.from_ruleset(ruleset)
+    known_patterns = set(keys.patterns)
+    builder = ResultBatchBuilder(keys, capacity=max(1, len(rows)))
+    for timestamp, policy_id, score, is_compliant, category_scores, found_patterns, blob in rows:
+        index = load_match_index(blob)
+        if index is not None and index.pattern_count != len(keys.patterns):
+            index = None
+        found = {
+            category: [(pattern, text) for pattern, text in matches if pattern in known_patterns]
+            for category, matches in json.loads(found_patterns).items()
+        }
+        builder.add(_interned_result(
+            is_compliant=bool(is_compliant),
+            score=score,
+            category_scores=json.loads(category_scores),
+            found_patterns=found,
+            timestamp=timestamp,
+            proximity_scores={},
+            policy_id=policy_id,
+            match_index=index
+        ))
+    return builder.build()
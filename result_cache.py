@@ -0,0 +1,183 @@
+"""Content-addressed cache of compliance results."""
+
+from collections import OrderedDict
+from types import SimpleNamespace
+from typing import List, Mapping, Optional, Sequence, Tuple
+import hashlib
+import os
+import threading
+import time
+
+# Default time-to-live in seconds; matches Settings.CACHE_TTL in the backend
+DEFAULT_TTL = 3600
+
+def make_cache_key(text: str, min_score: float, ruleset_fingerprint: str) -> str:
+    """Hash everything a compliance result depends on into one key.
+
+    The text is hashed exactly as given: results carry match offsets and
+    matched text, which any change to whitespace or line endings shifts.
+    """
+    digest = hashlib.sha256()
+    digest.update(ruleset_fingerprint.encode())
+    digest.update(b"\0")
+    digest.update(repr(float(min_score)).encode())
+    digest.update(b"\0")
+    digest.update(text.encode("utf-8", "surrogatepass"))
+    return digest.hexdigest()
+
+class CacheTier:
+    """Interface for one level of the result cache.
+
+    Payloads are serialized results, so tiers never share mutable objects with
+    callers. Each tier owns its eviction policy.
+    """
+
+    def get(self, key: str) -> Optional[str]:
+        raise NotImplementedError
+
+    def put(self, key: str, payload: str):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+class MemoryCacheTier(CacheTier):
+    """In-process LRU tier with a maximum entry count and a time-to-live."""
+
+    def __init__(self, max_entries: int = 1024, ttl: Optional[float] = DEFAULT_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            created_at, payload = entry
+            if self.ttl is not None and time.time() - created_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return payload
+
+    def put(self, key: str, payload: str):
+        with self._lock:
+            self._entries[key] = (time.time(), payload)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+class SQLiteCacheTier(CacheTier):
+    """On-disk tier stored in the analyzer's history database.
+
+    Entries expire after ``ttl`` seconds; once more than ``max_entries`` are
+    stored the oldest are evicted. Eviction runs every ``evict_every`` writes
+    rather than on each one, so the table may briefly exceed its limit.
+    Lookups read committed entries without flushing queued history rows, and
+    writes are queued behind with them, so the tier never adds a commit of
+    its own; other analyzers see an entry once the store has flushed.
+    """
+
+    def __init__(self, store, max_entries: int = 100000, ttl: Optional[float] = DEFAULT_TTL,
+                 evict_every: int = 256):
+        self.store = store
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.evict_every = evict_every
+        self._writes = 0
+
+    def get(self, key: str) -> Optional[str]:
+        rows = self.store.read(
+            "SELECT created_at, result FROM compliance_result_cache WHERE key = ?", (key,)
+        )
+        if not rows:
+            return None
+        created_at, payload = rows[0]
+        if self.ttl is not None and time.time() - created_at > self.ttl:
+            self.store.enqueue("DELETE FROM compliance_result_cache WHERE key = ?", (key,))
+            return None
+        return payload
+
+    def put(self, key: str, payload: str):
+        self.store.enqueue(
+            "INSERT OR REPLACE INTO compliance_result_cache (key, created_at, result) VALUES (?, ?, ?)",
+            (key, time.time(), payload)
+        )
+        self._writes += 1
+        if self._writes % self.evict_every == 0:
+            self.evict()
+
+    def evict(self):
+        """Drop expired entries and the oldest entries beyond ``max_entries``."""
+        if self.ttl is not None:
+            self.store.enqueue(
+                "DELETE FROM compliance_result_cache WHERE created_at < ?", (time.time() - self.ttl,)
+            )
+        self.store.enqueue('''
+        DELETE FROM compliance_result_cache WHERE key IN (
+            SELECT key FROM compliance_result_cache
+            ORDER BY created_at DESC
+            LIMIT -1 OFFSET ?
+        )
+        ''', (self.max_entries,))
+
+    def clear(self):
+        self.store.enqueue("DELETE FROM compliance_result_cache")
+        self.store.flush()
+
+class ResultCache:
+    """Look results up tier by tier, promoting hits into the faster tiers."""
+
+    def __init__(self, tiers: Sequence[CacheTier]):
+        self.tiers: List[CacheTier] = list(tiers)
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_settings(cls, settings, store=None) -> "ResultCache":
+        """Build a cache from backend settings, with a disk tier when a history store is given."""
+        ttl = getattr(settings, "CACHE_TTL", DEFAULT_TTL)
+        tiers: List[CacheTier] = [
+            MemoryCacheTier(getattr(settings, "CACHE_MAX_ENTRIES", 1024), ttl)
+        ]
+        if store is not None:
+            tiers.append(SQLiteCacheTier(store, ttl=ttl))
+        return cls(tiers)
+
+    @classmethod
+    def from_env(cls, environ: Mapping[str, str] = os.environ, store=None) -> "ResultCache":
+        """Build a cache from ``CACHE_TTL`` and ``CACHE_MAX_ENTRIES``, read as the backend does."""
+        settings = SimpleNamespace()
+        for name in ("CACHE_TTL", "CACHE_MAX_ENTRIES"):
+            value = environ.get(name, "").strip()
+            if value:
+                setattr(settings, name, int(value))
+        return cls.from_settings(settings, store)
+
+    def get(self, key: str) -> Optional[str]:
+        for level, tier in enumerate(self.tiers):
+            payload = tier.get(key)
+            if payload is not None:
+                for faster in self.tiers[:level]:
+                    faster.put(key, payload)
+                self.hits += 1
+                return payload
+        self.misses += 1
+        return None
+
+    def put(self, key: str, payload: str):
+        for tier in self.tiers:
+            tier.put(key, payload)
+
+    def clear(self):
+        for tier in self.tiers:
+            tier.clear()
@@ -0,0 +1,217 @@
+"""Declarative rule packs: compliance categories loaded from YAML or JSON files."""
+
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+import hashlib
+import json
+import os
+import pickle
+import re
+import sys
+import tempfile
+
+from main import ComplianceCategory, CompliancePattern
+from proximity import ProximitySettings
+from regex_safety import backtracking_risks
+from ruleset_registry import CompiledRuleset, RulesetRegistry, default_registry
+
+RULE_PACK_SUFFIXES = (".json", ".yaml", ".yml")
+# Bump when the artifact layout or the classes it pickles change
+ARTIFACT_FORMAT = 4
+ARTIFACT_SUFFIX = ".rulepack"
+# Overrides the default artifact directory
+CACHE_DIR_ENV = "AI_GOVERNANCE_CACHE_DIR"
+
+class RulePackError(ValueError):
+    """Raised when a rule pack cannot be read or fails validation."""
+
+def default_cache_dir() -> Path:
+    """Return the directory compiled rule pack artifacts are kept in."""
+    override = os.environ.get(CACHE_DIR_ENV)
+    if override:
+        return Path(override)
+    return Path.home() / ".cache" / "ai_governance_tool" / "rule_packs"
+
+def parse_rule_pack(data: bytes, source: str) -> Dict[str, Any]:
+    """Decode a rule pack document; YAML packs need PyYAML installed."""
+    if Path(source).suffix.lower() in (".yaml", ".yml"):
+        try:
+            import yaml
+        except ImportError:
+            raise RulePackError(f"{source}: PyYAML is required to load YAML rule packs") from None
+        try:
+            document = yaml.safe_load(data)
+        except yaml.YAMLError as e:
+            raise RulePackError(f"{source}: invalid YAML: {e}") from None
+    else:
+        try:
+            document = json.loads(data)
+        except ValueError as e:
+            raise RulePackError(f"{source}: invalid JSON: {e}") from None
+    if not isinstance(document, dict):
+        raise RulePackError(f"{source}: a rule pack must be a mapping with a 'categories' list")
+    return document
+
+def _number(value: Any, where: str, low: float = 0.0, high: Optional[float] = None) -> float:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise RulePackError(f"{where}: expected a number, got {value!r}")
+    if value < low or (high is not None and value > high):
+        bound = f"between {low} and {high}" if high is not None else f"at least {low}"
+        raise RulePackError(f"{where}: must be {bound}, got {value}")
+    return float(value)
+
+def _text(value: Any, where: str) -> str:
+    if not isinstance(value, str) or not value.strip():
+        raise RulePackError(f"{where}: expected a non-empty string")
+    return value
+
+def build_categories(document: Dict[str, Any], source: str) -> List[ComplianceCategory]:
+    """Validate a decoded rule pack and turn it into compliance categories.
+
+    Every pattern must be a valid regex; a pattern's category defaults to the
+    category it is listed under. Patterns prone to catastrophic backtracking
+    are rejected unless the pack sets ``allow_unsafe_patterns: true``, which
+    is meant for analyzers running with a match timeout.
+    """
+    raw_categories = document.get("categories")
+    if not isinstance(raw_categories, list) or not raw_categories:
+        raise RulePackError(f"{source}: 'categories' must be a non-empty list")
+    allow_unsafe = document.get("allow_unsafe_patterns", False)
+    if not isinstance(allow_unsafe, bool):
+        raise RulePackError(f"{source}: allow_unsafe_patterns: expected true or false")
+
+    categories = []
+    names = set()
+    for c_idx, raw in enumerate(raw_categories):
+        where = f"{source}: categories[{c_idx}]"
+        if not isinstance(raw, dict):
+            raise RulePackError(f"{where}: expected a mapping")
+        name = _text(raw.get("name"), f"{where}.name")
+        if name in names:
+            raise RulePackError(f"{where}.name: duplicate category {name!r}")
+        names.add(name)
+
+        raw_patterns = raw.get("patterns")
+        if not isinstance(raw_patterns, list) or not raw_patterns:
+            raise RulePackError(f"{where}.patterns: must be a non-empty list")
+        patterns = []
+        for p_idx, raw_pattern in enumerate(raw_patterns):
+            p_where = f"{where}.patterns[{p_idx}]"
+            if not isinstance(raw_pattern, dict):
+                raise RulePackError(f"{p_where}: expected a mapping")
+            regex = _text(raw_pattern.get("pattern"), f"{p_where}.pattern")
+            try:
+                re.compile(regex, re.IGNORECASE)
+            except re.error as e:
+                raise RulePackError(f"{p_where}.pattern: invalid regex {regex!r}: {e}") from None
+            risks = backtracking_risks(regex)
+            if risks and not allow_unsafe:
+                raise RulePackError(
+                    f"{p_where}.pattern: {regex!r} can backtrack catastrophically ({', '.join(risks)}); "
+                    f"rewrite it, or set allow_unsafe_patterns: true and run with a match timeout"
+                )
+            patterns.append(CompliancePattern(
+                pattern=regex,
+                weight=_number(raw_pattern.get("weight"), f"{p_where}.weight"),
+                category=_text(raw_pattern.get("category", name), f"{p_where}.category"),
+                description=_text(raw_pattern.get("description"), f"{p_where}.description")
+            ))
+
+        categories.append(ComplianceCategory(
+            name=name,
+            patterns=patterns,
+            required_score=_number(raw.get("required_score"), f"{where}.required_score", 0.0, 1.0),
+            weight=_number(raw.get("weight"), f"{where}.weight")
+        ))
+    return categories
+
+def build_proximity(document: Dict[str, Any], source: str) -> ProximitySettings:
+    """Validate a rule pack's optional ``proximity`` section.
+
+    ``pairs`` is a list of two pattern descriptions each; ``max_words`` caps
+    the word gap that still scores; ``enabled: false`` skips the stage.
+    """
+    raw = document.get("proximity")
+    if raw is None:
+        return ProximitySettings()
+    where = f"{source}: proximity"
+    if not isinstance(raw, dict):
+        raise RulePackError(f"{where}: expected a mapping")
+
+    enabled = raw.get("enabled", True)
+    if not isinstance(enabled, bool):
+        raise RulePackError(f"{where}.enabled: expected true or false")
+    max_words = raw.get("max_words")
+    if max_words is not None and (isinstance(max_words, bool) or not isinstance(max_words, int)
+                                  or max_words < 0):
+        raise RulePackError(f"{where}.max_words: expected a non-negative integer")
+    pairs = raw.get("pairs")
+    if pairs is not None:
+        if not isinstance(pairs, list):
+            raise RulePackError(f"{where}.pairs: expected a list")
+        for idx, pair in enumerate(pairs):
+            if not isinstance(pair, list) or len(pair) != 2:
+                raise RulePackError(f"{where}.pairs[{idx}]: expected two pattern descriptions")
+            for description in pair:
+                _text(description, f"{where}.pairs[{idx}]")
+        pairs = tuple(tuple(pair) for pair in pairs)
+    return ProximitySettings(enabled=enabled, pairs=pairs, max_words=max_words)
+
+def _artifact_key(data: bytes) -> str:
+    header = f"{ARTIFACT_FORMAT}:{sys.version_info[0]}.{sys.version_info[1]}:".encode()
+    return hashlib.sha256(header + data).hexdigest()
+
+def _read_artifact(path: Path) -> Optional[CompiledRuleset]:
+    try:
+        return CompiledRuleset.loads(path.read_bytes())
+    except FileNotFoundError:
+        return None
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError, TypeError):
+        # Stale or truncated artifact; it is rebuilt from the pack
+        return None
+
+def _write_artifact(path: Path, ruleset: CompiledRuleset):
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(ruleset.dumps())
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    except OSError:
+        pass  # A read-only cache only costs the next cold start a recompile
+
+def load_rule_pack(path: Union[str, Path], cache_dir: Optional[Union[str, Path]] = None,
+                   registry: RulesetRegistry = default_registry) -> CompiledRuleset:
+    """Load a rule pack file and return its shared compiled ruleset.
+
+    The compiled ruleset is cached as an artifact named after the hash of the
+    file's bytes, so while the file is unchanged a cold start only unpickles
+    the artifact: parsing, validation and the engine's prefix analysis are
+    skipped. Artifacts are trusted local files; keep ``cache_dir`` private.
+    """
+    path = Path(path)
+    if path.suffix.lower() not in RULE_PACK_SUFFIXES:
+        raise RulePackError(f"{path}: rule packs must be one of {', '.join(RULE_PACK_SUFFIXES)}")
+    try:
+        data = path.read_bytes()
+    except OSError as e:
+        raise RulePackError(f"{path}: {e.strerror or e}") from None
+
+    artifact = Path(cache_dir or default_cache_dir()) / (_artifact_key(data) + ARTIFACT_SUFFIX)
+    ruleset = _read_artifact(artifact)
+    if ruleset is None:
+        source = str(path)
+        document = parse_rule_pack(data, source)
+        try:
+            ruleset = CompiledRuleset(build_categories(document, source),
+                                      build_proximity(document, source))
+        except ValueError as e:
+            if isinstance(e, RulePackError):
+                raise
+            raise RulePackError(f"{source}: proximity: {e}") from None
+        _write_artifact(artifact, ruleset)
+    return registry.add(ruleset)
@@ -0,0 +1,153 @@
+"""Cost profiling of a ruleset's patterns and proximity pairs, for tuning rule packs."""
+
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from time import perf_counter
+from typing import Any, Dict, List, Optional
+import json
+
+from proximity import WordIndex, proximity_score
+from ruleset_registry import CompiledRuleset
+
+@dataclass
+class PatternProfile:
+    category: str
+    description: str
+    pattern: str
+    prefiltered: bool
+    seconds: float = 0.0
+    candidates: int = 0
+    matches: int = 0
+    risks: List[str] = field(default_factory=list)
+
+@dataclass
+class PairProfile:
+    key: str
+    seconds: float = 0.0
+    scored: int = 0  # documents where both patterns matched, so the pair was measured
+
+@dataclass
+class RulesetProfile:
+    """Accumulated cost of each pattern and proximity pair over profiled documents.
+
+    Profiles of the same ruleset, e.g. one per worker process, add up with ``merge``.
+    """
+    fingerprint: str
+    patterns: List[PatternProfile]
+    pairs: List[PairProfile]
+    documents: int = 0
+    characters: int = 0
+    prefilter_seconds: float = 0.0
+    tokenize_seconds: float = 0.0
+
+    @classmethod
+    def for_ruleset(cls, ruleset: CompiledRuleset) -> "RulesetProfile":
+        engine = ruleset.engine
+        patterns = []
+        for category in ruleset.categories:
+            for p in category.patterns:
+                patterns.append(PatternProfile(
+                    category.name, p.description, p.pattern, engine.is_prefiltered(len(patterns)),
+                    risks=list(ruleset.unsafe_patterns.get(len(patterns), []))
+                ))
+        return cls(ruleset.fingerprint, patterns, [PairProfile(key) for key, _, _ in ruleset.proximity_pairs])
+
+    def merge(self, other: "RulesetProfile"):
+        if other.fingerprint != self.fingerprint:
+            raise ValueError("Profiles were taken with different rulesets")
+        for mine, theirs in zip(self.patterns, other.patterns):
+            mine.seconds += theirs.seconds
+            mine.candidates += theirs.candidates
+            mine.matches += theirs.matches
+        for mine, theirs in zip(self.pairs, other.pairs):
+            mine.seconds += theirs.seconds
+            mine.scored += theirs.scored
+        self.documents += other.documents
+        self.characters += other.characters
+        self.prefilter_seconds += other.prefilter_seconds
+        self.tokenize_seconds += other.tokenize_seconds
+
+    @property
+    def total_seconds(self) -> float:
+        return (self.prefilter_seconds + self.tokenize_seconds
+                + sum(p.seconds for p in self.patterns) + sum(p.seconds for p in self.pairs))
+
+    def costliest_patterns(self) -> List[PatternProfile]:
+        return sorted(self.patterns, key=lambda p: p.seconds, reverse=True)
+
+    def costliest_pairs(self) -> List[PairProfile]:
+        return sorted(self.pairs, key=lambda p: p.seconds, reverse=True)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the report as JSON-serializable data, costliest patterns and pairs first."""
+        return {
+            'fingerprint': self.fingerprint,
+            'documents': self.documents,
+            'characters': self.characters,
+            'total_seconds': self.total_seconds,
+            'prefilter_seconds': self.prefilter_seconds,
+            'tokenize_seconds': self.tokenize_seconds,
+            'patterns': [asdict(p) for p in self.costliest_patterns()],
+            'pairs': [asdict(p) for p in self.costliest_pairs()],
+        }
+
+    def format_report(self, limit: int = 10) -> str:
+        """Render the ``limit`` costliest patterns and pairs as a text table."""
+        total = self.total_seconds or 1.0
+        lines = [
+            f"Profiled {self.documents} document(s), {self.characters} characters, "
+            f"{self.total_seconds * 1000:.2f} ms",
+            f"  prefilter {self.prefilter_seconds * 1000:9.2f} ms   "
+            f"tokenize {self.tokenize_seconds * 1000:9.2f} ms",
+            "",
+            f"{'ms':>9} {'share':>6} {'tried':>8} {'matches':>8}  pattern",
+        ]
+        for p in self.costliest_patterns()[:limit]:
+            flags = ("" if p.prefiltered else "  [not prefiltered]") + (
+                f"  [RISK: {', '.join(p.risks)}]" if p.risks else "")
+            lines.append(f"{p.seconds * 1000:9.2f} {p.seconds / total:6.1%} {p.candidates:8} "
+                         f"{p.matches:8}  {p.description}: {p.pattern}{flags}")
+        if self.pairs:
+            lines += ["", f"{'ms':>9} {'share':>6} {'scored':>8}  proximity pair"]
+            for pair in self.costliest_pairs()[:limit]:
+                lines.append(f"{pair.seconds * 1000:9.2f} {pair.seconds / total:6.1%} "
+                             f"{pair.scored:8}  {pair.key}")
+        return "\n".join(lines)
+
+    def write(self, output_path: str):
+        Path(output_path).write_text(json.dumps(self.to_dict(), indent=2))
+
+def profile_text(ruleset: CompiledRuleset, text: str,
+                 profile: Optional[RulesetProfile] = None) -> RulesetProfile:
+    """Scan and score proximity for one document, adding its costs to ``profile``."""
+    if profile is None:
+        profile = RulesetProfile.for_ruleset(ruleset)
+    scan = ruleset.engine.profile(text)
+    for pattern, cost in zip(profile.patterns, scan.patterns):
+        pattern.seconds += cost.seconds
+        pattern.candidates += cost.candidates
+        pattern.matches += cost.matches
+    profile.prefilter_seconds += scan.prefilter_seconds
+
+    hits = scan.hits
+    words = None
+    marks: Dict[int, List] = {}
+    for pair, (_, i, j) in zip(profile.pairs, ruleset.proximity_pairs):
+        if not hits[i] or not hits[j]:
+            continue
+        # Tokenizing and locating matches is shared by every pair
+        started = perf_counter()
+        if words is None:
+            words = WordIndex(text)
+        for idx in (i, j):
+            if idx not in marks:
+                marks[idx] = words.marks(hits[idx])
+        began = perf_counter()
+        profile.tokenize_seconds += began - started
+        proximity_score(marks[i], marks[j], ruleset.proximity.max_words)
+        pair.seconds += perf_counter() - began
+        pair.scored += 1
+
+    profile.documents += 1
+    profile.characters += len(text)
+    return profile
@@ -0,0 +1,220 @@
+"""Registry of compiled rulesets shared by every analyzer in a process."""
+
+from collections import OrderedDict
+from copy import deepcopy
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import hashlib
+import json
+import pickle
+import threading
+
+from pattern_engine import CompiledRuleEngine
+from proximity import ProximitySettings
+from regex_safety import unsafe_patterns
+
+# (proximity score key, pattern index, pattern index), indexes into the flat pattern list
+ProximityPair = Tuple[str, int, int]
+
+def ruleset_spec(categories: Sequence[Any], proximity: Optional[ProximitySettings] = None) -> List:
+    """Return the JSON-serializable definition of compliance categories and proximity settings."""
+    spec = [
+        [cat.name, cat.weight, cat.required_score,
+         [[p.pattern, p.weight, p.category, p.description] for p in cat.patterns]]
+        for cat in categories
+    ]
+    # Default settings add nothing, so fingerprints of existing rulesets stay valid
+    proximity_spec = proximity.spec() if proximity is not None else None
+    if proximity_spec is not None:
+        spec.append(["proximity", proximity_spec])
+    return spec
+
+def ruleset_fingerprint(categories: Sequence[Any], proximity: Optional[ProximitySettings] = None) -> str:
+    """Return a hash of the categories, patterns and proximity settings a result depends on."""
+    return hashlib.sha256(json.dumps(ruleset_spec(categories, proximity)).encode()).hexdigest()
+
+def proximity_pairs(categories: Sequence[Any],
+                    proximity: Optional[ProximitySettings] = None) -> List[ProximityPair]:
+    """Return the pattern pairs to score, indexed into the flat pattern list.
+
+    Without declared pairs every pattern pair within a category is scored.
+    Declared pairs name patterns by description; unknown or ambiguous
+    descriptions raise ``ValueError``.
+    """
+    proximity = proximity or ProximitySettings()
+    if not proximity.enabled:
+        return []
+
+    flat = [p for cat in categories for p in cat.patterns]
+    if proximity.pairs is None:
+        pairs = []
+        offset = 0
+        for category in categories:
+            patterns = category.patterns
+            for i in range(len(patterns)):
+                for j in range(i + 1, len(patterns)):
+                    key = f"{patterns[i].description} - {patterns[j].description}"
+                    pairs.append((key, offset + i, offset + j))
+            offset += len(patterns)
+        return pairs
+
+    indexes: Dict[str, int] = {}
+    ambiguous = set()
+    for idx, pattern in enumerate(flat):
+        if pattern.description in indexes:
+            ambiguous.add(pattern.description)
+        indexes.setdefault(pattern.description, idx)
+    pairs = []
+    for first, second in proximity.pairs:
+        for description in (first, second):
+            if description not in indexes:
+                raise ValueError(f"Unknown pattern in proximity pair: {description!r}")
+            if description in ambiguous:
+                raise ValueError(f"Ambiguous pattern in proximity pair: {description!r}")
+        pairs.append((f"{first} - {second}", indexes[first], indexes[second]))
+    return pairs
+
+class CompiledRuleset:
+    """An immutable snapshot of categories and proximity settings with their compiled rule engine.
+
+    The categories are a private copy, so later edits to the caller's lists
+    never leak into a shared ruleset; edited categories fingerprint
+    differently and compile into a new ruleset instead.
+    ``unsafe_patterns`` maps the index of every backtracking-prone pattern
+    to its risks, found once at compile time.
+    """
+
+    def __init__(self, categories: Sequence[Any], proximity: Optional[ProximitySettings] = None):
+        self.categories = deepcopy(list(categories))
+        self.proximity = proximity or ProximitySettings()
+        self.fingerprint = ruleset_fingerprint(self.categories, self.proximity)
+        self.proximity_pairs = proximity_pairs(self.categories, self.proximity)
+        self.engine = CompiledRuleEngine(
+            [p.pattern for cat in self.categories for p in cat.patterns]
+        )
+        self.unsafe_patterns = unsafe_patterns(self.engine.patterns, self.engine.flags)
+
+    def dumps(self) -> bytes:
+        """Serialize the ruleset, including the engine's prefilter tables.
+
+        Loading skips pattern analysis; the regexes themselves are recompiled
+        by the ``re`` module, which caches them per process.
+        """
+        return pickle.dumps(self, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def loads(data: bytes) -> "CompiledRuleset":
+        """Rebuild a ruleset serialized with ``dumps``."""
+        ruleset = pickle.loads(data)
+        if not isinstance(ruleset, CompiledRuleset):
+            raise TypeError("Data does not contain a compiled ruleset")
+        return ruleset
+
+class RulesetRegistry:
+    """Compile each distinct ruleset once and share it across analyzers.
+
+    Rulesets are keyed by fingerprint. Named rulesets, e.g. one per
+    organization, are versioned: registering a different definition under a
+    name bumps its version and drops the previous compiled form unless
+    another name still uses it.
+    Unnamed rulesets are kept in an LRU of ``max_entries``. Forked worker
+    processes inherit the compiled rulesets; other workers can be handed
+    ``CompiledRuleset.dumps()`` and ``add`` the loaded result.
+    """
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self._by_fingerprint: "OrderedDict[str, CompiledRuleset]" = OrderedDict()
+        self._by_name: Dict[str, Tuple[int, CompiledRuleset]] = {}  # name -> (version, ruleset)
+        self._lock = threading.RLock()
+        self.compilations = 0
+
+    def get(self, categories: Sequence[Any],
+            proximity: Optional[ProximitySettings] = None) -> CompiledRuleset:
+        """Return the compiled ruleset for these categories, compiling it on first use."""
+        fingerprint = ruleset_fingerprint(categories, proximity)
+        with self._lock:
+            ruleset = self._by_fingerprint.get(fingerprint)
+            if ruleset is not None:
+                self._by_fingerprint.move_to_end(fingerprint)
+                return ruleset
+        ruleset = CompiledRuleset(categories, proximity)
+        return self.add(ruleset)
+
+    def add(self, ruleset: CompiledRuleset) -> CompiledRuleset:
+        """Share an already compiled ruleset; returns the registered instance."""
+        with self._lock:
+            existing = self._by_fingerprint.get(ruleset.fingerprint)
+            if existing is not None:
+                return existing
+            self.compilations += 1
+            self._by_fingerprint[ruleset.fingerprint] = ruleset
+            self._evict()
+            return ruleset
+
+    def register(self, name: str, categories: Sequence[Any],
+                 proximity: Optional[ProximitySettings] = None) -> CompiledRuleset:
+        """Define or update a named ruleset and return its compiled form."""
+        ruleset = self.get(categories, proximity)
+        with self._lock:
+            current = self._by_name.get(name)
+            if current is not None and current[1] is ruleset:
+                return ruleset
+            self._by_name[name] = ((current[0] + 1) if current else 1, ruleset)
+            if current is not None:
+                self._forget(current[1])
+            return ruleset
+
+    def lookup(self, name: str) -> CompiledRuleset:
+        """Return the current compiled form of a named ruleset."""
+        with self._lock:
+            try:
+                return self._by_name[name][1]
+            except KeyError:
+                raise KeyError(f"Unknown ruleset: {name}") from None
+
+    def version(self, name: str) -> int:
+        """Return how many distinct definitions have been registered under a name."""
+        with self._lock:
+            try:
+                return self._by_name[name][0]
+            except KeyError:
+                raise KeyError(f"Unknown ruleset: {name}") from None
+
+    def invalidate(self, name: Optional[str] = None, fingerprint: Optional[str] = None):
+        """Drop a named ruleset or a compiled fingerprint; with no arguments, drop everything."""
+        with self._lock:
+            if name is None and fingerprint is None:
+                self._by_fingerprint.clear()
+                self._by_name.clear()
+                return
+            if name is not None:
+                current = self._by_name.pop(name, None)
+                if current is not None:
+                    self._forget(current[1])
+            if fingerprint is not None:
+                self._by_fingerprint.pop(fingerprint, None)
+                for stale in [n for n, (_, r) in self._by_name.items() if r.fingerprint == fingerprint]:
+                    del self._by_name[stale]
+
+    def __len__(self) -> int:
+        return len(self._by_fingerprint)
+
+    def _forget(self, ruleset: CompiledRuleset):
+        # Caller holds self._lock; compiled forms still used by another name are kept
+        if all(r is not ruleset for _, r in self._by_name.values()):
+            if self._by_fingerprint.get(ruleset.fingerprint) is ruleset:
+                del self._by_fingerprint[ruleset.fingerprint]
+
+    def _evict(self):
+        # Caller holds self._lock; named rulesets stay until they are replaced or invalidated
+        named = {r.fingerprint for _, r in self._by_name.values()}
+        excess = len(self._by_fingerprint) - self.max_entries
+        for fingerprint in list(self._by_fingerprint):
+            if excess <= 0:
+                break
+            if fingerprint not in named:
+                del self._by_fingerprint[fingerprint]
+                excess -= 1
+
+# Process-wide registry used by ComplianceAnalyzer
+default_registry = RulesetRegistry()
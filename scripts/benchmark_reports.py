@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""Report rendering throughput benchmark for the batch command."""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+POLICY_TEXT = (ROOT / "sample_policy.txt").read_text()
+
+def benchmark_renderer(count, output_dir):
+    """Render ``count`` reports in this process and return reports per second."""
+    from main import ComplianceAnalyzer
+    from report_renderer import get_report_renderer
+
+    analyzer = ComplianceAnalyzer(str(output_dir / "history.db"))
+    results = [analyzer.check_compliance(POLICY_TEXT) for _ in range(count)]
+    trends = analyzer.get_historical_trends()
+    renderer = get_report_renderer()
+    renderer.render(results[0], trends, str(output_dir / "warmup.pdf"))
+
+    start = time.perf_counter()
+    errors = renderer.render_many(
+        (result, trends, str(output_dir / f"render_{idx}.pdf")) for idx, result in enumerate(results)
+    )
+    elapsed = time.perf_counter() - start
+    analyzer.close()
+    if any(errors):
+        raise RuntimeError(next(e for e in errors if e))
+    return count / elapsed
+
+def benchmark_batch(count, workers, work_dir):
+    """Run the batch command over ``count`` policies and return reports per second."""
+    policy_dir = work_dir / f"policies_{workers}"
+    policy_dir.mkdir()
+    for idx in range(count):
+        (policy_dir / f"policy_{idx}.txt").write_text(POLICY_TEXT)
+
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, str(ROOT / "ai_governance_tool" / "cli.py"), "batch", str(policy_dir),
+         "--output-dir", str(work_dir / f"reports_{workers}"), "--workers", str(workers)],
+        cwd=work_dir, check=True, stdout=subprocess.DEVNULL,
+        env={**os.environ, "PYTHONPATH": str(ROOT)}
+    )
+    return count / (time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure PDF report throughput")
+    parser.add_argument("--reports", type=int, default=50, help="Reports rendered per run")
+    parser.add_argument("--workers", type=int, nargs="*", default=[1, 4],
+                        help="Worker counts to run the batch command with")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        work_dir = Path(tmp)
+        print(f"renderer     {benchmark_renderer(args.reports, work_dir):6.1f} reports/sec")
+        for workers in args.workers:
+            rate = benchmark_batch(args.reports, workers, work_dir)
+            print(f"batch -w {workers:<3} {rate:6.1f} reports/sec")
+
+if __name__ == "__main__":
+    main()
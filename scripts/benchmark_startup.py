@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""Startup-time benchmark for the CLI and library imports."""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Modules that must not be imported at startup: the report and matrix libraries, and
+# the network stack that stdlib helpers such as xml.sax.saxutils pull in
+HEAVY_MODULES = ("matplotlib", "reportlab", "numpy", "ssl", "urllib.request", "http.client")
+
+TARGETS = {
+    "library": "import main",
+    "cli": "import ai_governance_tool.cli",
+}
+
+def loaded_heavy_modules(statement):
+    """Return the heavy modules a fresh interpreter has loaded after running ``statement``."""
+    code = (
+        f"{statement}\n"
+        "import sys\n"
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, check=True, capture_output=True, text=True
+    ).stdout.strip()
+    return [m for m in output.split(",") if m]
+
+def time_startup(statement, runs):
+    """Return the wall-clock seconds of ``runs`` fresh interpreters running ``statement``."""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", statement], cwd=ROOT, check=True)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure import-time startup cost")
+    parser.add_argument("--runs", type=int, default=20, help="Interpreter starts per target")
+    parser.add_argument("--max-ms", type=float, default=None,
+                        help="Fail if the median startup of any target exceeds this")
+    args = parser.parse_args()
+
+    baseline = statistics.median(time_startup("pass", args.runs))
+    print(f"{'interpreter':<12} median {baseline * 1000:7.1f} ms")
+
+    failed = False
+    for name, statement in TARGETS.items():
+        median = statistics.median(time_startup(statement, args.runs))
+        heavy = loaded_heavy_modules(statement)
+        print(f"{name:<12} median {median * 1000:7.1f} ms "
+              f"(+{(median - baseline) * 1000:.1f} ms over interpreter)"
+              + (f"  heavy imports: {', '.join(heavy)}" if heavy else ""))
+        if heavy or (args.max_ms is not None and median * 1000 > args.max_ms):
+            failed = True
+
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
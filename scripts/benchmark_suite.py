@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""Throughput, latency and memory benchmark for the analysis, persistence and report pipeline.
+
+Each stage runs over a synthetic policy corpus at every requested document
+size, which gives a scaling curve per stage. Results are written as JSON and
+can be compared against an earlier run with ``--baseline``.
+"""
+
+import argparse
+import json
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from main import ComplianceAnalyzer, CompliancePattern, generate_pdf_report  # noqa: E402
+
+# Phrases matched by the built-in patterns, keyed by pattern description
+KEYWORDS = {
+    "Transparency in AI systems": ["transparent", "transparency"],
+    "Accountability measures": ["accountable", "accountability"],
+    "Ethical considerations": ["ethical", "ethically"],
+    "Risk assessment and management": ["risk assessment", "risk management", "risk mitigation"],
+    "Security measures": ["secure", "security"],
+    "System monitoring": ["monitor", "monitoring"],
+    "Governance framework": ["governance", "govern"],
+    "Fairness in AI systems": ["fairness", "fairly"],
+    "Privacy protection": ["privacy"],
+    "Bias and discrimination prevention": ["bias", "discrimination"],
+}
+
+# Words none of the patterns match
+FILLER = (
+    "the organization shall define document review update approve process procedure staff "
+    "model data system lifecycle annual quarterly owner record evidence supplier contract "
+    "training deployment validation change request board committee scope objective policy "
+    "operate maintain retain report incident response owner team product service customer"
+).split()
+
+STAGES = ("analysis", "proximity", "persistence", "report")
+
+def synthetic_categories(pattern_count=None):
+    """Return the built-in categories, padded with synthetic patterns up to ``pattern_count``.
+
+    Synthetic patterns have literal prefixes like the built-in ones and are
+    spread over the categories round-robin. Returns (categories, keywords by
+    description).
+    """
+    categories = ComplianceAnalyzer(":memory:").categories
+    keywords = dict(KEYWORDS)
+    builtin = sum(len(category.patterns) for category in categories)
+    for idx in range(max(0, (pattern_count or 0) - builtin)):
+        description = f"Synthetic control {idx}"
+        category = categories[idx % len(categories)]
+        category.patterns.append(CompliancePattern(
+            pattern=rf"control{idx}(?:s|led)?\b", weight=0.2, category=category.name,
+            description=description
+        ))
+        keywords[description] = [f"control{idx}", f"control{idx}s"]
+    return categories, keywords
+
+def generate_corpus(docs, words, density, keywords, seed=0):
+    """Return ``docs`` policy texts of about ``words`` words each.
+
+    ``density`` is the fraction of words drawn from ``keywords`` (a mapping
+    of pattern description to matching phrases) instead of neutral filler.
+    """
+    rng = random.Random(seed)
+    phrases = [phrase for options in keywords.values() for phrase in options]
+    corpus = []
+    for _ in range(docs):
+        sentences = []
+        sentence = []
+        for _ in range(words):
+            sentence.append(rng.choice(phrases) if rng.random() < density else rng.choice(FILLER))
+            if len(sentence) >= rng.randint(8, 20):
+                sentences.append(" ".join(sentence).capitalize() + ".")
+                sentence = []
+        if sentence:
+            sentences.append(" ".join(sentence).capitalize() + ".")
+        corpus.append(" ".join(sentences))
+    return corpus
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, round(fraction * len(sorted_values) + 0.5) - 1))
+    return sorted_values[rank]
+
+def measure(operation, items, memory=True):
+    """Run ``operation`` on each item and return throughput, latency percentiles and peak memory.
+
+    Latency is timed without tracing; peak memory comes from a second,
+    traced pass so tracemalloc's overhead does not skew the timings.
+    """
+    latencies = []
+    start = time.perf_counter()
+    for item in items:
+        began = time.perf_counter()
+        operation(item)
+        latencies.append(time.perf_counter() - began)
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+
+    stats = {
+        "docs": len(items),
+        "docs_per_sec": len(items) / elapsed if elapsed > 0 else 0.0,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "peak_kib": None,
+    }
+    if memory:
+        tracemalloc.start()
+        try:
+            for item in items:
+                operation(item)
+            stats["peak_kib"] = tracemalloc.get_traced_memory()[1] / 1024
+        finally:
+            tracemalloc.stop()
+    return stats
+
+def run_stages(stages, corpus, categories, work_dir, report_docs, memory=True):
+    """Measure each requested stage over one corpus."""
+    analyzer = ComplianceAnalyzer(str(work_dir / "bench_history.db"))
+    analyzer.categories = categories
+    try:
+        results = [analyzer.check_compliance(text, store=False) for text in corpus]
+        measured = {}
+        if "analysis" in stages:
+            measured["analysis"] = measure(
+                lambda text: analyzer.check_compliance(text, store=False), corpus, memory
+            )
+        if "proximity" in stages:
+            # One pair that co-occurs in most documents, measured through the public helper
+            first, second = categories[1].patterns[0].pattern, categories[1].patterns[3].pattern
+            measured["proximity"] = measure(
+                lambda text: analyzer.calculate_proximity_score(text, first, second), corpus, memory
+            )
+        if "persistence" in stages:
+            measured["persistence"] = measure(analyzer.store_result, results, memory)
+        if "report" in stages:
+            generate_pdf_report(results[0], analyzer, str(work_dir / "warmup.pdf"))
+            measured["report"] = measure(
+                lambda result: generate_pdf_report(result, analyzer, str(work_dir / "report.pdf")),
+                results[:report_docs], memory
+            )
+        return measured
+    finally:
+        analyzer.close()
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, check=True,
+                              capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_suite(args):
+    """Run every stage at every document size and return the JSON-serializable results."""
+    categories, keywords = synthetic_categories(args.patterns)
+    stages = {stage: [] for stage in args.stages}
+    with tempfile.TemporaryDirectory() as tmp:
+        work_dir = Path(tmp)
+        for words in args.sizes:
+            corpus = generate_corpus(args.docs, words, args.density, keywords, args.seed)
+            for stage, stats in run_stages(args.stages, corpus, categories, work_dir,
+                                           args.report_docs, not args.no_memory).items():
+                stages[stage].append({"words": words, **stats})
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "corpus": {
+            "docs": args.docs,
+            "sizes": args.sizes,
+            "density": args.density,
+            "patterns": sum(len(category.patterns) for category in categories),
+            "seed": args.seed,
+        },
+        "stages": stages,
+    }
+
+def compare(current, baseline, tolerance):
+    """Return (stage, words, baseline rate, current rate) for every throughput regression."""
+    regressions = []
+    for stage, points in current["stages"].items():
+        previous = {point["words"]: point for point in baseline.get("stages", {}).get(stage, [])}
+        for point in points:
+            before = previous.get(point["words"])
+            if before and point["docs_per_sec"] < before["docs_per_sec"] * (1 - tolerance):
+                regressions.append((stage, point["words"], before["docs_per_sec"], point["docs_per_sec"]))
+    return regressions
+
+def print_results(results):
+    print(f"{'stage':<12} {'words':>7} {'docs/sec':>10} {'p50 ms':>9} {'p99 ms':>9} {'peak KiB':>10}")
+    for stage, points in results["stages"].items():
+        for point in points:
+            peak = f"{point['peak_kib']:10.1f}" if point["peak_kib"] is not None else f"{'-':>10}"
+            print(f"{stage:<12} {point['words']:>7} {point['docs_per_sec']:10.1f} "
+                  f"{point['p50_ms']:9.2f} {point['p99_ms']:9.2f} {peak}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the analysis, persistence and report stages")
+    parser.add_argument("--docs", type=int, default=200, help="Documents per corpus")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[250, 1000, 4000],
+                        help="Words per document; one corpus and curve point per size")
+    parser.add_argument("--density", type=float, default=0.02,
+                        help="Fraction of words that match a compliance pattern")
+    parser.add_argument("--patterns", type=int, default=None,
+                        help="Pad the built-in ruleset with synthetic patterns up to this count")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--report-docs", type=int, default=10,
+                        help="Documents rendered by the report stage")
+    parser.add_argument("--seed", type=int, default=0, help="Corpus random seed")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the traced peak-memory pass")
+    parser.add_argument("--output", "-o", default="benchmark_results.json", help="Results JSON file")
+    parser.add_argument("--baseline", help="Earlier results JSON to compare throughput against")
+    parser.add_argument("--tolerance", type=float, default=0.10,
+                        help="Allowed throughput drop against the baseline before failing")
+    args = parser.parse_args()
+    if not 0.0 <= args.density <= 1.0:
+        parser.error("--density must be between 0 and 1")
+
+    results = run_suite(args)
+    print_results(results)
+    Path(args.output).write_text(json.dumps(results, indent=2))
+    print(f"\nResults written to {args.output}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        if baseline.get("corpus") != results["corpus"]:
+            print(f"Warning: {args.baseline} was run on a different corpus; rates may not be comparable")
+        regressions = compare(results, baseline, args.tolerance)
+        for stage, words, before, after in regressions:
+            print(f"REGRESSION {stage} at {words} words: {before:.1f} -> {after:.1f} docs/sec")
+        if not regressions:
+            print(f"No throughput regressions beyond {args.tolerance:.0%} of {args.baseline}")
+        sys.exit(1 if regressions else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Streaming compliance scans over documents too large to hold in memory."""
+
+from typing import Iterator, List, Optional
+
+from pattern_engine import CompiledRuleEngine
+from proximity import WORD_PATTERN, Mark, WordIndex
+
+# Characters read from a file per chunk
+DEFAULT_CHUNK_SIZE = 1 << 20
+# Characters of look-ahead kept between windows; must exceed the longest match
+DEFAULT_OVERLAP = 4096
+
+def iter_file_chunks(path: str, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                     encoding: Optional[str] = None) -> Iterator[str]:
+    """Yield a text file in chunks without reading it all into memory."""
+    with open(path, 'r', encoding=encoding) as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+class StreamScanner:
+    """Run a rule engine over a document that arrives in chunks.
+
+    Text is scanned in overlapping windows. A match is only accepted once at
+    least ``overlap`` characters follow its start, so matches and look-ahead
+    that cross a chunk boundary see the same text as a whole-document scan;
+    the rest is re-scanned with the next chunk. Each pattern resumes where its
+    previous match ended, exactly like ``re.finditer``. As long as no match
+    (with its look-around) is longer than ``overlap``, the matches are
+    identical to scanning the whole text at once.
+
+    Only one window of text is held at a time; word counts for proximity
+    marks are carried across windows.
+    """
+
+    def __init__(self, engine: CompiledRuleEngine, overlap: int = DEFAULT_OVERLAP):
+        self.engine = engine
+        self.overlap = overlap
+        count = len(engine.patterns)
+        self.first_match: List[Optional[str]] = [None] * count
+        self.match_counts: List[int] = [0] * count
+
+        self._buffer = ""
+        self._base = 0  # document offset of self._buffer[0]
+        self._scanned_to = 0  # matches starting before this offset are final
+        self._next_start: List[int] = [0] * count  # where each pattern may match next
+        self._words_before = 0  # words starting before self._buffer
+        self._split_word = False  # whether self._buffer starts in the middle of a word
+
+    def feed(self, chunk: str) -> List[List[Mark]]:
+        """Add a chunk and return, per pattern, the marks of matches that became final."""
+        self._buffer += chunk
+        return self._scan(final=False)
+
+    def finish(self) -> List[List[Mark]]:
+        """Scan the remaining text at the end of the document."""
+        return self._scan(final=True)
+
+    def _scan(self, final: bool) -> List[List[Mark]]:
+        marks: List[List[Mark]] = [[] for _ in self.engine.patterns]
+        buffer, base = self._buffer, self._base
+        limit = base + len(buffer) if final else base + len(buffer) - self.overlap
+        if limit <= self._scanned_to:
+            return marks
+
+        hits = self.engine.scan(
+            buffer,
+            self._scanned_to - base,
+            starts=[max(start, self._scanned_to) - base for start in self._next_start]
+        )
+
+        words = None
+        for idx, spans in enumerate(hits):
+            accepted = [(start, end) for start, end in spans if start + base < limit]
+            if not accepted:
+                continue
+            if words is None:
+                words = WordIndex(buffer)
+            if self.first_match[idx] is None:
+                start, end = accepted[0]
+                self.first_match[idx] = buffer[start:end]
+            self.match_counts[idx] += len(accepted)
+            self._next_start[idx] = accepted[-1][1] + base
+            # A word cut at the buffer start is already counted in _words_before
+            before = self._words_before - self._split_word
+            marks[idx] = [
+                (start + base, end + base, first + before, last + before)
+                for start, end, first, last in words.marks(accepted)
+            ]
+
+        self._scanned_to = limit
+        self._trim()
+        return marks
+
+    def _trim(self):
+        """Drop text no future match can start in, keeping ``overlap`` characters of context."""
+        buffer = self._buffer
+        cut = self._scanned_to - self.overlap - self._base
+        if cut <= 0:
+            return
+        self._words_before += len(WORD_PATTERN.findall(buffer, 0, cut)) - self._split_word
+        self._split_word = not buffer[cut - 1].isspace() and not buffer[cut].isspace()
+        self._buffer = buffer[cut:]
+        self._base += cut
@@ -1,7 +1,20 @@
 import unittest
-from main import ComplianceAnalyzer
+import re
+import sqlite3
+import tempfile
+from argparse import Namespace
+from contextlib import redirect_stdout
+from io import StringIO
+from main import ComplianceAnalyzer, ComplianceCategory, CompliancePattern
+from pattern_engine import CompiledRuleEngine
+from ruleset_registry import CompiledRuleset, RulesetRegistry
+from rule_packs import RulePackError, load_rule_pack
+from unittest import mock
+from proximity import ProximitySettings, WordIndex, min_word_gap
 from pathlib import Path
+from typing import Dict
 import os
+import json
 
 class TestComplianceAnalyzer(unittest.TestCase):
     def setUp(self):
@@ -10,8 +23,10 @@ class TestComplianceAnalyzer(unittest.TestCase):
 
     def tearDown(self):
         # Clean up test database and generated files
-        if Path("test_compliance.db").exists():
-            Path("test_compliance.db").unlink()
+        self.analyzer.close()
+        for suffix in ("", "-wal", "-shm"):
+            if Path(f"test_compliance.db{suffix}").exists():
+                Path(f"test_compliance.db{suffix}").unlink()
         if Path("test_report.pdf").exists():
             Path("test_report.pdf").unlink()
         if Path("test_report.json").exists():
@@ -66,5 +81,1104 @@ class TestComplianceAnalyzer(unittest.TestCase):
         self.assertGreater(len(trends['timestamps']), 0)
         self.assertEqual(len(trends['timestamps']), len(trends['overall_scores']))
 
+    def test_write_behind_history(self):
+        """Queued history rows must be readable immediately and survive close()."""
+        self.analyzer.history.flush_interval = 60
+        for _ in range(3):
+            self.analyzer.check_compliance("We ensure privacy and security.", durable=False)
+
+        self.assertEqual(len(self.analyzer.history._pending), 3)
+        trends = self.analyzer.get_historical_trends()
+        self.assertEqual(len(trends['timestamps']), 3)
+
+        self.analyzer.check_compliance("Our system is transparent.", durable=False)
+        self.analyzer.close()
+        with ComplianceAnalyzer("test_compliance.db") as reopened:
+            self.assertEqual(len(reopened.get_historical_trends()['timestamps']), 4)
+
+    def test_history_query(self):
+        """History queries must filter, aggregate and page in SQL."""
+        for idx in range(5):
+            text = "Our system is transparent and ethical." if idx % 2 else "Nothing relevant here."
+            self.analyzer.check_compliance(text, policy_id=f"policy-{idx % 2}")
+
+        page = self.analyzer.query_history(policy_id="policy-1")
+        self.assertEqual(len(page.results), 2)
+        self.assertTrue(all(r['policy_id'] == "policy-1" for r in page.results))
+        self.assertEqual(len(self.analyzer.query_history(min_score=0.1).results), 2)
+        self.assertEqual(len(self.analyzer.query_history(is_compliant=True).results), 0)
+        self.assertEqual(len(self.analyzer.query_history(start="2999-01-01").results), 0)
+
+        seen = []
+        cursor = None
+        while True:
+            page = self.analyzer.query_history(limit=2, cursor=cursor)
+            seen.extend(r['id'] for r in page.results)
+            cursor = page.next_cursor
+            if cursor is None:
+                break
+        self.assertEqual(seen, [5, 4, 3, 2, 1])
+
+        aggregates = self.analyzer.get_category_aggregates(policy_id="policy-0")
+        self.assertEqual(aggregates["Core Principles"]['count'], 3)
+        self.assertEqual(aggregates["Core Principles"]['max'], 0.0)
+
+    def test_history_migration(self):
+        """Databases created with the original schema must be upgraded in place."""
+        self.analyzer.close()
+        for suffix in ("", "-wal", "-shm"):
+            Path(f"test_compliance.db{suffix}").unlink(missing_ok=True)
+
+        conn = sqlite3.connect("test_compliance.db")
+        conn.execute('''
+        CREATE TABLE compliance_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp TEXT, overall_score REAL,
+            is_compliant INTEGER, category_scores TEXT, found_patterns TEXT
+        )''')
+        conn.execute(
+            "INSERT INTO compliance_history (timestamp, overall_score, is_compliant, category_scores, found_patterns) "
+            "VALUES ('2023-05-01T12:00:00', 0.7, 1, '{\"Core Principles\": 0.7}', '{}')"
+        )
+        conn.commit()
+        conn.close()
+
+        self.analyzer = ComplianceAnalyzer("test_compliance.db")
+        page = self.analyzer.query_history(start="2023-01-01", end="2023-12-31")
+        self.assertEqual([r['score'] for r in page.results], [0.7])
+        self.assertEqual(self.analyzer.get_category_aggregates()["Core Principles"]['count'], 1)
+        self.assertIsNone(self.analyzer.get_match_index(page.results[0]['id']))
+
+    def test_match_index(self):
+        """Every match position must be indexed, stored with the history row and diffable."""
+        text = "Security first. Our security and governance framework is secure. Privacy matters."
+        result = self.analyzer.check_compliance(text, policy_id="indexed")
+        patterns = [p.pattern for cat in self.analyzer.categories for p in cat.patterns]
+        for pattern_id, pattern in enumerate(patterns):
+            expected = [m.span() for m in re.finditer(pattern, text, re.IGNORECASE)]
+            self.assertEqual(result.match_index.spans(pattern_id), expected)
+            self.assertEqual(result.match_index.counts[pattern_id], len(expected))
+
+        row_id = self.analyzer.query_history(policy_id="indexed").results[0]['id']
+        self.assertEqual(self.analyzer.get_match_index(row_id), result.match_index)
+
+        security = patterns.index(r"secur(?:e|ity)")
+        edited = self.analyzer.check_compliance(text.replace("is secure", "is stable"), store=False)
+        self.assertEqual(result.match_index.diff(edited.match_index), {security: ([(57, 63)], [])})
+
+    def test_result_cache(self):
+        """Repeated checks of the same text must be served from the cache and still recorded."""
+        cache = self.analyzer.enable_result_cache(persistent=True)
+        text = "Risk assessment and governance are closely integrated.\nSecurity is monitored."
+        first = self.analyzer.check_compliance(text)
+        second = self.analyzer.check_compliance(text)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertEqual(first.proximity_scores, second.proximity_scores)
+        self.assertEqual(first.found_patterns, second.found_patterns)
+        self.assertEqual(first.match_index, second.match_index)
+        self.assertEqual(len(self.analyzer.query_history().results), 2)
+
+        # Whitespace and line-ending variants shift match offsets, so they are scanned afresh
+        for variant in ("\n\n\n      " + text, text.replace("\n", "\r\n")):
+            result = self.analyzer.check_compliance(variant)
+            self.assertEqual(result.match_index, self.analyzer._analyze(variant, 0.6).match_index)
+            self.assertNotEqual(result.match_index, first.match_index)
+        self.assertEqual((cache.hits, cache.misses), (1, 3))
+
+        self.analyzer.check_compliance(text, min_score=0.9)
+        self.assertEqual(cache.misses, 4)
+
+        # The disk tier is shared with a fresh analyzer on the same database once it is flushed
+        self.analyzer.flush()
+        other = ComplianceAnalyzer("test_compliance.db")
+        other_cache = other.enable_result_cache(persistent=True)
+        other.check_compliance(text)
+        self.assertEqual(other_cache.hits, 1)
+
+        # Changing the rules invalidates cached results
+        other.categories[0].patterns[0].weight = 0.5
+        other.check_compliance(text)
+        self.assertEqual(other_cache.misses, 1)
+        other.close()
+
+    def test_disk_cache_tier_keeps_writes_behind(self):
+        """Cache lookups and puts must not commit queued history rows or commit on their own."""
+        self.analyzer.enable_result_cache(persistent=True)
+        history = self.analyzer.history
+
+        def committed(table):
+            return history.read(f"SELECT COUNT(*) FROM {table}")[0][0]
+
+        texts = [f"We ensure privacy and security. {idx}" for idx in range(5)]
+        for text in texts:
+            self.analyzer.store_result(self.analyzer.check_compliance(text, store=False), durable=False)
+        self.assertEqual((committed("compliance_history"), committed("compliance_result_cache")), (0, 0))
+
+        self.analyzer.flush()
+        self.assertEqual((committed("compliance_history"), committed("compliance_result_cache")), (5, 5))
+
+    def test_streaming_matches_in_memory(self):
+        """Chunked analysis must give the same result as analyzing the whole text."""
+        import random
+        rng = random.Random(7)
+        vocabulary = ["risk", "assessment", "governance", "framework", "ethical", "principles",
+                      "transparency", "accountability", "privacy", "security", "ai", "the", "and"]
+        separators = [" ", "  ", "\n", "-", ""]
+        for _ in range(20):
+            text = "".join(rng.choice(vocabulary) + rng.choice(separators) for _ in range(300))
+            expected = self.analyzer.check_compliance(text, store=False)
+            chunk_size = rng.randint(1, 97)
+            chunks = [text[i:i + chunk_size] for i in range(0, len(text), chunk_size)]
+            streamed = self.analyzer.check_compliance_stream(chunks, store=False, overlap=64)
+            self.assertEqual(streamed.found_patterns, expected.found_patterns)
+            self.assertEqual(streamed.proximity_scores, expected.proximity_scores)
+            self.assertEqual(streamed.score, expected.score)
+            self.assertEqual(streamed.match_index, expected.match_index)
+
+    def test_incremental_matches_full_analysis(self):
+        """Re-analyzing edited paragraphs must give the same result as a full check."""
+        paragraphs = [
+            "We conduct regular risk assessment of AI systems.",
+            "Our ethical principles guide AI governance.",
+            "Privacy and security controls protect data.",
+        ] * 200
+        text = "\n\n".join(paragraphs)
+        self.analyzer.check_compliance_incremental("policy", text, store=False)
+        index = self.analyzer._documents["policy"]
+
+        edits = [
+            lambda t: t.replace("Privacy and security", "Transparency and accountability", 1),
+            lambda t: t[:200] + "\n\nA new paragraph on risk management.\n\n" + t[200:],
+            lambda t: t[:-60],
+        ]
+        edited = text
+        for edit in edits:
+            edited = edit(edited)
+            expected = self.analyzer.check_compliance(edited, store=False)
+            result = self.analyzer.check_compliance_incremental("policy", edited, store=False)
+            self.assertLess(index.rescanned, len(edited))
+            self.assertEqual(result.found_patterns, expected.found_patterns)
+            self.assertEqual(result.proximity_scores, expected.proximity_scores)
+            self.assertEqual(result.score, expected.score)
+            self.assertEqual(result.match_index, expected.match_index)
+
+        # A restored earlier version comes from the result cache; later edits still diff correctly
+        cache = self.analyzer.enable_result_cache()
+        self.analyzer.check_compliance_incremental("policy", text, store=False)
+        restored = self.analyzer.check_compliance_incremental("policy", edited, store=False)
+        self.assertEqual((cache.hits, cache.misses), (0, 2))
+        with mock.patch.object(index, "update", side_effect=AssertionError("re-scanned")):
+            again = self.analyzer.check_compliance_incremental("policy", text, store=False)
+        self.assertEqual(cache.hits, 1)
+        self.assertEqual(again.match_index, self.analyzer._analyze(text, 0.6).match_index)
+        newer = edits[0](edited)
+        result = self.analyzer.check_compliance_incremental("policy", newer, store=False)
+        self.assertEqual(result.match_index, self.analyzer._analyze(newer, 0.6).match_index)
+        self.assertNotEqual(restored.match_index, again.match_index)
+
+class TestReportRendering(unittest.TestCase):
+    def test_concurrent_reports_render_in_memory(self):
+        """Reports rendered from several threads must not share chart files or leave figures behind."""
+        import gc
+        from concurrent.futures import ThreadPoolExecutor
+        from matplotlib.figure import Figure
+        from main import generate_pdf_report
+
+        def live_figures():
+            gc.collect()
+            return sum(isinstance(obj, Figure) for obj in gc.get_objects())
+
+        before = live_figures()
+        with tempfile.TemporaryDirectory() as tmp:
+            analyzer = ComplianceAnalyzer(str(Path(tmp) / "history.db"))
+            result = analyzer.check_compliance("Risk assessment and governance are closely integrated.")
+            outputs = [Path(tmp) / f"report_{idx}.pdf" for idx in range(4)]
+            with ThreadPoolExecutor(4) as pool:
+                list(pool.map(lambda path: generate_pdf_report(result, analyzer, str(path)), outputs))
+            analyzer.close()
+
+            self.assertTrue(all(path.stat().st_size > 0 for path in outputs))
+            self.assertFalse(Path("trend_chart.png").exists())
+            # Chart templates belong to the pool's threads and go away with them
+            self.assertEqual(live_figures(), before)
+
+    def test_line_chart_templates_are_bounded(self):
+        """A thread must keep at most MAX_TEMPLATES chart templates and be able to release them."""
+        import charts
+
+        charts.release_templates()
+        figures = []
+        for width in range(charts.MAX_TEMPLATES + 2):
+            charts.render_line_chart({"a": [1, 2]}, "Trend", "x", "y", figsize=(4 + width, 3))
+            figures.append(charts._line_axes((4 + width, 3)).figure)
+        self.assertEqual(len(charts._templates.line_axes), charts.MAX_TEMPLATES)
+        # The evicted templates were cleared, the kept ones still hold their axes
+        self.assertEqual([len(figure.axes) for figure in figures[:2]], [0, 0])
+        self.assertTrue(all(figure.axes for figure in figures[2:]))
+
+        charts.release_templates()
+        self.assertEqual(len(charts._templates.line_axes), 0)
+        self.assertTrue(all(not figure.axes for figure in figures))
+
+    def test_render_many_reuses_renderer(self):
+        """One renderer must render a run of reports and report failures per job."""
+        from report_renderer import get_report_renderer
+
+        renderer = get_report_renderer()
+        self.assertIs(renderer, get_report_renderer())
+        with tempfile.TemporaryDirectory() as tmp:
+            analyzer = ComplianceAnalyzer(str(Path(tmp) / "history.db"))
+            result = analyzer.check_compliance("We ensure privacy & <security> by design.")
+            trends = analyzer.get_historical_trends()
+            jobs = [(result, trends, str(Path(tmp) / f"report_{idx}.pdf")) for idx in range(3)]
+            jobs.append((result, trends, str(Path(tmp) / "missing" / "report.pdf")))
+            errors = renderer.render_many(jobs)
+            analyzer.close()
+
+            self.assertEqual(errors[:3], [None, None, None])
+            self.assertIsNotNone(errors[3])
+
+class TestCompiledRuleEngine(unittest.TestCase):
+    def test_matches_per_pattern_finditer(self):
+        """Merged single-pass scan must report the same spans as one finditer per pattern."""
+        patterns = [r"risk\s+(?:assess|manag)", r"risk", r"assess(?:ment)?", r"(\w)\1", r"secur(?:e|ity)"]
+        text = "Risk assessment, RISK management and ſecure, well-assessed security. Risk  assess."
+        engine = CompiledRuleEngine(patterns)
+        expected = [[m.span() for m in re.finditer(p, text, re.IGNORECASE)] for p in patterns]
+        self.assertEqual(engine.scan(text), expected)
+
+    def test_engine_rebuilt_when_categories_change(self):
+        """Extending categories after construction must be picked up by the engine."""
+        analyzer = ComplianceAnalyzer("test_compliance.db")
+        engine = analyzer.get_rule_engine()
+        self.assertIs(engine, analyzer.get_rule_engine())
+
+        analyzer.categories.append(ComplianceCategory(
+            name="Data Protection",
+            patterns=[CompliancePattern(r"data\s+encryption", 1.0, "Data Protection", "Data Encryption")],
+            required_score=0.5,
+            weight=0.3
+        ))
+        self.assertIsNot(engine, analyzer.get_rule_engine())
+        result = analyzer.check_compliance("All data encryption keys are rotated.")
+        self.assertEqual(result.category_scores["Data Protection"], 1.0)
+        analyzer.close()
+        for suffix in ("", "-wal", "-shm"):
+            Path(f"test_compliance.db{suffix}").unlink(missing_ok=True)
+
+class TestRulesetRegistry(unittest.TestCase):
+    def test_analyzers_share_compiled_ruleset(self):
+        """Analyzers with identical categories must reuse one compiled engine."""
+        first = ComplianceAnalyzer(":memory:")
+        second = ComplianceAnalyzer(":memory:")
+        self.assertIs(first.get_rule_engine(), second.get_rule_engine())
+
+        second.categories[0].patterns[0].weight = 0.5
+        self.assertIsNot(first.get_ruleset(), second.get_ruleset())
+        self.assertNotEqual(first.ruleset_fingerprint(), second.ruleset_fingerprint())
+        first.close()
+        second.close()
+
+    def test_register_versions_and_invalidates(self):
+        """Re-registering a name with new definitions bumps its version and drops the old form."""
+        registry = RulesetRegistry()
+        categories = ComplianceAnalyzer(":memory:").categories
+        original = registry.register("tenant-a", categories)
+        self.assertIs(registry.register("tenant-a", categories), original)
+        self.assertIs(registry.get(categories), original)
+        self.assertEqual((registry.version("tenant-a"), registry.compilations), (1, 1))
+
+        categories[0].required_score = 0.9
+        updated = registry.register("tenant-a", categories)
+        self.assertIsNot(updated, original)
+        self.assertEqual((registry.version("tenant-a"), len(registry)), (2, 1))
+        self.assertEqual(original.categories[0].required_score, 0.6)
+
+        analyzer = ComplianceAnalyzer(":memory:", ruleset=registry.lookup("tenant-a"))
+        self.assertIs(analyzer.get_ruleset(), updated)
+        analyzer.close()
+
+    def test_serialized_ruleset_scans_identically(self):
+        """A ruleset loaded from its serialized form must find the same matches."""
+        analyzer = ComplianceAnalyzer(":memory:")
+        ruleset = analyzer.get_ruleset()
+        loaded = CompiledRuleset.loads(ruleset.dumps())
+        text = Path("sample_policy.txt").read_text()
+        self.assertEqual(loaded.fingerprint, ruleset.fingerprint)
+        self.assertEqual(loaded.engine.scan(text), ruleset.engine.scan(text))
+        self.assertEqual(loaded.proximity_pairs, ruleset.proximity_pairs)
+        analyzer.close()
+
+class TestRulePacks(unittest.TestCase):
+    PACK = {
+        "name": "data-protection",
+        "categories": [{
+            "name": "Data Protection",
+            "weight": 1.0,
+            "required_score": 0.5,
+            "patterns": [
+                {"pattern": r"data\s+encryption", "weight": 0.5, "description": "Data Encryption"},
+                {"pattern": r"data\s+retention", "weight": 0.5, "description": "Data Retention"},
+            ],
+        }],
+    }
+
+    def test_shipped_pack_matches_builtin_rules(self):
+        """The ISO 42001 pack must define exactly the analyzer's built-in categories."""
+        with tempfile.TemporaryDirectory() as cache:
+            ruleset = load_rule_pack("rules/iso42001.yaml", cache_dir=cache, registry=RulesetRegistry())
+        analyzer = ComplianceAnalyzer(":memory:")
+        self.assertEqual(ruleset.fingerprint, analyzer.ruleset_fingerprint())
+        analyzer.close()
+
+    def test_fresh_artifact_skips_compilation(self):
+        """A second cold load must come from the artifact; edits to the pack must not."""
+        from ai_governance_tool import cli
+
+        with tempfile.TemporaryDirectory() as tmp:
+            pack = Path(tmp) / "pack.json"
+            pack.write_text(json.dumps(self.PACK))
+            first = load_rule_pack(pack, cache_dir=tmp, registry=RulesetRegistry())
+            self.assertEqual(len(list(Path(tmp).glob("*.rulepack"))), 1)
+
+            with mock.patch("rule_packs.parse_rule_pack", side_effect=AssertionError("recompiled")):
+                cached = load_rule_pack(pack, cache_dir=tmp, registry=RulesetRegistry())
+            self.assertEqual(cached.fingerprint, first.fingerprint)
+            text = "Data encryption at rest; data retention for a year."
+            self.assertEqual(cached.engine.scan(text), first.engine.scan(text))
+
+            self.PACK["categories"][0]["required_score"] = 0.9
+            try:
+                pack.write_text(json.dumps(self.PACK))
+            finally:
+                self.PACK["categories"][0]["required_score"] = 0.5
+            edited = load_rule_pack(pack, cache_dir=tmp, registry=RulesetRegistry())
+            self.assertNotEqual(edited.fingerprint, first.fingerprint)
+
+            with mock.patch.dict(os.environ, {"AI_GOVERNANCE_CACHE_DIR": tmp}):
+                analyzer = cli.create_analyzer(str(pack), ":memory:")
+            result = analyzer.check_compliance(text, store=False)
+            self.assertEqual(result.category_scores, {"Data Protection": 1.0})
+            analyzer.close()
+
+    def test_invalid_packs_are_rejected(self):
+        """Validation errors must name the offending field."""
+        invalid = [
+            ("patterns[0].pattern", {"pattern": "data(", "weight": 1, "description": "Broken"}),
+            ("patterns[0].weight", {"pattern": "data", "weight": "high", "description": "Data"}),
+            ("proximity", {"pattern": "data", "weight": 1, "description": "Data"}),
+        ]
+        with tempfile.TemporaryDirectory() as tmp:
+            for field, pattern in invalid:
+                pack = Path(tmp) / "pack.json"
+                pack.write_text(json.dumps({"categories": [{
+                    "name": "Data", "weight": 1, "required_score": 0.5, "patterns": [pattern]
+                }], "proximity": {"pairs": [["Data", "Unknown"]]}}))
+                with self.assertRaisesRegex(RulePackError, re.escape(field)):
+                    load_rule_pack(pack, cache_dir=tmp, registry=RulesetRegistry())
+
+class TestProximity(unittest.TestCase):
+    def test_min_word_gap_matches_pairwise_split(self):
+        """Two-pointer gap must equal the smallest split() count over every pair of matches."""
+        text = "security a b c governance d security e f g h i governance-security x y governance"
+        spans1 = [m.span() for m in re.finditer("security", text)]
+        spans2 = [m.span() for m in re.finditer("governance", text)]
+        expected = min(
+            len(text[min(e1, e2):max(s1, s2)].split())
+            for s1, e1 in spans1 for s2, e2 in spans2
+        )
+        words = WordIndex(text)
+        self.assertEqual(min_word_gap(words.marks(spans1), words.marks(spans2)), expected)
+        self.assertIsNone(min_word_gap(words.marks(spans1), []))
+
+    def test_declared_pairs_window_and_switch(self):
+        """Only declared pairs are scored, gaps beyond the window score 0, and disabling skips the stage."""
+        text = Path("sample_policy.txt").read_text()
+        pair = ("Security measures", "Governance framework")
+        key = " - ".join(pair)
+        full = ComplianceAnalyzer(":memory:").check_compliance(text, store=False)
+
+        declared = ComplianceAnalyzer(":memory:", proximity=ProximitySettings(pairs=[pair]))
+        for result in (declared.check_compliance(text, store=False),
+                       declared.check_compliance_stream([text[:500], text[500:]], store=False),
+                       declared.check_compliance_incremental("doc", text, store=False)):
+            self.assertEqual(result.proximity_scores, {key: full.proximity_scores[key]})
+            self.assertEqual(result.category_scores, full.category_scores)
+        self.assertNotEqual(declared.ruleset_fingerprint(), ComplianceAnalyzer(":memory:").ruleset_fingerprint())
+
+        gap = round(1 / full.proximity_scores[key]) - 1
+        for max_words, expected in ((gap, full.proximity_scores[key]), (gap - 1, 0.0)):
+            declared.proximity = ProximitySettings(pairs=[pair], max_words=max_words)
+            self.assertEqual(declared.check_compliance(text, store=False).proximity_scores[key], expected)
+
+        disabled = ComplianceAnalyzer(":memory:", proximity=ProximitySettings(enabled=False))
+        self.assertEqual(disabled.check_compliance(text, store=False).proximity_scores, {})
+        self.assertEqual(ProximitySettings.from_env({"ENABLE_PROXIMITY_ANALYSIS": "false"}),
+                         ProximitySettings(enabled=False))
+        unknown = ProximitySettings(pairs=[("Security measures", "Unknown")])
+        with self.assertRaises(ValueError):
+            ComplianceAnalyzer(":memory:", proximity=unknown).get_ruleset()
+
+class TestResultBatch(unittest.TestCase):
+    def test_batch_round_trips_results(self):
+        """Columnar batches must reproduce per-document results and survive a history round trip."""
+        import pickle
+        import sys
+
+        texts = [Path(name).read_text() for name in
+                 ("poor_policy.txt", "partial_policy.txt", "sample_policy.txt")]
+        with tempfile.TemporaryDirectory() as tmp:
+            analyzer = ComplianceAnalyzer(str(Path(tmp) / "history.db"))
+            expected = [analyzer.check_compliance(text, store=False) for text in texts]
+            batch = analyzer.check_batch(texts, policy_ids=["a", "b", "c"])
+
+            self.assertEqual(len(batch), 3)
+            for row, result in enumerate(expected):
+                self.assertEqual(batch.scores[row], result.score)
+                self.assertEqual(list(batch.match_counts[row]), list(result.match_index.counts))
+                rebuilt = batch[row]
+                self.assertEqual((rebuilt.category_scores, rebuilt.found_patterns, rebuilt.proximity_scores),
+                                 (result.category_scores, result.found_patterns, result.proximity_scores))
+
+            stored = analyzer.query_history_batch()
+            self.assertEqual(stored.policy_ids, ["a", "b", "c"])
+            self.assertEqual(stored.scores.tolist(), batch.scores.tolist())
+            self.assertEqual(stored.category_scores.tolist(), batch.category_scores.tolist())
+            self.assertEqual(stored.matched.tolist(), batch.matched.tolist())
+            analyzer.close()
+
+        # Results from other processes share their key strings with local ones
+        copy = pickle.loads(pickle.dumps(expected[2]))
+        key = next(iter(expected[2].proximity_scores))
+        self.assertIs(next(iter(copy.proximity_scores)), key)
+        if sys.version_info >= (3, 10):
+            self.assertFalse(hasattr(copy, "__dict__"))
+
+    def test_score_many_matches_per_document_scoring(self):
+        """Vectorized scores must equal per-document scores, and rescoring must not re-scan."""
+        import numpy as np
+
+        texts = [Path(name).read_text() for name in
+                 ("poor_policy.txt", "partial_policy.txt", "sample_policy.txt")]
+        analyzer = ComplianceAnalyzer(":memory:")
+        expected = [analyzer.check_compliance(text, store=False) for text in texts]
+        batch = analyzer.score_many(texts)
+
+        for row, result in enumerate(expected):
+            self.assertAlmostEqual(batch.scores[row], result.score)
+            self.assertEqual(bool(batch.is_compliant[row]), result.is_compliant)
+            rebuilt = batch[row]
+            self.assertEqual(rebuilt.found_patterns, result.found_patterns)
+            self.assertEqual(rebuilt.proximity_scores, result.proximity_scores)
+            for name, score in result.category_scores.items():
+                self.assertAlmostEqual(rebuilt.category_scores[name], score)
+
+        keys = batch.keys
+        with mock.patch.object(CompiledRuleEngine, "scan", side_effect=AssertionError("re-scanned")):
+            strict = batch.rescore(min_score=1.1)
+            self.assertFalse(strict.is_compliant.any())
+            self.assertEqual(strict.scores.tolist(), batch.scores.tolist())
+
+            # All weight on the first category scores each row by that category alone
+            only_first = batch.rescore(category_weights=[1.0] + [0.0] * (len(keys.categories) - 1))
+            self.assertEqual(only_first.scores.tolist(), batch.category_scores[:, 0].tolist())
+
+            # Doubling every pattern weight leaves normalized scores unchanged
+            doubled = batch.rescore(pattern_weights=[2 * w for w in keys.pattern_weights])
+            self.assertTrue(np.allclose(doubled.scores, batch.scores))
+
+        with self.assertRaises(ValueError):
+            batch.rescore(pattern_weights=[1.0])
+
+    def test_batch_history_rows_keep_match_index(self):
+        """Rows stored from check_batch and score_many must carry their match positions."""
+        texts = [Path(name).read_text() for name in ("partial_policy.txt", "sample_policy.txt")]
+        analyzer = ComplianceAnalyzer(":memory:")
+        expected = [analyzer.check_compliance(text, store=False).match_index for text in texts]
+        analyzer.check_batch(texts, policy_ids=["batch-0", "batch-1"])
+        analyzer.score_many(texts, policy_ids=["many-0", "many-1"], store=True)
+
+        rows = analyzer.history.query("SELECT id, policy_id FROM compliance_history ORDER BY id")
+        self.assertEqual([policy_id for _, policy_id in rows], ["batch-0", "batch-1", "many-0", "many-1"])
+        for (history_id, _), index in zip(rows, expected * 2):
+            self.assertEqual(analyzer.get_match_index(history_id), index)
+        analyzer.close()
+
+class TestPolicyComparison(unittest.TestCase):
+    def test_presence_matrix_matches_found_patterns(self):
+        """The matrix must agree with each result's found patterns, in one or many processes."""
+        from policy_comparison import compare_texts
+
+        texts = [Path(name).read_text() for name in
+                 ("poor_policy.txt", "partial_policy.txt", "sample_policy.txt")]
+        labels = ["poor", "partial", "sample"]
+        analyzer = ComplianceAnalyzer(":memory:")
+        comparison = compare_texts(analyzer, texts, labels)
+        parallel = compare_texts(analyzer, texts, labels, workers=2)
+
+        for col, result in enumerate(comparison.results):
+            found = {pattern for matches in result.found_patterns.values() for pattern, _ in matches}
+            self.assertEqual([info.pattern in found for info in comparison.patterns],
+                             comparison.presence[:, col].tolist())
+            self.assertEqual(comparison.category_scores[:, col].tolist(),
+                             list(result.category_scores.values()))
+        self.assertEqual(parallel.counts.tolist(), comparison.counts.tolist())
+        self.assertEqual(parallel.scores, comparison.scores)
+        self.assertEqual(len(analyzer.query_history().results), 0)
+
+        data = json.loads(json.dumps(comparison.to_dict()))
+        self.assertEqual([p['label'] for p in data['policies']], labels)
+        self.assertEqual(len(data['patterns']), len(comparison.patterns))
+        analyzer.close()
+
+    def test_portfolio_reports(self):
+        """The compare command must write a PDF or JSON report for any number of policies."""
+        from ai_governance_tool import cli
+
+        policies = ["poor_policy.txt", "partial_policy.txt", "sample_policy.txt", "borderline_policy.txt"]
+        with tempfile.TemporaryDirectory() as tmp:
+            for output_format in ("pdf", "json"):
+                output = str(Path(tmp) / f"comparison.{output_format}")
+                args = Namespace(policies=policies, output=output, format=output_format,
+                                 workers=1, rules=None, match_timeout=None)
+                history = str(Path(tmp) / "history.db")
+                with mock.patch.object(cli, "create_analyzer",
+                                       lambda rules, match_timeout=None: ComplianceAnalyzer(history)):
+                    with redirect_stdout(StringIO()):
+                        cli.compare_policies(args)
+                self.assertGreater(Path(output).stat().st_size, 0)
+            self.assertEqual(len(json.loads(Path(tmp, "comparison.json").read_text())['policies']), 4)
+
+class TestBatchCli(unittest.TestCase):
+    def test_parallel_batch(self):
+        """Parallel batch mode must write every result through one writer and report in input order."""
+        from ai_governance_tool import cli
+
+        with tempfile.TemporaryDirectory() as tmp:
+            policy_dir = Path(tmp) / "policies"
+            policy_dir.mkdir()
+            for idx in range(4):
+                (policy_dir / f"policy_{idx}.txt").write_text("We ensure privacy and security.")
+
+            analyzer = ComplianceAnalyzer(str(Path(tmp) / "history.db"))
+            output = StringIO()
+            with redirect_stdout(output):
+                cli.check_policies_parallel(
+                    analyzer, sorted(policy_dir.glob("*.txt")), Path(tmp), workers=2, render_workers=2
+                )
+
+            self.assertEqual(len(analyzer.query_history().results), 4)
+            analyzed = re.findall(r"Analyzing: (\S+)", output.getvalue())
+            self.assertEqual(analyzed, [f"policy_{idx}.txt" for idx in range(4)])
+            self.assertTrue(all((Path(tmp) / f"policy_{idx}_report.pdf").exists() for idx in range(4)))
+            analyzer.close()
+
+    def test_cache_option_reuses_results_across_runs(self):
+        """With --cache, batch workers fill the history database's cache and a later check reuses it."""
+        from ai_governance_tool import cli
+
+        with tempfile.TemporaryDirectory() as tmp:
+            policy_dir = Path(tmp) / "policies"
+            policy_dir.mkdir()
+            for idx in range(3):
+                (policy_dir / f"policy_{idx}.txt").write_text(f"We ensure privacy and security. {idx}")
+            history = str(Path(tmp) / "history.db")
+
+            analyzer = ComplianceAnalyzer(history)
+            cli.enable_cache(analyzer)
+            with redirect_stdout(StringIO()):
+                cli.check_policies_parallel(analyzer, sorted(policy_dir.glob("*.txt")), Path(tmp),
+                                            workers=2, render_workers=1, cache=True)
+            cached = analyzer.history.query("SELECT COUNT(*) FROM compliance_result_cache")[0][0]
+            self.assertEqual(cached, 3)
+            analyzer.close()
+
+            rerun = ComplianceAnalyzer(history)
+            args = Namespace(policy_file=str(policy_dir / "policy_1.txt"), rules=None, stream=False,
+                             min_score=0.6, no_report=True, output=None, profile=None,
+                             match_timeout=None, cache=True)
+            with mock.patch.object(cli, "create_analyzer", return_value=rerun), \
+                    redirect_stdout(StringIO()):
+                cli.check_single_policy(args)
+            self.assertEqual((rerun.result_cache.hits, rerun.result_cache.misses), (1, 0))
+            rerun.close()
+
+class TestRuleProfile(unittest.TestCase):
+    def test_costs_and_backtracking_candidates(self):
+        """Profiles must count what the scan finds, add up across documents and flag risky shapes."""
+        from regex_safety import backtracking_risks
+        from rule_profile import RulesetProfile, profile_text
+
+        self.assertIn("nested quantifier", backtracking_risks(r"(a+)+b"))
+        self.assertIn("quantified alternation with overlapping branches", backtracking_risks(r"(a|aa)+"))
+        self.assertIn("adjacent quantifiers over overlapping characters", backtracking_risks(r"\w+\s*\w+"))
+        self.assertEqual(backtracking_risks(r"(?:foo|bar)+\s+\w+"), [])
+
+        ruleset = ComplianceAnalyzer(":memory:").get_ruleset()
+        text = Path("sample_policy.txt").read_text()
+        profile = profile_text(ruleset, text)
+        self.assertEqual([p.matches for p in profile.patterns], list(map(len, ruleset.engine.scan(text))))
+        self.assertTrue(all(p.prefiltered and not p.risks for p in profile.patterns))
+
+        other = RulesetProfile.for_ruleset(ruleset)
+        profile_text(ruleset, text, other)
+        profile.merge(other)
+        self.assertEqual(profile.documents, 2)
+        report = profile.to_dict()
+        seconds = [p['seconds'] for p in report['patterns']]
+        self.assertEqual(seconds, sorted(seconds, reverse=True))
+        self.assertEqual(sum(p['matches'] for p in report['patterns']),
+                         2 * sum(map(len, ruleset.engine.scan(text))))
+
+    def test_check_profile_option(self):
+        """``check --profile`` must write the cost report next to the normal output."""
+        from ai_governance_tool import cli
+
+        with tempfile.TemporaryDirectory() as tmp:
+            output_path = str(Path(tmp) / "profile.json")
+            args = Namespace(policy_file="sample_policy.txt", rules=None, stream=False, min_score=0.6,
+                             no_report=True, output=None, profile=output_path, match_timeout=None,
+                             cache=False)
+            with mock.patch.object(cli, "create_analyzer", return_value=ComplianceAnalyzer(":memory:")), \
+                    redirect_stdout(StringIO()) as output:
+                cli.check_single_policy(args)
+
+            report = json.loads(Path(output_path).read_text())
+            self.assertEqual(report['documents'], 1)
+            self.assertEqual(len(report['patterns']), 10)
+            self.assertIn("Pattern cost profile", output.getvalue())
+
+class TestRegexSafety(unittest.TestCase):
+    PACK = {"categories": [{"name": "Data", "weight": 1, "required_score": 0.5, "patterns": [
+        {"pattern": r"data", "weight": 0.5, "description": "Data"},
+        {"pattern": r"(a|aa)+$", "weight": 0.5, "description": "Runaway"},
+    ]}]}
+
+    def test_unsafe_patterns_need_opt_in(self):
+        """Risky pack patterns must be rejected unless allowed, and then flagged at compile time."""
+        from regex_safety import UnsafePatternWarning
+
+        with tempfile.TemporaryDirectory() as tmp:
+            pack = Path(tmp) / "pack.json"
+            pack.write_text(json.dumps(self.PACK))
+            with self.assertRaisesRegex(RulePackError, r"patterns\[1\]\.pattern: .*backtrack"):
+                load_rule_pack(pack, cache_dir=tmp, registry=RulesetRegistry())
+
+            pack.write_text(json.dumps({**self.PACK, "allow_unsafe_patterns": True}))
+            ruleset = load_rule_pack(pack, cache_dir=tmp, registry=RulesetRegistry())
+        self.assertEqual(list(ruleset.unsafe_patterns), [1])
+        with self.assertWarns(UnsafePatternWarning):
+            ComplianceAnalyzer(":memory:", ruleset=ruleset).close()
+
+    def test_match_timeout_returns_partial_result(self):
+        """A runaway pattern must be stopped at the budget, keeping the safe patterns' matches."""
+        import time
+        from match_guard import MatchTimeout
+
+        categories = [ComplianceCategory(name="Data", weight=1, required_score=0.5, patterns=[
+            CompliancePattern(pattern=p["pattern"], weight=p["weight"], category="Data",
+                              description=p["description"])
+            for p in self.PACK["categories"][0]["patterns"]
+        ])]
+        analyzer = ComplianceAnalyzer(":memory:", ruleset=CompiledRuleset(categories), match_timeout=0.5)
+        try:
+            result = analyzer.check_compliance("data aaaa", store=False)
+            self.assertEqual(result.category_scores, {"Data": 1.0})
+
+            started = time.monotonic()
+            with self.assertRaises(MatchTimeout) as caught:
+                analyzer.check_compliance("data " + "a" * 40 + "b", store=False)
+            self.assertLess(time.monotonic() - started, 5)
+            self.assertEqual(caught.exception.patterns, ["Data: Runaway"])
+            self.assertEqual(caught.exception.result.category_scores, {"Data": 0.5})
+
+            # The killed worker is replaced for the next document
+            self.assertEqual(analyzer.check_compliance("aa", store=False).category_scores, {"Data": 0.5})
+        finally:
+            analyzer.close()
+
+    def test_streamed_and_incremental_checks_respect_match_timeout(self):
+        """Streamed checks must refuse unguardable rulesets and incremental checks must be guarded."""
+        import time
+        from match_guard import MatchTimeout
+
+        categories = [ComplianceCategory(name="Data", weight=1, required_score=0.5, patterns=[
+            CompliancePattern(pattern=p["pattern"], weight=p["weight"], category="Data",
+                              description=p["description"])
+            for p in self.PACK["categories"][0]["patterns"]
+        ])]
+        analyzer = ComplianceAnalyzer(":memory:", ruleset=CompiledRuleset(categories), match_timeout=0.5)
+        try:
+            with self.assertRaisesRegex(ValueError, "cannot apply match_timeout"):
+                analyzer.check_compliance_stream(["data aaaa"], store=False)
+
+            result = analyzer.check_compliance_incremental("doc", "data aaaa", store=False)
+            self.assertEqual(result.category_scores, {"Data": 1.0})
+            started = time.monotonic()
+            with self.assertRaises(MatchTimeout):
+                analyzer.check_compliance_incremental("doc", "data " + "a" * 40 + "b", store=False)
+            self.assertLess(time.monotonic() - started, 5)
+        finally:
+            analyzer.close()
+
+    def test_concurrent_checks_share_one_match_guard(self):
+        """Threads checking at once must create a single MatchGuard."""
+        import time
+        from concurrent.futures import ThreadPoolExecutor
+        import match_guard
+        import main
+
+        created = []
+        guard_class = match_guard.MatchGuard
+
+        def slow_guard(budget):
+            time.sleep(0.05)  # Widens the window in which threads race to create the guard
+            created.append(budget)
+            return guard_class(budget)
+
+        analyzer = ComplianceAnalyzer(":memory:", match_timeout=5)
+        try:
+            with mock.patch.object(main, "MatchGuard", slow_guard), ThreadPoolExecutor(4) as pool:
+                results = list(pool.map(lambda _: analyzer.check_compliance("data privacy", store=False),
+                                        range(4)))
+            self.assertEqual(len(created), 1)
+            self.assertEqual(len({result.score for result in results}), 1)
+        finally:
+            analyzer.close()
+
+    def test_check_profile_skips_timed_out_policy(self):
+        """``check --match-timeout --profile`` must not re-run a runaway pattern without a limit."""
+        import time
+        from ai_governance_tool import cli
+
+        with tempfile.TemporaryDirectory() as tmp:
+            pack = Path(tmp) / "pack.json"
+            pack.write_text(json.dumps({**self.PACK, "allow_unsafe_patterns": True}))
+            policy = Path(tmp) / "policy.txt"
+            policy.write_text("data " + "a" * 40 + "b")
+            output_path = Path(tmp) / "profile.json"
+            args = Namespace(policy_file=str(policy), rules=str(pack), stream=False, min_score=0.6,
+                             no_report=True, output=None, profile=str(output_path), match_timeout=0.5,
+                             cache=False)
+
+            started = time.monotonic()
+            with mock.patch.dict(os.environ, {"AI_GOVERNANCE_CACHE_DIR": tmp}), \
+                    redirect_stdout(StringIO()) as output, self.assertRaises(SystemExit) as exited:
+                cli.check_single_policy(args)
+            self.assertLess(time.monotonic() - started, 5)
+            self.assertEqual(exited.exception.code, 1)
+            self.assertIn("unfinished patterns: Data: Runaway", output.getvalue())
+            self.assertIn("profile skipped", output.getvalue())
+            self.assertFalse(output_path.exists())
+
+class TestIngestion(unittest.TestCase):
+    DOCX_BODY = (
+        '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"><w:body>'
+        '<w:p><w:r><w:t>Our risk assessment is</w:t></w:r><w:r><w:t xml:space="preserve"> transparent.</w:t></w:r></w:p>'
+        '<w:p><w:r><w:t>Privacy</w:t><w:tab/><w:t>and security reviews.</w:t></w:r></w:p>'
+        '</w:body></w:document>'
+    )
+
+    def write_documents(self, directory: Path) -> Dict[str, Path]:
+        import zipfile
+
+        paths = {suffix: directory / f"policy{suffix}" for suffix in (".md", ".html", ".docx", ".txt")}
+        paths[".md"].write_text("# Governance\nWe keep **transparent** [records](http://x) and `ethical` reviews.\n"
+                                "```\nrisk_assessment()\n```\n")
+        paths[".html"].write_text("<html><head><style>p {}</style><script>var privacy = 1;</script></head>"
+                                  "<body><p>Risk&nbsp;assessment</p><p>security &amp; monitoring</p></body></html>")
+        with zipfile.ZipFile(paths[".docx"], "w") as archive:
+            archive.writestr("word/document.xml", self.DOCX_BODY)
+        paths[".txt"].write_text("Accountability and fairness.")
+        return paths
+
+    def test_extractors_and_hash_cache(self):
+        """Each format must yield its text once; unchanged files must come from the cache."""
+        import sys
+        from ingestion import DocxExtractor, ExtractionCache, ExtractionError, extract_document
+
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = self.write_documents(Path(tmp))
+            cache = ExtractionCache(Path(tmp) / "cache")
+            texts = {suffix: extract_document(path, cache).read_text() for suffix, path in paths.items()}
+            self.assertEqual(texts[".md"], "Governance\nWe keep transparent records and ethical reviews.\n"
+                                           "risk_assessment()\n")
+            self.assertEqual(texts[".html"].split(), ["Risk", "assessment", "security", "&", "monitoring"])
+            self.assertEqual(texts[".docx"],
+                             "Our risk assessment is transparent.\nPrivacy\tand security reviews.\n")
+
+            # Plain text is read in place; extracted text is reused while the file is unchanged
+            self.assertEqual(extract_document(paths[".txt"], cache).text_path, str(paths[".txt"]))
+            with mock.patch.object(DocxExtractor, "extract", side_effect=AssertionError("re-extracted")):
+                self.assertTrue(extract_document(paths[".docx"], cache).cached)
+            paths[".html"].write_text("<p>Edited</p>")
+            edited = extract_document(paths[".html"], cache)
+            self.assertFalse(edited.cached)
+            self.assertEqual(edited.read_text().strip(), "Edited")
+
+            # Files of other types, or without a suffix, are read as plain text like before
+            for name in ("policy.rst", "policy"):
+                (Path(tmp) / name).write_text("Governance")
+                document = extract_document(Path(tmp) / name, cache)
+                self.assertEqual((document.text_path, document.read_text()), (str(Path(tmp) / name), "Governance"))
+            (Path(tmp) / "policy.pdf").write_bytes(b"%PDF-1.4")
+            with mock.patch.dict(sys.modules, {"pypdf": None}), \
+                    self.assertRaisesRegex(ExtractionError, "pypdf is required"):
+                extract_document(Path(tmp) / "policy.pdf", cache)
+
+    def test_extraction_cache_prunes_least_recently_used(self):
+        """Writes must prune the least recently used entries beyond the size limit."""
+        from ingestion import CACHE_MAX_BYTES_ENV, ExtractionCache
+
+        with tempfile.TemporaryDirectory() as tmp:
+            with mock.patch.dict(os.environ, {CACHE_MAX_BYTES_ENV: "25"}):
+                cache = ExtractionCache(tmp)
+            self.assertEqual(cache.max_bytes, 25)
+            for age, key in enumerate(["old", "used", "new"]):
+                os.utime(cache.put(key, ["x" * 10]), (1000 + age, 1000 + age))
+            # Only two entries fit, so the first write after the limit drops the oldest one
+            self.assertEqual(sorted(path.stem for path in Path(tmp).glob("*.txt")), ["new", "used"])
+
+            self.assertIsNotNone(cache.get("used"))  # Reading an entry makes it recent
+            cache.put("newest", ["x" * 10])
+            self.assertEqual(sorted(path.stem for path in Path(tmp).glob("*.txt")), ["newest", "used"])
+            self.assertIsNone(cache.get("old"))
+
+    def test_cli_checks_extensionless_policy(self):
+        """The CLI must check a policy file without a suffix as plain text."""
+        from ai_governance_tool import cli
+
+        with tempfile.TemporaryDirectory() as tmp:
+            policy = Path(tmp) / "policy"
+            policy.write_text("Risk assessment and governance are closely integrated.")
+            analyzer = ComplianceAnalyzer(":memory:")
+            args = Namespace(policy_file=str(policy), rules=None, stream=False, min_score=0.6,
+                             no_report=True, output=None, profile=None, match_timeout=None, cache=False)
+            with mock.patch.object(cli, "create_analyzer", return_value=analyzer), \
+                    redirect_stdout(StringIO()) as output:
+                cli.check_single_policy(args)
+            expected = analyzer.check_compliance(policy.read_text(), store=False)
+            self.assertIn(f"Overall Score: {expected.score:.2f}", output.getvalue())
+            analyzer.close()
+
+    def test_parallel_extraction_streams_into_analyzer(self):
+        """Documents extracted in worker processes must score like their extracted text."""
+        from ingestion import ExtractionCache, check_documents, extract_document
+
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = list(self.write_documents(Path(tmp)).values()) + [Path(tmp) / "notes.xyz"]
+            paths[-1].write_text("governance")
+            cache = ExtractionCache(Path(tmp) / "cache")
+            analyzer = ComplianceAnalyzer(":memory:")
+            outcomes = list(check_documents(analyzer, paths, workers=2, store=True, cache=cache))
+
+            self.assertEqual([path for path, _, _ in outcomes], [str(path) for path in paths])
+            for path, result, error in outcomes:
+                self.assertIsNone(error)
+                expected = analyzer.check_compliance(extract_document(path, cache).read_text(), store=False)
+                self.assertEqual((result.score, result.found_patterns), (expected.score, expected.found_patterns))
+                self.assertEqual(result.policy_id, path)
+            self.assertEqual(analyzer.history.query("SELECT COUNT(*) FROM compliance_history")[0][0], 5)
+            analyzer.close()
+
+class TestAsyncService(unittest.TestCase):
+    def test_concurrent_checks_match_sync_results(self):
+        """Async checks in the process pool must match synchronous results and apply backpressure."""
+        import asyncio
+        from async_service import ComplianceService, ServiceBusy
+
+        texts = [
+            "Risk assessment and governance are closely integrated.",
+            "We ensure privacy and security.",
+            "Our system is transparent and ethical.",
+            "Nothing relevant here.",
+        ]
+
+        async def run(tmp):
+            analyzer = ComplianceAnalyzer(str(Path(tmp) / "history.db"))
+            service = ComplianceService(analyzer, workers=2, max_pending=4)
+            await service.start()
+            try:
+                results = await asyncio.gather(*(
+                    service.analyze(text, policy_id=f"policy-{idx}") for idx, text in enumerate(texts)
+                ))
+                with self.assertRaises(ServiceBusy):
+                    await asyncio.gather(*(service.analyze(text) for text in texts + texts[:1]))
+                report = await service.submit_report(results[0], str(Path(tmp) / "report.pdf"))
+            finally:
+                await service.close()
+            return analyzer, results, report
+
+        with tempfile.TemporaryDirectory() as tmp:
+            analyzer, results, report = asyncio.run(run(tmp))
+            for text, result in zip(texts, results):
+                expected = analyzer.check_compliance(text, store=False)
+                self.assertEqual(result.found_patterns, expected.found_patterns)
+                self.assertEqual(result.proximity_scores, expected.proximity_scores)
+            self.assertTrue(Path(report).exists())
+            self.assertEqual(len(analyzer.query_history(policy_id="policy-2").results), 1)
+            analyzer.close()
+
+    def test_close_shuts_pools_down_off_the_event_loop(self):
+        """Closing the service must not block the event loop while its pools shut down."""
+        import asyncio
+        import threading
+        from concurrent.futures import ProcessPoolExecutor
+        from async_service import ComplianceService
+
+        shutdown_threads = []
+        shutdown = ProcessPoolExecutor.shutdown
+
+        def record_shutdown(pool, *args, **kwargs):
+            shutdown_threads.append(threading.current_thread())
+            return shutdown(pool, *args, **kwargs)
+
+        async def run(service):
+            await service.start()
+            await service.analyze("We ensure privacy and security.")
+            with mock.patch.object(ProcessPoolExecutor, "shutdown", record_shutdown):
+                await service.close()
+
+        with tempfile.TemporaryDirectory() as tmp:
+            analyzer = ComplianceAnalyzer(str(Path(tmp) / "history.db"))
+            asyncio.run(run(ComplianceService(analyzer, workers=1)))
+            self.assertEqual(len(shutdown_threads), 2)
+            self.assertNotIn(threading.main_thread(), shutdown_threads)
+            analyzer.close()
+
+    def test_process_pool_checks_use_result_cache(self):
+        """Checks dispatched to worker processes must be looked up in and added to the parent's cache."""
+        import asyncio
+        from async_service import ComplianceService
+        from result_cache import ResultCache
+
+        async def run(service, text):
+            await service.start()
+            try:
+                return [await service.analyze(text) for _ in range(2)]
+            finally:
+                await service.close()
+
+        with tempfile.TemporaryDirectory() as tmp:
+            analyzer = ComplianceAnalyzer(str(Path(tmp) / "history.db"))
+            cache = ResultCache.from_env({"CACHE_TTL": "60", "CACHE_MAX_ENTRIES": "8"}, store=analyzer.history)
+            self.assertEqual([(tier.max_entries, tier.ttl) for tier in cache.tiers[:1]], [(8, 60)])
+            self.assertEqual(cache.tiers[1].ttl, 60)
+            analyzer.result_cache = cache
+
+            text = "Risk assessment and governance are closely integrated."
+            first, second = asyncio.run(run(ComplianceService(analyzer, workers=1), text))
+            self.assertEqual((cache.hits, cache.misses), (1, 1))
+            self.assertEqual(first.match_index, second.match_index)
+            self.assertEqual(len(analyzer.query_history().results), 2)
+            analyzer.close()
+
+    def test_batch_streams_outcomes_and_stores_once(self):
+        """Batch outcomes must cover every document and be written to history together."""
+        import asyncio
+        from async_service import ComplianceService
+
+        documents = [("We ensure privacy and security.", 0.6, f"doc-{idx}") for idx in range(6)]
+        documents.append((None, 0.6, "broken"))
+
+        async def run(analyzer):
+            service = ComplianceService(analyzer, workers=2)
+            await service.start()
+            try:
+                outcomes = []
+                async for outcome in service.analyze_batch(documents, window=3):
+                    outcomes.append(outcome)
+                    # Nothing is stored until the batch has finished
+                    self.assertEqual(len(analyzer.query_history().results), 0)
+                return outcomes, service.pending
+            finally:
+                await service.close()
+
+        with tempfile.TemporaryDirectory() as tmp:
+            analyzer = ComplianceAnalyzer(str(Path(tmp) / "history.db"))
+            outcomes, pending = asyncio.run(run(analyzer))
+            self.assertEqual(sorted(index for index, _, _ in outcomes), list(range(7)))
+            errors = [index for index, result, error in outcomes if error is not None]
+            self.assertEqual(errors, [6])
+            self.assertEqual(pending, 0)
+            self.assertEqual(len(analyzer.query_history().results), 6)
+            analyzer.close()
+
+class TestMetrics(unittest.TestCase):
+    def test_stage_timers_and_counters(self):
+        """Each stage must be timed and every document, byte and match counted."""
+        from metrics import MetricsRegistry
+
+        text = "Security first. Our security and governance framework is secure. Privacy matters."
+        analyzer = ComplianceAnalyzer(":memory:")
+        self.assertIsNone(analyzer.metrics)
+        registry = analyzer.enable_metrics()
+        result = analyzer.check_compliance(text)
+        analyzer.check_compliance_stream([text[:20], text[20:]], store=False)
+
+        snapshot = registry.snapshot()
+        for stage in ("scan", "proximity", "scoring"):
+            self.assertGreater(snapshot['timers'][stage]['count'], 0)
+        self.assertEqual(snapshot['timers']['persistence']['count'], 1)
+        counters = {name: {tuple(sorted(e['labels'].items())): e['value'] for e in values}
+                    for name, values in snapshot['counters'].items()}
+        self.assertEqual(counters['documents'][()], 2)
+        self.assertEqual(counters['bytes_analyzed'][()], 2 * len(text.encode()))
+        security = (("category", "Risk Management"), ("pattern", "Security measures"))
+        self.assertEqual(counters['pattern_matches'][security], 2 * result.match_index.counts[4])
+
+        registry = MetricsRegistry()
+        registry.increment("pattern_matches", 2, {"pattern": 'say "hi"'})
+        registry.observe("scan", 0.5)
+        exposition = registry.to_prometheus()
+        self.assertIn('ai_governance_pattern_matches_total{pattern="say \\"hi\\""} 2', exposition)
+        self.assertIn('ai_governance_stage_seconds_count{stage="scan"} 1', exposition)
+        analyzer.close()
+
+    def test_worker_measurements_reach_served_metrics(self):
+        """Process-pool analyses must be counted in the parent and served over HTTP."""
+        import asyncio
+        from urllib.request import urlopen
+        from async_service import ComplianceService
+        from metrics import serve_metrics
+
+        analyzer = ComplianceAnalyzer(":memory:")
+        registry = analyzer.enable_metrics()
+
+        async def run():
+            service = ComplianceService(analyzer, workers=2)
+            await service.start()
+            try:
+                await asyncio.gather(*(service.analyze("We ensure privacy.") for _ in range(3)))
+            finally:
+                await service.close()
+
+        asyncio.run(run())
+        server = serve_metrics(registry, 0)
+        try:
+            with urlopen(f"http://127.0.0.1:{server.server_address[1]}/metrics") as response:
+                body = response.read().decode()
+        finally:
+            server.shutdown()
+            server.server_close()
+        self.assertIn("ai_governance_documents_total 3", body)
+        self.assertIn('ai_governance_stage_seconds_count{stage="persistence"} 3', body)
+        analyzer.close()
+
+class TestStartup(unittest.TestCase):
+    def test_core_imports_only_stdlib(self):
+        """Importing the analyzer and CLI must not load the report, chart or network modules."""
+        import subprocess
+        import sys
+        code = (
+            "import main, ai_governance_tool.cli, sys; "
+            "print([m for m in ('matplotlib', 'reportlab', 'numpy', 'ssl', 'urllib.request') "
+            "if m in sys.modules])"
+        )
+        output = subprocess.run(
+            [sys.executable, "-c", code], cwd=Path(__file__).parent,
+            check=True, capture_output=True, text=True
+        ).stdout
+        self.assertEqual(output.strip(), "[]")
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -1,5 +1,6 @@
 """Configuration settings for the backend."""
 import os
+from typing import Optional
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -26,10 +27,12 @@ class Settings(BaseSettings):
 
     # Cache settings
     CACHE_TTL: int = 3600  # 1 hour
+    CACHE_MAX_ENTRIES: int = 1024
 
     # Analyzer settings
     MIN_COMPLIANCE_SCORE: float = 0.6
     ENABLE_PROXIMITY_ANALYSIS: bool = True
+    PROXIMITY_MAX_WORDS: Optional[int] = None  # Matches further apart score 0
 
     class Config:
         env_file = ".env"